@@ -1,15 +1,20 @@
 from __future__ import annotations
 
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 from asi.brain.react_loop import ReActLoop
 from asi.config import load_config
 from asi.emotion.emotion_state import EmotionState
 from asi.llm.factory import build_backend
+from asi.memory.retention import MaintenanceJob
 from asi.memory.store import MemoryStore
 from asi.memory.store_memory import MemoryStoreMemory
 from asi.memory.store_sqlite import SQLiteMemoryStore
+from asi.memory.write_behind import WriteBehindQueue
+from asi.observability.ids import new_run_id
+from asi.observability.logger import EventLogger
 from asi.persona.persona_manager import PersonaManager
 from asi.safety.permissions import PermissionManager
 from asi.safety.sandbox import Sandbox
@@ -23,6 +28,7 @@ class ArabellaBrain:
     def __init__(self, config_dir: str | Path) -> None:
         self._config = load_config(config_dir)
         self._llm = build_backend(self._config)
+        self._events = EventLogger(self._config)
 
         self._persona = PersonaManager(self._config)
         self._emotion = EmotionState()
@@ -32,12 +38,29 @@ class ArabellaBrain:
 
         self._memory: MemoryStore
         if memory_backend == "memory":
-            self._memory = MemoryStoreMemory()
+            self._memory = MemoryStoreMemory(self._config)
         elif memory_backend == "sqlite":
             self._memory = SQLiteMemoryStore(self._config)
         else:
             raise ValueError(f"Unsupported memory backend: {memory_backend}")
 
+        # Optional: persist episodes off the response path.
+        self._memory_writer: WriteBehindQueue | None = None
+        if bool(memory_cfg.get("write_behind", False)):
+            self._memory_writer = WriteBehindQueue(
+                self._memory,
+                max_queue=int(memory_cfg.get("write_behind_max_queue", 1024)),
+                max_batch=int(memory_cfg.get("write_behind_max_batch", 64)),
+                retries=int(memory_cfg.get("write_behind_retries", 2)),
+                retry_delay_s=float(memory_cfg.get("write_behind_retry_delay_s", 0.5)),
+                events=self._events,
+            )
+
+        self._maintenance: MaintenanceJob | None = None
+        maintenance_interval = float(memory_cfg.get("maintenance_interval_s", 0))
+        if maintenance_interval > 0:
+            self._maintenance = MaintenanceJob(self._memory, maintenance_interval)
+
         self._permission_manager = PermissionManager(self._config)
         self._sandbox = Sandbox(self._config)
         self._tools = ToolRegistry(permission_manager=self._permission_manager)
@@ -72,8 +95,34 @@ class ArabellaBrain:
 
     @property
     def memory_records(self) -> list[dict[str, Any]]:
-        # Debug helper: return everything we can reasonably fetch
-        return list(self._memory.retrieve(query="", k=10_000))
+        # Debug helper: streams every stored memory, oldest first.
+        self.flush_memory()
+        return list(self._memory.iter_records())
+
+    @property
+    def memory_queue_depth(self) -> int:
+        """Episodes waiting in the write-behind queue (0 when it is disabled)."""
+        return self._memory_writer.depth if self._memory_writer is not None else 0
+
+    @property
+    def memory_writes_dropped(self) -> int:
+        """Episodes the write-behind queue gave up on after its retries."""
+        return self._memory_writer.dropped if self._memory_writer is not None else 0
+
+    def flush_memory(self) -> None:
+        if self._memory_writer is not None:
+            self._memory_writer.flush()
+
+    def close(self) -> None:
+        if self._maintenance is not None:
+            self._maintenance.stop()
+        try:
+            if self._memory_writer is not None:
+                self._memory_writer.close()
+        finally:
+            close_memory = getattr(self._memory, "close", None)
+            if callable(close_memory):
+                close_memory()
 
     def _build_system_prompt(self, session_id: str, user_message: str) -> str:
         persona = self._persona.get_persona_context(session_id)
@@ -81,6 +130,9 @@ class ArabellaBrain:
         memory_cfg = self._config.get("memory", {})
         k_default = int(memory_cfg.get("k_default", memory_cfg.get("k", 5)))
 
+        if self._memory_writer is not None:
+            # Read-your-writes within the session; other sessions never wait.
+            self._memory_writer.wait_for_session(session_id)
         snippets = self._memory.retrieve(query=user_message, k=k_default, session_id=session_id)
 
         self._emotion.update(user_message=user_message, history=[])
@@ -97,7 +149,10 @@ class ArabellaBrain:
         ]
         return "\n\n".join(parts)
 
-    def respond(self, user_message: str, session_id: str) -> str:
+    def respond(self, user_message: str, session_id: str, run_id: str | None = None) -> str:
+        run_id = run_id or new_run_id()
+        started = time.perf_counter()
+        self._log_request(run_id, session_id, user_message)
         system_prompt = self._build_system_prompt(session_id=session_id, user_message=user_message)
 
         answer = self._react_loop.run(
@@ -108,17 +163,72 @@ class ArabellaBrain:
             max_steps=int(self._config["agent"]["max_steps"]),
         )
 
-        # Store a single episode record with a consistent schema.
-        self._memory.store(
-            {
-                "type": "episode",
-                "text": f"USER: {user_message}\nASSISTANT: {answer}",
-                "metadata": {
-                    "session_id": session_id,
-                    "user": user_message,
-                    "assistant": answer,
-                },
-            }
-        )
-
+        self._remember(session_id, user_message, answer)
+        self._log_response(run_id, session_id, answer, started)
         return answer
+
+    def respond_stream(
+        self, user_message: str, session_id: str, run_id: str | None = None
+    ) -> Iterator[str]:
+        """Like ``respond``, but yield the answer in pieces as the model produces it.
+
+        The episode is stored once the answer is complete; a consumer that
+        stops early leaves no episode behind.
+        """
+        run_id = run_id or new_run_id()
+        started = time.perf_counter()
+        self._log_request(run_id, session_id, user_message)
+        system_prompt = self._build_system_prompt(session_id=session_id, user_message=user_message)
+
+        pieces: list[str] = []
+        first_token_ms: float | None = None
+        for delta in self._react_loop.run_stream(
+            user_message=user_message,
+            system_prompt=system_prompt,
+            tools=self._tools,
+            llm=self._llm,
+            max_steps=int(self._config["agent"]["max_steps"]),
+        ):
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - started) * 1000.0
+            pieces.append(delta)
+            yield delta
+
+        answer = "".join(pieces)
+        self._remember(session_id, user_message, answer)
+        self._log_response(run_id, session_id, answer, started, first_token_ms=first_token_ms)
+
+    def _log_request(self, run_id: str, session_id: str, user_message: str) -> None:
+        data = {"message": user_message} if self._events.include_payloads else {}
+        self._events.log("respond_start", run_id, session_id, data)
+
+    def _log_response(
+        self,
+        run_id: str,
+        session_id: str,
+        answer: str,
+        started: float,
+        first_token_ms: float | None = None,
+    ) -> None:
+        data: dict[str, Any] = {"latency_ms": (time.perf_counter() - started) * 1000.0}
+        if first_token_ms is not None:
+            data["first_token_ms"] = first_token_ms
+        if self._events.include_payloads:
+            data["response"] = answer
+        self._events.log("respond_end", run_id, session_id, data)
+
+    def _remember(self, session_id: str, user_message: str, answer: str) -> None:
+        # Store a single episode record with a consistent schema.
+        episode = {
+            "type": "episode",
+            "text": f"USER: {user_message}\nASSISTANT: {answer}",
+            "metadata": {
+                "session_id": session_id,
+                "user": user_message,
+                "assistant": answer,
+            },
+        }
+        if self._memory_writer is not None:
+            self._memory_writer.submit(episode)
+        else:
+            self._memory.store(episode)
@@ -1,11 +1,150 @@
 from __future__ import annotations
 
 import json
-from typing import Any
+from typing import Any, Generator, Iterator
 
 from asi.llm.backend import LLMBackend, Message
 from asi.tools.registry import ToolRegistry
 
+_HIGH_SURROGATES = ("d8", "d9", "da", "db")
+
+
+def _decode(raw: str) -> str:
+    """Decode an escaped JSON string body; raw control characters are kept as-is."""
+    return str(json.loads(f'"{raw}"', strict=False))
+
+
+def _decodable_prefix(raw: str) -> int:
+    """Length of the longest prefix of an escaped JSON string body that decodes alone.
+
+    Stops before a backslash escape (or surrogate pair) that is still incomplete.
+    """
+    i = 0
+    while i < len(raw):
+        if raw[i] != "\\":
+            i += 1
+            continue
+        if i + 1 >= len(raw):
+            return i
+        if raw[i + 1] != "u":
+            i += 2
+            continue
+        if i + 6 > len(raw):
+            return i
+        if raw[i + 2 : i + 4].lower() in _HIGH_SURROGATES:
+            if i + 12 > len(raw):
+                return i
+            i += 12
+        else:
+            i += 6
+    return i
+
+
+class FinalAnswerStream:
+    """Incremental reader of one ``{"type": "final", "content": "..."}`` envelope.
+
+    Fed the raw chunks of a streamed model reply, it tracks the top-level
+    ``type`` and decodes the top-level ``content`` string as it arrives.
+    ``feed`` returns the newly decoded content as soon as the reply is known
+    to be a final answer, whether ``type`` comes before or after ``content``.
+    A reply that does not start with ``{`` is streamed verbatim, since
+    ``ReActLoop`` takes such replies as the final answer.
+    """
+
+    def __init__(self) -> None:
+        self.raw = ""
+        self.kind: str | None = None
+        self.verbatim = False
+        self.emitted = ""
+        self._depth = 0
+        # Top-level object state: "key", "colon", "value" or "after".
+        self._state = "key"
+        self._key: str | None = None
+        self._in_string = False
+        self._escaped = False
+        self._string: list[str] = []
+        self._string_role: str | None = None
+        self._content: list[str] = []
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk; return the content decoded since the last call (if final)."""
+        self.raw += chunk
+        if self.verbatim:
+            return self._emit(chunk)
+        if self._depth == 0 and not self._content and self.kind is None:
+            stripped = self.raw.lstrip()
+            if not stripped:
+                return ""
+            if not stripped.startswith("{"):
+                self.verbatim = True
+                return self._emit(self.raw)
+        for ch in chunk:
+            self._step(ch)
+        if self._in_string and self._string_role == "content":
+            pending = "".join(self._string)
+            cut = _decodable_prefix(pending)
+            if cut:
+                self._content.append(_decode(pending[:cut]))
+                self._string = [pending[cut:]]
+        if self.kind != "final":
+            return ""
+        content = "".join(self._content)
+        return self._emit(content[len(self.emitted) :])
+
+    def _emit(self, delta: str) -> str:
+        self.emitted += delta
+        return delta
+
+    def _step(self, ch: str) -> None:
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif ch == "\\":
+                self._escaped = True
+            elif ch == '"':
+                self._close_string()
+                return
+            if self._string_role is not None:
+                self._string.append(ch)
+            return
+        if ch == '"':
+            self._in_string = True
+            self._string = []
+            if self._depth != 1:
+                self._string_role = None
+            elif self._state == "key":
+                self._string_role = "key"
+            elif self._state == "value" and self._key in ("type", "content"):
+                self._string_role = self._key
+            else:
+                self._string_role = None
+        elif ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+            if self._depth == 1:
+                self._state = "after"
+        elif self._depth == 1 and ch == ":":
+            self._state = "value"
+        elif self._depth == 1 and ch == ",":
+            self._state = "key"
+
+    def _close_string(self) -> None:
+        self._in_string = False
+        role, raw = self._string_role, "".join(self._string)
+        self._string = []
+        if self._depth != 1:
+            return
+        if role == "key":
+            self._key = _decode(raw)
+            self._state = "colon"
+            return
+        self._state = "after"
+        if role == "type":
+            self.kind = _decode(raw)
+        elif role == "content":
+            self._content.append(_decode(raw))
+
 
 class ReActLoop:
     def __init__(self) -> None:
@@ -13,13 +152,35 @@ class ReActLoop:
 
     def _parse_response(self, raw: str) -> dict[str, Any]:
         try:
-            parsed = json.loads(raw)
+            # Models often put literal newlines and tabs inside strings.
+            parsed = json.loads(raw, strict=False)
         except json.JSONDecodeError:
             return {"type": "final", "content": raw}
         if not isinstance(parsed, dict):
             return {"type": "final", "content": raw}
         return parsed
 
+    def _run_tool(
+        self, parsed: dict[str, Any], messages: list[Message], tools: ToolRegistry
+    ) -> None:
+        tool_name = str(parsed.get("name", ""))
+        args = parsed.get("args", {})
+        if not isinstance(args, dict):
+            args = {}
+        tool_result = tools.execute(tool_name, args)
+
+        messages.append({"role": "assistant", "content": json.dumps(parsed)})
+        if tool_result.get("blocked"):
+            reason = str(tool_result.get("error", "blocked"))
+            messages.append({"role": "user", "content": f"[tool_blocked] reason={reason}"})
+        else:
+            messages.append(
+                {
+                    "role": "user",
+                    "content": f"[tool_result] {json.dumps(tool_result, sort_keys=True)}",
+                }
+            )
+
     def run(
         self,
         user_message: str,
@@ -43,23 +204,7 @@ class ReActLoop:
                 return str(parsed.get("content", ""))
 
             if kind == "tool_call":
-                tool_name = str(parsed.get("name", ""))
-                args = parsed.get("args", {})
-                if not isinstance(args, dict):
-                    args = {}
-                tool_result = tools.execute(tool_name, args)
-
-                messages.append({"role": "assistant", "content": json.dumps(parsed)})
-                if tool_result.get("blocked"):
-                    reason = str(tool_result.get("error", "blocked"))
-                    messages.append({"role": "user", "content": f"[tool_blocked] reason={reason}"})
-                else:
-                    messages.append(
-                        {
-                            "role": "user",
-                            "content": f"[tool_result] {json.dumps(tool_result, sort_keys=True)}",
-                        }
-                    )
+                self._run_tool(parsed, messages, tools)
                 continue
 
             self.debug_trace = list(messages)
@@ -72,3 +217,63 @@ class ReActLoop:
         if parsed.get("type") == "final":
             return str(parsed.get("content", ""))
         return raw
+
+    def _stream_reply(
+        self, llm: LLMBackend, messages: list[Message]
+    ) -> Generator[str, None, tuple[dict[str, Any], str]]:
+        """Yield final-answer deltas while one reply streams; return (parsed, raw)."""
+        reader = FinalAnswerStream()
+        for chunk in llm.stream_generate(messages=messages, system_prompt=None):
+            delta = reader.feed(chunk)
+            if delta:
+                yield delta
+        parsed = self._parse_response(reader.raw)
+        if parsed.get("type") == "final":
+            content = str(parsed.get("content", ""))
+            # Whatever the reader could not decode early (e.g. non-string content).
+            if content.startswith(reader.emitted) and len(content) > len(reader.emitted):
+                yield content[len(reader.emitted) :]
+        return parsed, reader.raw
+
+    def run_stream(
+        self,
+        user_message: str,
+        system_prompt: str,
+        tools: ToolRegistry,
+        llm: LLMBackend,
+        max_steps: int,
+    ) -> Iterator[str]:
+        """Like ``run``, but yield the final answer in pieces as the model writes it.
+
+        Replies come from ``llm.stream_generate``. Tool calls run as in
+        ``run``; a final answer's content is yielded as soon as the envelope
+        is recognized as final, so the first piece arrives with the model's
+        first content tokens. For well-formed replies the joined pieces equal
+        ``run``'s answer.
+        """
+        messages: list[Message] = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message},
+        ]
+
+        for _ in range(max_steps):
+            parsed, _ = yield from self._stream_reply(llm, messages)
+            kind = parsed.get("type")
+
+            if kind == "final":
+                self.debug_trace = list(messages)
+                return
+
+            if kind == "tool_call":
+                self._run_tool(parsed, messages, tools)
+                continue
+
+            self.debug_trace = list(messages)
+            yield str(parsed)
+            return
+
+        messages.append({"role": "user", "content": "Respond with a final answer JSON."})
+        parsed, raw = yield from self._stream_reply(llm, messages)
+        self.debug_trace = list(messages)
+        if parsed.get("type") != "final":
+            yield raw
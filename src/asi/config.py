@@ -211,6 +211,17 @@ def _validate(config: dict[str, Any]) -> None:
         raise ValueError("safety.permission_mode must be one of: deny, auto, ask")
     if memory_backend not in {"memory", "sqlite"}:
         raise ValueError("memory.backend must be one of: memory, sqlite")
+    embedding_storage = config["memory"].get("embedding_storage", "float32")
+    if embedding_storage not in {"float32", "float16", "int8"}:
+        raise ValueError("memory.embedding_storage must be one of: float32, float16, int8")
+    if config["memory"].get("retrieval_mode", "vector") not in {"vector", "lexical", "hybrid"}:
+        raise ValueError("memory.retrieval_mode must be one of: vector, lexical, hybrid")
+    if config["memory"].get("index_engine", "hnsw") not in {"hnsw", "mmap", "sparse"}:
+        raise ValueError("memory.index_engine must be one of: hnsw, mmap, sparse")
+    if config["memory"].get("dedup_mode", "off") not in {"off", "drop", "merge"}:
+        raise ValueError("memory.dedup_mode must be one of: off, drop, merge")
+    if not 0.0 <= float(config["memory"].get("mmr_lambda", 0.7)) <= 1.0:
+        raise ValueError("memory.mmr_lambda must be between 0 and 1")
 
 
 def load_config(config_dir: Path | str) -> dict[str, Any]:
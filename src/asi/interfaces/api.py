@@ -1,24 +1,27 @@
 from __future__ import annotations
 
+import json
 from importlib import metadata
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 from asi.brain.arabella_brain import ArabellaBrain
 from asi.observability.ids import new_run_id
 
 try:
     from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
     from pydantic import BaseModel
 except Exception:  # pragma: no cover - optional dependency
-    FastAPI = None
-    BaseModel = object
+    FastAPI = None  # type: ignore[misc, assignment]
+    StreamingResponse = None  # type: ignore[misc, assignment]
+    BaseModel = object  # type: ignore[misc, assignment]
 
 
 if FastAPI is not None:
     app = FastAPI()
 else:  # pragma: no cover - optional dependency
-    app = None
+    app = None  # type: ignore[assignment]
 
 brain = ArabellaBrain(config_dir=Path("configs"))
 
@@ -42,6 +45,21 @@ def _chat_payload(session_id: str, message: str) -> dict[str, str]:
     return {"session_id": session_id, "run_id": run_id, "response": response}
 
 
+def _sse(event: str, data: dict[str, str]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _chat_stream_events(session_id: str, message: str) -> Iterator[str]:
+    """Server-sent events: ``start``, one ``delta`` per answer piece, then ``done``."""
+    run_id = new_run_id()
+    yield _sse("start", {"session_id": session_id, "run_id": run_id})
+    pieces: list[str] = []
+    for delta in brain.respond_stream(message, session_id, run_id=run_id):
+        pieces.append(delta)
+        yield _sse("delta", {"content": delta})
+    yield _sse("done", {"session_id": session_id, "run_id": run_id, "response": "".join(pieces)})
+
+
 if app is not None:
 
     @app.get("/health")
@@ -52,6 +70,14 @@ if app is not None:
     def chat(body: ChatRequest) -> dict[str, str]:
         return _chat_payload(body.session_id, body.message)
 
+    @app.post("/chat/stream")
+    def chat_stream(body: ChatRequest) -> StreamingResponse:
+        return StreamingResponse(
+            _chat_stream_events(body.session_id, body.message),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
 else:  # pragma: no cover
 
     def health() -> dict[str, str]:
@@ -59,3 +85,6 @@ else:  # pragma: no cover
 
     def chat(body: Any) -> dict[str, str]:
         raise RuntimeError("fastapi extra is not installed")
+
+    def chat_stream(body: Any) -> Any:
+        raise RuntimeError("fastapi extra is not installed")
@@ -8,12 +8,17 @@ from asi.brain.arabella_brain import ArabellaBrain
 def main() -> None:
     brain = ArabellaBrain(config_dir=Path("configs"))
     print("ASI CLI. Type 'exit' to quit.")
-    while True:
-        user_input = input("you> ").strip()
-        if user_input.lower() in {"exit", "quit"}:
-            break
-        response = brain.respond(user_input, session_id="cli")
-        print(f"asi> {response}")
+    try:
+        while True:
+            user_input = input("you> ").strip()
+            if user_input.lower() in {"exit", "quit"}:
+                break
+            print("asi> ", end="", flush=True)
+            for delta in brain.respond_stream(user_input, session_id="cli"):
+                print(delta, end="", flush=True)
+            print()
+    finally:
+        brain.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,246 @@
+"""Retrieval benchmark and recall suite for the memory subsystem.
+
+Run ``python -m asi.memory.benchmark --sizes 10000,100000 --out bench.json``.
+For each corpus size it reports store throughput, cold-start (rebuild and
+index load) time, retrieve latency percentiles, RSS, and recall@k of the
+HNSW path against exact search for every ``M`` x ``ef_search`` combination.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from asi.memory.embedder import HashEmbedder
+from asi.memory.flat_index import FlatVectorIndex
+from asi.memory.store_sqlite import SQLiteMemoryStore
+from asi.memory.vector_index import HNSWVectorIndex, hnswlib_available
+
+_VOCAB_SIZE = 5_000
+
+
+def synthetic_corpus(n: int, seed: int = 0) -> list[str]:
+    """Chat-like texts: 8-24 tokens drawn from a Zipf-distributed vocabulary."""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, _VOCAB_SIZE + 1)
+    weights /= weights.sum()
+    lengths = rng.integers(8, 25, size=n)
+    tokens = rng.choice(_VOCAB_SIZE, size=int(lengths.sum()), p=weights)
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    return [" ".join(f"w{t}" for t in tokens[bounds[i] : bounds[i + 1]].tolist()) for i in range(n)]
+
+
+def percentiles_ms(samples: Sequence[float]) -> dict[str, float]:
+    values = np.asarray(samples, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3)}
+
+
+def rss_mb() -> dict[str, float]:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    current_mb = 0.0
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        pages = int(statm.read_text().split()[1])
+        current_mb = pages * resource.getpagesize() / (1024 * 1024)
+    return {"current": round(current_mb, 1), "peak": round(peak_mb, 1)}
+
+
+def _store_config(base: Path, dim: int, m: int, ef_search: int) -> dict[str, Any]:
+    return {
+        "memory": {
+            "db_path": str(base / "memory.db"),
+            "index_path": str(base / "hnsw.index"),
+            "embedding_dim": dim,
+            "M": m,
+            "ef_search": ef_search,
+            "retrieval_mode": "vector",
+            "query_cache_size": 0,
+        }
+    }
+
+
+def bench_store(
+    texts: Sequence[str], queries: Sequence[str], *, dim: int, k: int, batch_size: int
+) -> dict[str, Any]:
+    """Throughput, cold start and end-to-end retrieve latency of SQLiteMemoryStore."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cfg = _store_config(Path(tmp), dim, m=16, ef_search=50)
+        store = SQLiteMemoryStore(cfg)
+        start = time.perf_counter()
+        for offset in range(0, len(texts), batch_size):
+            store.store_many([{"text": text} for text in texts[offset : offset + batch_size]])
+        store_s = time.perf_counter() - start
+        store.close()
+
+        # Without the cached graph (or without hnswlib) startup rebuilds from the DB.
+        index_file = Path(cfg["memory"]["index_path"])
+        index_file.unlink(missing_ok=True)
+        start = time.perf_counter()
+        store = SQLiteMemoryStore(cfg)
+        rebuild_s = time.perf_counter() - start
+        store.close()
+
+        start = time.perf_counter()
+        store = SQLiteMemoryStore(cfg)
+        load_s = time.perf_counter() - start
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            store.retrieve(query, k=k)
+            latencies.append(time.perf_counter() - start)
+        store.close()
+
+    return {
+        "rows_per_s": round(len(texts) / max(store_s, 1e-9), 1),
+        "store_s": round(store_s, 3),
+        "cold_start": {
+            "rebuild_s": round(rebuild_s, 3),
+            "load_s": round(load_s, 3),
+            "index_cached": hnswlib_available(),
+        },
+        "retrieve_ms": percentiles_ms(latencies),
+    }
+
+
+def bench_recall(
+    embeddings: npt.NDArray[np.float32],
+    query_embeddings: npt.NDArray[np.float32],
+    *,
+    k: int,
+    m_values: Sequence[int],
+    ef_values: Sequence[int],
+) -> list[dict[str, Any]]:
+    """recall@k of HNSWVectorIndex vs exact search for each (M, ef_search)."""
+    ids = np.arange(1, len(embeddings) + 1, dtype=np.int64)
+    exact = FlatVectorIndex(dim=embeddings.shape[1], initial_capacity=len(embeddings))
+    exact.add_items(embeddings, ids)
+    truth, _ = exact.knn_query(query_embeddings, k=k)
+
+    results = []
+    for m in m_values:
+        index = HNSWVectorIndex(
+            dim=embeddings.shape[1],
+            max_elements=len(embeddings),
+            ef_construction=200,
+            m=m,
+            ef_search=max(ef_values),
+        )
+        start = time.perf_counter()
+        index.add_batch(ids, embeddings)
+        build_s = time.perf_counter() - start
+        for ef in ef_values:
+            index.set_ef(ef)
+            hits = 0
+            latencies = []
+            for query, expected in zip(query_embeddings, truth):
+                start = time.perf_counter()
+                found = index.search(query, k)
+                latencies.append(time.perf_counter() - start)
+                hits += len(set(found) & set(expected.tolist()))
+            results.append(
+                {
+                    "M": m,
+                    "ef_search": ef,
+                    "build_s": round(build_s, 3),
+                    "recall_at_k": round(hits / (len(truth) * k), 4),
+                    "query_ms": percentiles_ms(latencies),
+                }
+            )
+    return results
+
+
+def run_benchmark(
+    sizes: Sequence[int],
+    *,
+    dim: int = 384,
+    k: int = 10,
+    queries: int = 200,
+    m_values: Sequence[int] = (8, 16),
+    ef_values: Sequence[int] = (16, 50, 100),
+    batch_size: int = 1_000,
+    seed: int = 0,
+) -> dict[str, Any]:
+    embedder = HashEmbedder(dim=dim)
+    query_texts = synthetic_corpus(queries, seed=seed + 1)
+    query_embeddings = embedder.embed_batch(query_texts)
+    report: dict[str, Any] = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "hnswlib": hnswlib_available(),
+            "dim": dim,
+            "k": k,
+            "queries": queries,
+        },
+        "results": [],
+    }
+    for size in sizes:
+        texts = synthetic_corpus(size, seed=seed)
+        result: dict[str, Any] = {"size": size}
+        result.update(bench_store(texts, query_texts, dim=dim, k=k, batch_size=batch_size))
+        embeddings = np.empty((size, dim), dtype=np.float32)
+        for offset in range(0, size, batch_size):
+            embeddings[offset : offset + batch_size] = embedder.embed_batch(
+                texts[offset : offset + batch_size]
+            )
+        result["recall"] = bench_recall(
+            embeddings, query_embeddings, k=k, m_values=m_values, ef_values=ef_values
+        )
+        result["rss_mb"] = rss_mb()
+        report["results"].append(result)
+    return report
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--sizes", type=_int_list, default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--m", type=_int_list, default=[8, 16])
+    parser.add_argument("--ef-search", type=_int_list, default=[16, 50, 100])
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None, help="write JSON here (default stdout)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        args.sizes,
+        dim=args.dim,
+        k=args.k,
+        queries=args.queries,
+        m_values=args.m,
+        ef_values=args.ef_search,
+        batch_size=args.batch_size,
+        seed=args.seed,
+    )
+    payload = json.dumps(report, indent=2, sort_keys=True)
+    if args.out is None:
+        print(payload)
+    else:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(payload + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
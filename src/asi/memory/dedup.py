@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+DEDUP_MODES = ("off", "drop", "merge")
+SIGNATURE_BITS = 64
+
+_TOKEN = re.compile(r"\w+")
+_BIT_SHIFTS = np.arange(SIGNATURE_BITS, dtype=np.uint64)
+
+
+@lru_cache(maxsize=65_536)
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over lowercased word unigrams and bigrams.
+
+    Texts differing in a few words land a few bits apart; unrelated texts
+    about 32 bits apart.
+    """
+    tokens = _TOKEN.findall(text.lower())
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not features:
+        return 0
+    hashes = np.fromiter((_feature_hash(f) for f in features), dtype=np.uint64)
+    bits = (hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)
+    votes = 2 * bits.sum(axis=0, dtype=np.int64) - len(features)
+    return int(np.packbits(votes[::-1] > 0).view(">u8")[0])
+
+
+def to_sqlite(signature: int) -> int:
+    """Map an unsigned 64-bit signature onto SQLite's signed INTEGER range."""
+    return signature - (1 << 64) if signature >= 1 << 63 else signature
+
+
+def from_sqlite(value: int) -> int:
+    return value & ((1 << 64) - 1)
+
+
+class SimHashIndex:
+    """LSH over SimHash signatures of the most recent ``window`` records.
+
+    The signature is cut into ``bands`` equal bands; records sharing any
+    band value are candidates, and a candidate within ``max_distance`` bits
+    is a near duplicate. With ``max_distance < bands`` this finds every such
+    record (pigeonhole). Duplicates only match within the same ``scope``
+    (the session), so sessions never absorb each other's memories.
+    """
+
+    def __init__(self, window: int = 10_000, bands: int = 4, max_distance: int = 3) -> None:
+        if SIGNATURE_BITS % bands:
+            raise ValueError("memory.dedup_bands must divide 64")
+        self._window = max(window, 1)
+        self._bands = bands
+        self._band_bits = SIGNATURE_BITS // bands
+        self._max_distance = max_distance
+        self._entries: OrderedDict[int, tuple[int, Any]] = OrderedDict()
+        self._buckets: dict[tuple[int, int, Any], set[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def window(self) -> int:
+        return self._window
+
+    def _keys(self, signature: int, scope: Any) -> list[tuple[int, int, Any]]:
+        mask = (1 << self._band_bits) - 1
+        return [
+            (band, (signature >> (band * self._band_bits)) & mask, scope)
+            for band in range(self._bands)
+        ]
+
+    def find(self, signature: int, scope: Any) -> int | None:
+        """Most recent indexed record within ``max_distance`` bits, if any."""
+        with self._lock:
+            candidates: set[int] = set()
+            for key in self._keys(signature, scope):
+                candidates |= self._buckets.get(key, set())
+            best: int | None = None
+            for record_id in candidates:
+                if bin(self._entries[record_id][0] ^ signature).count("1") <= self._max_distance:
+                    best = record_id if best is None else max(best, record_id)
+            return best
+
+    def add(self, record_id: int, signature: int, scope: Any) -> None:
+        with self._lock:
+            self._discard(record_id)
+            self._entries[record_id] = (signature, scope)
+            for key in self._keys(signature, scope):
+                self._buckets.setdefault(key, set()).add(record_id)
+            while len(self._entries) > self._window:
+                self._discard(next(iter(self._entries)))
+
+    def remove(self, record_id: int) -> None:
+        with self._lock:
+            self._discard(record_id)
+
+    def _discard(self, record_id: int) -> None:
+        entry = self._entries.pop(record_id, None)
+        if entry is None:
+            return
+        for key in self._keys(*entry):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(record_id)
+                if not bucket:
+                    del self._buckets[key]
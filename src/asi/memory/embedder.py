@@ -1,7 +1,11 @@
 from __future__ import annotations
 
 import hashlib
-from typing import Protocol
+from functools import lru_cache
+from typing import Any, Protocol, Sequence
+
+import numpy as np
+import numpy.typing as npt
 
 
 class Embedder(Protocol):
@@ -9,27 +13,58 @@ class Embedder(Protocol):
 
     def embed(self, text: str) -> list[float]: ...
 
+    def embed_batch(self, texts: Sequence[str]) -> npt.NDArray[np.float32]: ...
+
 
 class HashEmbedder:
-    def __init__(self, dim: int) -> None:
+    # Names the token hash; stored vectors only match an embedder with the same one.
+    scheme = "sha256"
+
+    def __init__(self, dim: int, cache_size: int = 65_536) -> None:
         if dim <= 0:
             raise ValueError("embedding dimension must be > 0")
         self.dim = dim
+        self._cache_size = cache_size
+        self._token_slot = lru_cache(maxsize=cache_size)(self._hash_token)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # The LRU wrapper is not picklable; rebuild it on the other side.
+        return {"dim": self.dim, "cache_size": self._cache_size}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.dim = int(state["dim"])
+        self._cache_size = int(state["cache_size"])
+        self._token_slot = lru_cache(maxsize=self._cache_size)(self._hash_token)
+
+    def _hash_token(self, token: str) -> tuple[int, float]:
+        # Bucket and sign come from disjoint digest bytes, so they are
+        # independent: colliding tokens cancel as often as they add.
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        bucket = int.from_bytes(digest[:4], "little") % self.dim
+        sign = 1.0 if digest[4] % 2 == 0 else -1.0
+        return bucket, sign
 
     def embed(self, text: str) -> list[float]:
-        vector = [0.0] * self.dim
-        tokens = text.split()
-        if not tokens:
-            return vector
-        for token in tokens:
-            digest = hashlib.sha256(token.encode("utf-8")).digest()
-            bucket = int.from_bytes(digest[:4], "little") % self.dim
-            sign = 1.0 if digest[4] % 2 == 0 else -1.0
-            vector[bucket] += sign
-        norm = sum(v * v for v in vector) ** 0.5
-        if norm == 0:
-            return vector
-        return [v / norm for v in vector]
+        return [float(x) for x in self.embed_batch([text])[0]]
+
+    def embed_batch(self, texts: Sequence[str]) -> npt.NDArray[np.float32]:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        rows: list[int] = []
+        buckets: list[int] = []
+        signs: list[float] = []
+        slot = self._token_slot
+        for row, text in enumerate(texts):
+            for token in text.split():
+                bucket, sign = slot(token)
+                rows.append(row)
+                buckets.append(bucket)
+                signs.append(sign)
+        if not rows:
+            return matrix
+        np.add.at(matrix, (np.asarray(rows), np.asarray(buckets)), np.asarray(signs, np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
 
 
 class SentenceTransformerEmbedder:
@@ -40,3 +75,8 @@ class SentenceTransformerEmbedder:
         raise NotImplementedError(
             "SentenceTransformerEmbedder is optional and not enabled in Task 5"
         )
+
+    def embed_batch(self, texts: Sequence[str]) -> npt.NDArray[np.float32]:
+        raise NotImplementedError(
+            "SentenceTransformerEmbedder is optional and not enabled in Task 5"
+        )
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from asi.memory.quantize import quantize_int8, validate_storage
+
+# Rows dequantized per matmul when the matrix is not stored as float32.
+_SEARCH_BLOCK_ROWS = 16_384
+
+
+class FlatVectorIndex:
+    """Exact cosine index over a contiguous vector matrix.
+
+    Mirrors the subset of the hnswlib ``Index`` API used by HNSWVectorIndex
+    (``add_items``/``knn_query``/``mark_deleted``/``resize_index``/...) so it
+    can stand in when hnswlib is not installed. Rows are stored L2-normalized,
+    which turns every search into one matrix-vector (or matrix-matrix)
+    product. Deleted rows are tombstoned until the owner compacts the index.
+
+    With ``storage="float16"`` or ``"int8"`` (per-row scale) the matrix is
+    kept quantized. Search then dequantizes it in blocks and scores them
+    against the full-precision query, so only the rows carry quantization
+    error.
+
+    ``from_arrays`` wraps existing (e.g. memory-mapped, read-only) arrays
+    sorted by label; such a frozen index supports search and tombstones
+    but no inserts.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        initial_capacity: int = 1024,
+        storage: str = "float32",
+    ) -> None:
+        self.dim = dim
+        self.storage = validate_storage(storage)
+        capacity = max(initial_capacity, 1)
+        self._matrix: npt.NDArray[Any] = np.zeros((capacity, dim), dtype=storage)
+        self._scales = np.ones(capacity if storage == "int8" else 0, dtype=np.float32)
+        self._row_ids = np.zeros(capacity, dtype=np.int64)
+        self._deleted = np.zeros(capacity, dtype=bool)
+        self._rows: dict[int, int] = {}
+        self._count = 0
+        self._deleted_count = 0
+        self._frozen = False
+
+    @classmethod
+    def from_arrays(
+        cls,
+        matrix: npt.NDArray[Any],
+        row_ids: npt.NDArray[np.int64],
+        scales: npt.NDArray[np.float32] | None = None,
+    ) -> FlatVectorIndex:
+        """Frozen index over normalized rows already sorted by ``row_ids``."""
+        index = cls(dim=int(matrix.shape[1]), initial_capacity=1, storage=str(matrix.dtype))
+        index._matrix = matrix
+        index._row_ids = row_ids
+        index._scales = scales if scales is not None else np.ones(0, dtype=np.float32)
+        index._deleted = np.zeros(len(row_ids), dtype=bool)
+        index._count = len(row_ids)
+        index._frozen = True
+        return index
+
+    def _row(self, label: int) -> int | None:
+        if self._frozen:
+            pos = int(np.searchsorted(self._row_ids, label))
+            found = pos < self._count and int(self._row_ids[pos]) == label
+            return pos if found else None
+        return self._rows.get(label)
+
+    def get_current_count(self) -> int:
+        """Number of rows in use, tombstones included (as in hnswlib)."""
+        return self._count
+
+    def get_max_elements(self) -> int:
+        return int(self._matrix.shape[0])
+
+    def get_ids_list(self) -> list[int]:
+        return [int(x) for x in self._row_ids[: self._count]]
+
+    def get_items(self, ids: Sequence[int]) -> npt.NDArray[np.float32]:
+        rows = [self._row(int(label)) for label in ids]
+        if any(row is None for row in rows):
+            raise KeyError("label not found in index")
+        return self._dequantize(np.asarray(rows, dtype=np.int64))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._matrix.nbytes + self._scales.nbytes)
+
+    def _dequantize(self, rows: npt.NDArray[np.int64]) -> npt.NDArray[np.float32]:
+        vectors = self._matrix[rows].astype(np.float32)
+        if self.storage == "int8":
+            vectors *= self._scales[rows][..., None]
+        return vectors
+
+    def resize_index(self, new_size: int) -> None:
+        if self._frozen:
+            raise RuntimeError("frozen index cannot be resized")
+        if new_size < self._count:
+            raise ValueError("cannot shrink below the current element count")
+        n = self._count
+        matrix = np.zeros((new_size, self.dim), dtype=self._matrix.dtype)
+        matrix[:n] = self._matrix[:n]
+        row_ids = np.zeros(new_size, dtype=np.int64)
+        row_ids[:n] = self._row_ids[:n]
+        deleted = np.zeros(new_size, dtype=bool)
+        deleted[:n] = self._deleted[:n]
+        if self.storage == "int8":
+            scales = np.ones(new_size, dtype=np.float32)
+            scales[:n] = self._scales[:n]
+            self._scales = scales
+        self._matrix, self._row_ids, self._deleted = matrix, row_ids, deleted
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._count + extra
+        capacity = self.get_max_elements()
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.resize_index(capacity)
+
+    def add_items(self, data: npt.ArrayLike, ids: Sequence[int] | npt.NDArray[np.int64]) -> None:
+        vectors = np.atleast_2d(np.asarray(data, dtype=np.float32))
+        labels = np.asarray(ids, dtype=np.int64)
+        if vectors.shape != (len(labels), self.dim):
+            raise ValueError("embedding batch shape does not match ids/dim")
+        if self._frozen:
+            raise RuntimeError("frozen index does not accept new items")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        normalized = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+        self._reserve(len(labels))
+        rows = np.empty(len(labels), dtype=np.int64)
+        for i, label in enumerate(labels.tolist()):
+            row = self._rows.get(label)
+            if row is None:
+                row = self._count
+                self._rows[label] = row
+                self._row_ids[row] = label
+                self._count += 1
+            elif self._deleted[row]:
+                self._deleted[row] = False
+                self._deleted_count -= 1
+            rows[i] = row
+
+        if self.storage == "int8":
+            codes, scales = quantize_int8(normalized)
+            self._matrix[rows] = codes
+            self._scales[rows] = scales
+        else:
+            self._matrix[rows] = normalized
+
+    def mark_deleted(self, label: int) -> None:
+        row = self._row(int(label))
+        if row is None or self._deleted[row]:
+            raise RuntimeError(f"label {label} is not present or already deleted")
+        self._deleted[row] = True
+        self._deleted_count += 1
+
+    def unmark_deleted(self, label: int) -> None:
+        row = self._row(int(label))
+        if row is None or not self._deleted[row]:
+            raise RuntimeError(f"label {label} is not deleted")
+        self._deleted[row] = False
+        self._deleted_count -= 1
+
+    def _similarities(self, queries: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+        n = self._count
+        if self.storage == "float32":
+            return np.asarray(queries @ self._matrix[:n].T, dtype=np.float32)
+
+        sims = np.empty((len(queries), n), dtype=np.float32)
+        for start in range(0, n, _SEARCH_BLOCK_ROWS):
+            stop = min(start + _SEARCH_BLOCK_ROWS, n)
+            block = self._matrix[start:stop].astype(np.float32)
+            sims[:, start:stop] = queries @ block.T
+            if self.storage == "int8":
+                sims[:, start:stop] *= self._scales[start:stop]
+        return sims
+
+    def knn_query(
+        self, data: npt.ArrayLike, k: int = 1, filter: Callable[[int], bool] | None = None
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]:
+        """Return (labels, cosine distances), one row per query, best first.
+
+        Like hnswlib, ``filter`` is called with each label and excludes rows
+        for which it returns False.
+        """
+        queries = np.atleast_2d(np.asarray(data, dtype=np.float32))
+        excluded = self._deleted[: self._count]
+        if filter is not None:
+            keep = np.fromiter(
+                (filter(int(label)) for label in self._row_ids[: self._count]),
+                dtype=bool,
+                count=self._count,
+            )
+            excluded = excluded | ~keep
+        live = self._count - int(excluded.sum())
+        k = min(k, live)
+        if k <= 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = np.divide(queries, norms, out=np.zeros_like(queries), where=norms > 0)
+        sims = self._similarities(queries)
+        if live < self._count:
+            sims[:, excluded] = -np.inf
+
+        if k < self._count:
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(self._count), (len(queries), self._count))
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind="stable")[:, :k]
+        top = np.take_along_axis(top, order, axis=1)
+        top_sims = np.take_along_axis(top_sims, order, axis=1)
+        return self._row_ids[top], (1.0 - top_sims).astype(np.float32)
@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Collection, Iterator, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from asi.memory.flat_index import FlatVectorIndex
+from asi.memory.quantize import quantize_int8, validate_storage
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: segment writes are not serialized
+    fcntl = None  # type: ignore[assignment]
+
+_MAGIC = b"ASIVSEG1"
+_ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def write_segment(
+    path: Path,
+    ids: npt.NDArray[np.int64],
+    vectors: npt.NDArray[np.float32],
+    storage: str,
+    extra: dict[str, Any] | None = None,
+) -> None:
+    """Atomically write a vector segment: labels sorted ascending, rows normalized.
+
+    Layout: magic, header length, JSON header, then 64-byte aligned ids
+    (int64), int8 scales (float32, int8 only) and the row matrix. Workers map
+    it read-only, so every process shares the same page-cache copy.
+    ``extra`` is stored in the header (e.g. the max memory id covered).
+    """
+    validate_storage(storage)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    scales = None
+    if storage == "int8":
+        matrix, scales = quantize_int8(vectors)
+    else:
+        matrix = vectors.astype(storage)
+    tmp = path.with_name(path.name + ".tmp")
+    _write_encoded(tmp, ids, matrix, scales, storage, extra)
+    os.replace(tmp, path)
+
+
+def _write_encoded(
+    path: Path,
+    ids: npt.NDArray[np.int64],
+    matrix: npt.NDArray[Any],
+    scales: npt.NDArray[np.float32] | None,
+    storage: str,
+    extra: dict[str, Any] | None,
+) -> None:
+    """Write already normalized and encoded rows to ``path``, sorted by label."""
+    order = np.argsort(ids, kind="stable")
+    ids = np.ascontiguousarray(ids[order], dtype="<i8")
+    matrix = matrix[order]
+    if scales is not None:
+        scales = scales[order]
+    count, dim = len(ids), int(matrix.shape[1]) if matrix.ndim == 2 else 0
+    sections: list[tuple[str, npt.NDArray[Any]]] = [("ids", ids)]
+    if scales is not None:
+        sections.append(("scales", scales.astype("<f4")))
+    sections.append(("matrix", np.ascontiguousarray(matrix)))
+    header: dict[str, Any] = {
+        "count": count,
+        "dim": dim,
+        "storage": storage,
+        "extra": extra or {},
+    }
+
+    # The header stores absolute offsets, so size it with placeholder offsets first.
+    prefix = len(_MAGIC) + 8
+    draft = json.dumps({**header, "offsets": {name: 2**62 for name, _ in sections}})
+    offset = _aligned(prefix + len(draft))
+    offsets: dict[str, int] = {}
+    for name, array in sections:
+        offsets[name] = offset
+        offset = _aligned(offset + array.nbytes)
+    payload = json.dumps({**header, "offsets": offsets}).encode("utf-8")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as f:
+        f.write(_MAGIC + len(payload).to_bytes(8, "little") + payload)
+        for name, array in sections:
+            f.seek(offsets[name])
+            f.write(array.tobytes())
+        f.truncate(max(offset, f.tell()))
+
+
+def map_segment(path: Path) -> tuple[FlatVectorIndex, dict[str, Any]] | None:
+    """Map a segment read-only as a frozen FlatVectorIndex (+ its header extra).
+
+    Returns None when the file is missing or unreadable.
+    """
+    try:
+        with path.open("rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                return None
+            header = json.loads(f.read(int.from_bytes(f.read(8), "little")))
+        count, dim, storage = int(header["count"]), int(header["dim"]), str(header["storage"])
+        offsets = header["offsets"]
+        extra = dict(header.get("extra", {}))
+        if count == 0:
+            empty = FlatVectorIndex.from_arrays(
+                np.zeros((0, dim), dtype=storage), np.zeros(0, dtype=np.int64)
+            )
+            return empty, extra
+        ids = np.memmap(path, dtype="<i8", mode="r", offset=offsets["ids"], shape=(count,))
+        matrix = np.memmap(
+            path, dtype=storage, mode="r", offset=offsets["matrix"], shape=(count, dim)
+        )
+        scales = None
+        if storage == "int8":
+            scales = np.memmap(
+                path, dtype="<f4", mode="r", offset=offsets["scales"], shape=(count,)
+            )
+    except (OSError, ValueError, KeyError):
+        return None
+    index = FlatVectorIndex.from_arrays(matrix, ids, scales)
+    return index, extra
+
+
+class MappedVectorIndex:
+    """Read-mostly index: a shared memory-mapped base segment plus a private delta.
+
+    Speaks the same hnswlib-style API as FlatVectorIndex so HNSWVectorIndex
+    can drive it. New or re-embedded vectors land in a small in-RAM delta;
+    ``write`` folds both into a fresh segment that other processes pick up
+    with ``refresh``. Searches are exact over base and delta.
+
+    ``write`` is ``stage`` (build the new file from a snapshot, read-only)
+    plus ``publish`` (swap it in), so a caller can let searches run while
+    the file is built and lock out readers only for the swap.
+    """
+
+    def __init__(self, dim: int, path: Path, storage: str = "float32") -> None:
+        self.dim = dim
+        self.path = path
+        self.storage = validate_storage(storage)
+        self._base: FlatVectorIndex | None = None
+        self._base_identity: tuple[int, int] | None = None
+        self._superseded = 0
+        self._delta = self._new_delta()
+        # Bumped by every mutation, so publish() can tell a stale stage.
+        self.version = 0
+        self.extra: dict[str, Any] = {}
+
+    def _new_delta(self) -> FlatVectorIndex:
+        return FlatVectorIndex(dim=self.dim, storage=self.storage)
+
+    def _identity(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    @property
+    def base_count(self) -> int:
+        return 0 if self._base is None else self._base.get_current_count()
+
+    @property
+    def delta_count(self) -> int:
+        return self._delta.get_current_count()
+
+    def refresh(self) -> bool:
+        """Remap the segment if another process replaced it; True if remapped.
+
+        The private delta is kept and still shadows the segment's copies.
+        """
+        identity = self._identity()
+        if identity is None or identity == self._base_identity:
+            return False
+        mapped = map_segment(self.path)
+        if mapped is None or mapped[0].dim != self.dim:
+            return False
+        base, self.extra = mapped
+        superseded = 0
+        for label in self._delta.get_ids_list():
+            if base._row(label) is not None:
+                base.mark_deleted(label)
+                superseded += 1
+        self._base, self._base_identity, self._superseded = base, identity, superseded
+        return True
+
+    @contextmanager
+    def segment_lock(self) -> Iterator[None]:
+        """Serialize segment rewrites across processes (flock on a sidecar file)."""
+        lock = self.path.with_name(self.path.name + ".lock")
+        lock.parent.mkdir(parents=True, exist_ok=True)
+        with lock.open("w") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+
+    def stage(self, exclude: Collection[int] = (), extra: dict[str, Any] | None = None) -> int:
+        """Write base + delta minus ``exclude`` and tombstones to a temp file.
+
+        Reads only, so searches may run meanwhile. Returns ``version`` as of
+        the snapshot, for ``publish``.
+        """
+        dead = np.fromiter(exclude, dtype=np.int64, count=len(exclude))
+        sources = [src for src in (self._base, self._delta) if src is not None]
+        ids, rows = [], []
+        for source in sources:
+            n = source.get_current_count()
+            keep = ~source._deleted[:n]
+            if len(dead):
+                keep &= ~np.isin(source._row_ids[:n], dead)
+            ids.append(source._row_ids[:n][keep])
+            rows.append(np.flatnonzero(keep))
+        labels = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+        if all(source.storage == self.storage for source in sources):
+            # Copy encoded rows as they are: no per-row reads, no re-quantizing.
+            matrix = np.concatenate(
+                [src._matrix[r] for src, r in zip(sources, rows)]
+                or [np.zeros((0, self.dim), dtype=self.storage)]
+            )
+            scales = None
+            if self.storage == "int8":
+                scales = np.concatenate(
+                    [src._scales[r] for src, r in zip(sources, rows)]
+                    or [np.zeros(0, dtype=np.float32)]
+                )
+        else:
+            vectors = np.concatenate(
+                [src._dequantize(r) for src, r in zip(sources, rows)]
+                or [np.zeros((0, self.dim), dtype=np.float32)]
+            )
+            scales = None
+            if self.storage == "int8":
+                matrix, scales = quantize_int8(vectors)
+            else:
+                matrix = vectors.astype(self.storage)
+        _write_encoded(self._staged_path, labels, matrix, scales, self.storage, extra)
+        return self.version
+
+    @property
+    def _staged_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".tmp")
+
+    def discard(self) -> None:
+        """Drop a staged file that will not be published."""
+        self._staged_path.unlink(missing_ok=True)
+
+    def publish(self, version: int) -> bool:
+        """Swap the staged file in unless the index changed since it was staged."""
+        if version != self.version:
+            self.discard()
+            return False
+        os.replace(self._staged_path, self.path)
+        self._base_identity = None
+        self._delta = self._new_delta()
+        self.refresh()
+        return True
+
+    def write(self, exclude: Collection[int] = (), extra: dict[str, Any] | None = None) -> None:
+        """Fold base + delta (minus dead rows) into a new segment and remap it."""
+        with self.segment_lock():
+            # Start from the newest segment so rows other writers folded in survive.
+            self.refresh()
+            self.publish(self.stage(exclude, extra))
+
+    # hnswlib-style API used by HNSWVectorIndex.
+
+    def get_current_count(self) -> int:
+        return self.base_count - self._superseded + self.delta_count
+
+    def get_max_elements(self) -> int:
+        return self.base_count - self._superseded + self._delta.get_max_elements()
+
+    def resize_index(self, new_size: int) -> None:
+        self._delta.resize_index(max(new_size - self.base_count, self.delta_count, 1))
+
+    def set_ef(self, ef: int) -> None:
+        """No-op: both base and delta are searched exactly."""
+
+    def _in_delta(self, label: int) -> bool:
+        return self._delta._row(label) is not None
+
+    def get_ids_list(self) -> list[int]:
+        labels = self._delta.get_ids_list()
+        if self._base is not None:
+            in_delta = set(labels)
+            labels = [x for x in self._base.get_ids_list() if x not in in_delta] + labels
+        return labels
+
+    def get_items(self, ids: Sequence[int]) -> npt.NDArray[np.float32]:
+        out = np.empty((len(ids), self.dim), dtype=np.float32)
+        for i, label in enumerate(ids):
+            source = self._delta if self._in_delta(int(label)) else self._base
+            if source is None:
+                raise KeyError(f"label {label} not found in index")
+            out[i] = source.get_items([int(label)])[0]
+        return out
+
+    def add_items(self, data: npt.ArrayLike, ids: Sequence[int] | npt.NDArray[np.int64]) -> None:
+        self.version += 1
+        labels = np.asarray(ids, dtype=np.int64)
+        if self._base is not None:
+            for label in labels.tolist():
+                if self._base._row(label) is not None and not self._in_delta(label):
+                    # Re-embedded: hide the shared row behind the delta copy.
+                    try:
+                        self._base.mark_deleted(label)
+                    except RuntimeError:
+                        pass
+                    self._superseded += 1
+        self._delta.add_items(data, labels)
+
+    def mark_deleted(self, label: int) -> None:
+        self.version += 1
+        if self._in_delta(int(label)):
+            self._delta.mark_deleted(label)
+        elif self._base is not None:
+            self._base.mark_deleted(label)
+        else:
+            raise RuntimeError(f"label {label} is not present")
+
+    def unmark_deleted(self, label: int) -> None:
+        self.version += 1
+        if self._in_delta(int(label)):
+            self._delta.unmark_deleted(label)
+        elif self._base is not None:
+            self._base.unmark_deleted(label)
+        else:
+            raise RuntimeError(f"label {label} is not deleted")
+
+    def knn_query(
+        self, data: npt.ArrayLike, k: int = 1, filter: Callable[[int], bool] | None = None
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]:
+        parts = [self._delta.knn_query(data, k=k, filter=filter)]
+        if self._base is not None:
+            parts.append(self._base.knn_query(data, k=k, filter=filter))
+        labels = np.concatenate([part[0] for part in parts], axis=1)
+        distances = np.concatenate([part[1] for part in parts], axis=1)
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return (
+            np.take_along_axis(labels, order, axis=1),
+            np.take_along_axis(distances, order, axis=1),
+        )
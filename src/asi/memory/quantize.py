@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import numpy as np
+import numpy.typing as npt
+
+STORAGE_MODES = ("float32", "float16", "int8")
+
+# Non-float32 blobs start with a 4-byte header whose last two bytes make it a
+# NaN when read as a little-endian float32. Normalized embeddings never start
+# with NaN, so headerless legacy float32 blobs stay unambiguous.
+_HEADER_TAG = b"\x01\xc0\x7f"
+# "sparse" is a blob-only format (uint16 bucket indices + float32 values) for
+# hash embeddings; see SparseVectorIndex. It is not an in-RAM storage mode.
+_FORMAT_CODES = {"float16": 1, "int8": 2, "sparse": 3}
+_SPARSE_MAX_DIM = 1 << 16
+_CODE_FORMATS = {code: mode for mode, code in _FORMAT_CODES.items()}
+
+
+def validate_storage(mode: str) -> str:
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"memory.embedding_storage must be one of: {', '.join(STORAGE_MODES)}")
+    return mode
+
+
+def quantize_int8(
+    matrix: npt.NDArray[np.float32],
+) -> tuple[npt.NDArray[np.int8], npt.NDArray[np.float32]]:
+    """Symmetric per-row int8 quantization; returns (codes, scales)."""
+    matrix = np.atleast_2d(matrix)
+    scales = (np.abs(matrix).max(axis=1) / 127.0).astype(np.float32)
+    safe = np.where(scales > 0, scales, 1.0)[:, None]
+    codes = np.clip(np.rint(matrix / safe), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def encode_blob(vector: npt.NDArray[np.float32], mode: str) -> bytes:
+    if mode == "sparse":
+        if vector.shape[-1] > _SPARSE_MAX_DIM:
+            raise ValueError(f"sparse blobs support dim <= {_SPARSE_MAX_DIM}")
+        (indices,) = np.nonzero(vector)
+        return encode_sparse(indices, vector[indices])
+    if mode == "float32":
+        return vector.astype("<f4", copy=False).tobytes()
+    header = bytes([_FORMAT_CODES[mode]]) + _HEADER_TAG
+    if mode == "float16":
+        return header + vector.astype("<f2").tobytes()
+    codes, scales = quantize_int8(vector)
+    return header + scales.astype("<f4").tobytes() + codes.tobytes()
+
+
+def encode_sparse(indices: npt.ArrayLike, values: npt.ArrayLike) -> bytes:
+    header = bytes([_FORMAT_CODES["sparse"]]) + _HEADER_TAG
+    return (
+        header
+        + np.asarray(indices, dtype="<u2").tobytes()
+        + np.asarray(values, dtype="<f4").tobytes()
+    )
+
+
+def decode_sparse(blob: bytes) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]] | None:
+    """(indices, values) of a sparse blob; None if it is not a valid one."""
+    if blob_format(blob) != "sparse" or (len(blob) - 4) % 6:
+        return None
+    nnz = (len(blob) - 4) // 6
+    indices = np.frombuffer(blob, dtype="<u2", count=nnz, offset=4).astype(np.int64)
+    values = np.frombuffer(blob, dtype="<f4", count=nnz, offset=4 + nnz * 2)
+    return indices, values.astype(np.float32)
+
+
+def blob_format(blob: bytes) -> str:
+    if len(blob) >= 4 and blob[1:4] == _HEADER_TAG:
+        return _CODE_FORMATS.get(blob[0], "unknown")
+    return "float32"
+
+
+def decode_blob_into(blob: bytes, out: npt.NDArray[np.float32]) -> bool:
+    """Decode any supported blob format into ``out``; False if the size is wrong."""
+    dim = out.shape[0]
+    mode = blob_format(blob)
+    if mode == "float32":
+        if len(blob) != dim * 4:
+            return False
+        out[:] = np.frombuffer(blob, dtype="<f4")
+    elif mode == "float16":
+        if len(blob) != 4 + dim * 2:
+            return False
+        out[:] = np.frombuffer(blob, dtype="<f2", offset=4)
+    elif mode == "sparse":
+        decoded = decode_sparse(blob)
+        if decoded is None or (len(decoded[0]) and int(decoded[0].max()) >= dim):
+            return False
+        out[:] = 0.0
+        out[decoded[0]] = decoded[1]
+    elif mode == "int8":
+        if len(blob) != 8 + dim:
+            return False
+        scale = np.frombuffer(blob, dtype="<f4", count=1, offset=4)[0]
+        np.multiply(np.frombuffer(blob, dtype=np.int8, offset=8), scale, out=out)
+    else:
+        return False
+    return True
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+Token = tuple[int, int]
+
+
+class QueryCache:
+    """LRU cache of retrieve() results with TTL and generation-based invalidation.
+
+    Every entry remembers the generation token of the partition it was
+    computed from: the session generation for session-filtered queries, the
+    store-wide one otherwise. A store into a session bumps that session and
+    the store-wide generation; deletes, updates and maintenance bump the
+    epoch, which invalidates everything. The TTL bounds how stale recency
+    scores can get between writes.
+
+    Session generations are drawn from the store-wide counter and kept for
+    at most ``max_entries`` sessions (least recently written dropped first).
+    A session without one reports the highest generation dropped so far,
+    so a token taken before its last write can never match again.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_s: float = 60.0) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl_s
+        self._entries: OrderedDict[Hashable, tuple[float, Token, list[dict[str, Any]]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._global = 0
+        self._sessions: OrderedDict[str, int] = OrderedDict()
+        self._dropped = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_entries > 0 and self._ttl > 0
+
+    @staticmethod
+    def key(query: str, k: int, filters: dict[str, Any]) -> Hashable:
+        # Whitespace is the only normalization that cannot change results:
+        # embedders and the FTS tokenizer both ignore it.
+        return (" ".join(query.split()), k, json.dumps(filters, sort_keys=True, default=str))
+
+    def token(self, session_id: Any) -> Token:
+        with self._lock:
+            if session_id is None:
+                return self._epoch, self._global
+            return self._epoch, self._sessions.get(str(session_id), self._dropped)
+
+    def get(self, key: Hashable, token: Token) -> list[dict[str, Any]] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, entry_token, results = entry
+                if entry_token == token and time.monotonic() - stored_at < self._ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(results)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, token: Token, results: list[dict[str, Any]]) -> None:
+        """Cache ``results``; ``token`` must be taken before they were computed."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), token, copy.deepcopy(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def bump_sessions(self, session_ids: set[str | None]) -> None:
+        with self._lock:
+            self._global += 1
+            for session_id in session_ids:
+                if session_id is not None:
+                    self._sessions[session_id] = self._global
+                    self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self._max_entries:
+                _, generation = self._sessions.popitem(last=False)
+                self._dropped = max(self._dropped, generation)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
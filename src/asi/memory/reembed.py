@@ -0,0 +1,369 @@
+"""Re-embed every stored memory with a new embedder, then swap it in.
+
+Run ``python -m asi.memory.reembed --config configs`` after changing
+``memory.embedding_dim`` (or the embedder). Rows are streamed in id order,
+embedded in a process pool and written to the shadow column
+``memories.embedding_next``; progress is checkpointed in ``reembed_state``,
+so an interrupted job resumes where it stopped. The swap then re-embeds
+whatever changed meanwhile and renames the shadow column over
+``embedding`` in one transaction and drops the previous column. A live
+store can do the same without downtime through ``SQLiteMemoryStore.reembed``,
+which keeps that table rewrite off its writer (see ``release_previous``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterator, Sequence
+
+from asi.memory.embedder import Embedder, HashEmbedder
+from asi.memory.quantize import encode_blob
+
+SHADOW_COLUMN = "embedding_next"
+# Where the swap moves the replaced embeddings.
+PREVIOUS_COLUMN = "embedding_prev"
+# Recreated after the swap: it names the embedding column.
+EMBEDDING_CHANGE_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS memory_changes_au AFTER UPDATE OF embedding ON memories
+    BEGIN
+        INSERT INTO memory_changes (memory_id, op) VALUES (new.id, 'upsert');
+    END
+"""
+# Feed entry telling other processes that every embedding was replaced.
+REEMBED_OP = "reembed"
+
+_worker_embedder: Embedder | None = None
+_worker_storage = "float32"
+
+
+def _embedder_identity(embedder: Embedder) -> str:
+    """Class, model and hash scheme: what decides which vectors an embedder makes."""
+    cls = type(embedder)
+    model = getattr(embedder, "model_name", "")
+    scheme = getattr(embedder, "scheme", "")
+    return f"{cls.__module__}.{cls.__qualname__}:{model}:{scheme}"
+
+
+def _init_worker(embedder: Embedder, storage: str) -> None:
+    global _worker_embedder, _worker_storage
+    _worker_embedder, _worker_storage = embedder, storage
+
+
+def embed_blobs(embedder: Embedder, storage: str, texts: Sequence[str]) -> list[bytes]:
+    """Embed ``texts`` and encode each vector as a stored blob."""
+    embeddings = embedder.embed_batch(list(texts))
+    if embeddings.shape != (len(texts), embedder.dim):
+        raise ValueError("embedder output dimension mismatch")
+    return [encode_blob(embedding, storage) for embedding in embeddings]
+
+
+def _embed_in_worker(texts: Sequence[str]) -> list[bytes]:
+    assert _worker_embedder is not None
+    return embed_blobs(_worker_embedder, _worker_storage, texts)
+
+
+class ReembedJob:
+    """Resumable re-embedding of ``memories`` into a shadow column.
+
+    ``workers`` > 1 embeds chunks in a process pool (the embedder must be
+    picklable); otherwise chunks are embedded inline. ``storage`` is the
+    blob format written (see quantize.encode_blob).
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        embedder: Embedder,
+        *,
+        storage: str = "float32",
+        chunk_size: int = 512,
+        workers: int = 0,
+    ) -> None:
+        self._db_path = db_path
+        self._embedder = embedder
+        self._storage = storage
+        self._chunk_size = max(chunk_size, 1)
+        self._workers = workers
+
+    @property
+    def dim(self) -> int:
+        return self._embedder.dim
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._db_path, isolation_level=None, timeout=30.0)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        return conn
+
+    @staticmethod
+    def _state(conn: sqlite3.Connection) -> dict[str, str]:
+        return dict(conn.execute("SELECT key, value FROM reembed_state").fetchall())
+
+    def _prepare(self, conn: sqlite3.Connection) -> int:
+        """Create the shadow column/state; return the id to resume after."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reembed_state (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(memories)")}
+            if SHADOW_COLUMN not in columns:
+                conn.execute(f"ALTER TABLE memories ADD COLUMN {SHADOW_COLUMN} BLOB")
+            target = {
+                "dim": str(self.dim),
+                "storage": self._storage,
+                "embedder": _embedder_identity(self._embedder),
+            }
+            state = self._state(conn)
+            if {key: state.get(key) for key in target} != target:
+                # New job, or a different target (or embedder) than the interrupted one.
+                conn.execute(f"UPDATE memories SET {SHADOW_COLUMN} = NULL")
+                (feed_seq,) = conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM memory_changes"
+                ).fetchone()
+                state = {**target, "cursor": "0", "feed_seq": str(feed_seq)}
+                conn.execute("DELETE FROM reembed_state")
+                conn.executemany("INSERT INTO reembed_state VALUES (?, ?)", state.items())
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return int(state["cursor"])
+
+    def _chunks(self, conn: sqlite3.Connection, after_id: int) -> Iterator[list[tuple[int, str]]]:
+        cursor = after_id
+        while True:
+            rows = conn.execute(
+                "SELECT id, text FROM memories WHERE id > ? ORDER BY id LIMIT ?",
+                (cursor, self._chunk_size),
+            ).fetchall()
+            if not rows:
+                return
+            yield rows
+            cursor = int(rows[-1][0])
+
+    def _embed_chunks(
+        self, chunks: Iterator[list[tuple[int, str]]]
+    ) -> Iterator[tuple[list[int], list[bytes]]]:
+        """Yield (ids, blobs) in input order, keeping the pool busy."""
+        if self._workers <= 1:
+            for rows in chunks:
+                texts = [text for _, text in rows]
+                yield [i for i, _ in rows], embed_blobs(self._embedder, self._storage, texts)
+            return
+        # spawn: forking a process that runs writer threads is not safe.
+        executor: Executor = ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._embedder, self._storage),
+        )
+        with executor:
+            pending: deque[tuple[list[int], Future[list[bytes]]]] = deque()
+            for rows in chunks:
+                texts = [text for _, text in rows]
+                pending.append(([i for i, _ in rows], executor.submit(_embed_in_worker, texts)))
+                if len(pending) >= 2 * self._workers:
+                    ids, future = pending.popleft()
+                    yield ids, future.result()
+            while pending:
+                ids, future = pending.popleft()
+                yield ids, future.result()
+
+    def fill(self, progress: Callable[[dict[str, Any]], None] | None = None) -> dict[str, Any]:
+        """Embed every row past the checkpoint into the shadow column."""
+        conn = self._connect()
+        try:
+            resumed_from = self._prepare(conn)
+            start = time.perf_counter()
+            rows = 0
+            for ids, blobs in self._embed_chunks(self._chunks(conn, resumed_from)):
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    f"UPDATE memories SET {SHADOW_COLUMN} = ? WHERE id = ?", zip(blobs, ids)
+                )
+                conn.execute(
+                    "UPDATE reembed_state SET value = ? WHERE key = 'cursor'", (str(ids[-1]),)
+                )
+                conn.execute("COMMIT")
+                rows += len(ids)
+                if progress is not None:
+                    progress(_throughput(rows, start, cursor=ids[-1]))
+            return {**_throughput(rows, start), "resumed_from": resumed_from}
+        finally:
+            conn.close()
+
+    def swap_in(self, conn: sqlite3.Connection) -> tuple[list[int], list[int]]:
+        """Make the shadow column live; ``conn`` must hold the write transaction.
+
+        Rows inserted or re-embedded since the job started are embedded again
+        first. Returns (re-embedded ids, ids deleted since the job started).
+        """
+        state = self._state(conn)
+        if state.get("dim") != str(self.dim) or state.get("storage") != self._storage:
+            raise RuntimeError("no finished re-embedding job for this embedder; run fill()")
+        feed_seq = int(state["feed_seq"])
+        (oldest,) = conn.execute("SELECT MIN(seq) FROM memory_changes").fetchone()
+        if oldest is not None and oldest > feed_seq + 1:
+            raise RuntimeError(
+                "change feed was pruned while re-embedding; raise "
+                "memory.change_feed_retention_s and run the job again"
+            )
+        changes = conn.execute(
+            "SELECT memory_id, op FROM memory_changes WHERE seq > ? ORDER BY seq", (feed_seq,)
+        ).fetchall()
+        latest = {int(memory_id): str(op) for memory_id, op in changes}
+        stale = sorted(
+            {memory_id for memory_id, op in latest.items() if op == "upsert"}
+            | {
+                int(row[0])
+                for row in conn.execute(
+                    f"SELECT id FROM memories WHERE {SHADOW_COLUMN} IS NULL"
+                ).fetchall()
+            }
+        )
+        rows = conn.execute(
+            "SELECT id, text FROM memories WHERE id IN (SELECT value FROM json_each(?)) "
+            "ORDER BY id",
+            (json.dumps(stale),),
+        ).fetchall()
+        if rows:
+            blobs = embed_blobs(self._embedder, self._storage, [text for _, text in rows])
+            conn.executemany(
+                f"UPDATE memories SET {SHADOW_COLUMN} = ? WHERE id = ?",
+                zip(blobs, [int(memory_id) for memory_id, _ in rows]),
+            )
+
+        # Renames only touch the schema, so the swap itself is O(changed rows).
+        drop_previous(conn)
+        conn.execute("DROP TRIGGER IF EXISTS memory_changes_au")
+        conn.execute(f"ALTER TABLE memories RENAME COLUMN embedding TO {PREVIOUS_COLUMN}")
+        conn.execute(f"ALTER TABLE memories RENAME COLUMN {SHADOW_COLUMN} TO embedding")
+        conn.execute(EMBEDDING_CHANGE_TRIGGER)
+        conn.execute("INSERT INTO memory_changes (memory_id, op) VALUES (0, ?)", (REEMBED_OP,))
+        conn.execute("DELETE FROM reembed_state")
+        deleted = [memory_id for memory_id, op in latest.items() if op == "delete"]
+        return [int(memory_id) for memory_id, _ in rows], deleted
+
+    def swap(self) -> tuple[list[int], list[int]]:
+        """``swap_in`` on the job's own connection (for offline use)."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = self.swap_in(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            drop_previous(conn)
+            return result
+        finally:
+            conn.close()
+
+    def run(self, progress: Callable[[dict[str, Any]], None] | None = None) -> dict[str, Any]:
+        """fill() then swap(); returns the throughput report."""
+        report = self.fill(progress)
+        reembedded, _ = self.swap()
+        report["caught_up"] = len(reembedded)
+        return report
+
+
+def drop_previous(conn: sqlite3.Connection) -> None:
+    """Drop the pre-swap embedding column, if any (rewrites the table: offline only)."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(memories)")}
+    if PREVIOUS_COLUMN in columns:
+        conn.execute(f"ALTER TABLE memories DROP COLUMN {PREVIOUS_COLUMN}")
+
+
+def release_previous(conn: sqlite3.Connection, after_id: int, chunk_size: int) -> int | None:
+    """Clear the pre-swap embeddings of the next ``chunk_size`` ids after ``after_id``.
+
+    Returns the last id cleared, or None once nothing is left. The emptied
+    column is then renamed to the shadow column for the next job to reuse,
+    so unlike ``drop_previous`` no step rewrites the table.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(memories)")}
+    if PREVIOUS_COLUMN not in columns:
+        return None
+    (last,) = conn.execute(
+        "SELECT MAX(id) FROM (SELECT id FROM memories WHERE id > ? ORDER BY id LIMIT ?)",
+        (after_id, max(chunk_size, 1)),
+    ).fetchone()
+    if last is not None:
+        conn.execute(
+            f"UPDATE memories SET {PREVIOUS_COLUMN} = NULL "
+            f"WHERE id > ? AND id <= ? AND {PREVIOUS_COLUMN} IS NOT NULL",
+            (after_id, last),
+        )
+        return int(last)
+    if SHADOW_COLUMN in columns:
+        # A newer job already made its own shadow column.
+        drop_previous(conn)
+    else:
+        conn.execute(f"ALTER TABLE memories RENAME COLUMN {PREVIOUS_COLUMN} TO {SHADOW_COLUMN}")
+    return None
+
+
+def _throughput(rows: int, start: float, **extra: Any) -> dict[str, Any]:
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_s": round(rows / max(seconds, 1e-9), 1),
+        **extra,
+    }
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    from asi.config import load_config
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--config", type=Path, default=Path("configs"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--fill-only", action="store_true", help="embed but do not swap yet")
+    args = parser.parse_args(argv)
+
+    memory_cfg = load_config(args.config)["memory"]
+    db_path = Path(str(memory_cfg.get("db_path", "./data/memory/memory.db")))
+    storage = str(memory_cfg.get("embedding_storage", "float32"))
+    if memory_cfg.get("index_engine") == "sparse":
+        storage = "sparse"
+    job = ReembedJob(
+        db_path,
+        HashEmbedder(dim=int(memory_cfg.get("embedding_dim", 384))),
+        storage=storage,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+    )
+
+    def report(progress: dict[str, Any]) -> None:
+        print(json.dumps(progress), file=sys.stderr)
+
+    result = job.fill(report) if args.fill_only else job.run(report)
+    if not args.fill_only:
+        # The cached index and cold segment hold the old vectors; stores
+        # rebuild both on startup.
+        stale = [db_path.with_name(db_path.name + ".cold")]
+        if memory_cfg.get("cold_path"):
+            stale = [Path(str(memory_cfg["cold_path"]))]
+        stale.append(stale[0].with_name(stale[0].name + ".lock"))
+        index_path = memory_cfg.get("index_path")
+        if index_path:
+            stale += [Path(str(index_path)), Path(f"{index_path}.meta.json")]
+        for path in stale:
+            path.unlink(missing_ok=True)
+    print(json.dumps(result, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
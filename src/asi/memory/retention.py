@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from asi.memory.store import MemoryStore
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Caps applied by ``maintain()``; a value of 0 disables that cap."""
+
+    max_rows: int = 0
+    max_age_days: float = 0.0
+    session_quota: int = 0
+    consolidate_after_days: float = 0.0
+    consolidate_similarity: float = 0.85
+    consolidate_min_cluster: int = 3
+    consolidate_batch: int = 512
+    consolidate_max_chars: int = 2000
+
+    @classmethod
+    def from_config(cls, memory_cfg: dict[str, Any]) -> RetentionPolicy:
+        cfg, defaults = memory_cfg, cls()
+        return cls(
+            max_rows=int(cfg.get("retention_max_rows", defaults.max_rows)),
+            max_age_days=float(cfg.get("retention_max_age_days", defaults.max_age_days)),
+            session_quota=int(cfg.get("retention_session_quota", defaults.session_quota)),
+            consolidate_after_days=float(
+                cfg.get("consolidate_after_days", defaults.consolidate_after_days)
+            ),
+            consolidate_similarity=float(
+                cfg.get("consolidate_similarity", defaults.consolidate_similarity)
+            ),
+            consolidate_min_cluster=max(
+                int(cfg.get("consolidate_min_cluster", defaults.consolidate_min_cluster)), 2
+            ),
+            consolidate_batch=max(int(cfg.get("consolidate_batch", defaults.consolidate_batch)), 2),
+            consolidate_max_chars=int(
+                cfg.get("consolidate_max_chars", defaults.consolidate_max_chars)
+            ),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(
+            self.max_rows or self.max_age_days or self.session_quota or self.consolidate_after_days
+        )
+
+
+def select_evictions(
+    sessions: Sequence[str | None],
+    scores: npt.ArrayLike,
+    created_at: npt.ArrayLike,
+    policy: RetentionPolicy,
+    *,
+    now: float,
+) -> npt.NDArray[np.bool_]:
+    """Mask of rows to evict: too old, over their session quota, or over max_rows.
+
+    Quotas keep the highest-``scores`` rows (see scoring.retention_scores).
+    """
+    score_arr = np.asarray(scores, dtype=np.float64)
+    evict = np.zeros(len(score_arr), dtype=bool)
+    if len(score_arr) == 0:
+        return evict
+    if policy.max_age_days > 0:
+        evict |= np.asarray(created_at, dtype=np.float64) < now - policy.max_age_days * 86_400.0
+
+    if policy.session_quota > 0:
+        # Prefix real ids so a NULL session never collides with session "".
+        keys = np.asarray(["" if s is None else f"s:{s}" for s in sessions])
+        _, codes = np.unique(keys, return_inverse=True)
+        # Rank rows within their session, best score first.
+        order = np.lexsort((-score_arr, codes))
+        grouped = codes[order]
+        starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+        rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        evict[order[rank >= policy.session_quota]] = True
+
+    if policy.max_rows > 0:
+        survivors = np.flatnonzero(~evict)
+        if len(survivors) > policy.max_rows:
+            ranked = survivors[np.argsort(-score_arr[survivors], kind="stable")]
+            evict[ranked[policy.max_rows :]] = True
+    return evict
+
+
+def cluster_similar(
+    embeddings: npt.NDArray[np.float32], threshold: float, min_size: int
+) -> list[npt.NDArray[np.int64]]:
+    """Greedy leader clustering by cosine similarity; only clusters >= ``min_size``."""
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    unit = np.divide(embeddings, norms, out=np.zeros_like(embeddings), where=norms > 0)
+    similar = (unit @ unit.T) >= threshold
+    free = norms[:, 0] > 0
+    clusters: list[npt.NDArray[np.int64]] = []
+    for leader in range(len(unit)):
+        if not free[leader]:
+            continue
+        members = np.flatnonzero(similar[leader] & free)
+        if len(members) >= min_size:
+            clusters.append(members)
+            free[members] = False
+    return clusters
+
+
+class MaintenanceJob:
+    """Runs ``store.maintain()`` every ``interval_s`` seconds on a daemon thread."""
+
+    def __init__(self, store: MemoryStore, interval_s: float) -> None:
+        self._store = store
+        self._interval = interval_s
+        self._stop = threading.Event()
+        self.last_report: dict[str, int] = {}
+        self.last_error: Exception | None = None
+        self._thread = threading.Thread(
+            target=self._run, name="asi-memory-maintenance", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                self.last_report = self._store.maintain()
+            except Exception as exc:  # keep the job alive; surfaced via last_error
+                self.last_error = exc
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+
+@dataclass(frozen=True)
+class ScoreWeights:
+    similarity: float = 0.5
+    salience: float = 0.25
+    recency: float = 0.2
+    valence: float = 0.05
+
+    @classmethod
+    def from_config(cls, memory_cfg: dict[str, Any]) -> ScoreWeights:
+        defaults = cls()
+        return cls(
+            similarity=float(memory_cfg.get("weight_similarity", defaults.similarity)),
+            salience=float(memory_cfg.get("weight_salience", defaults.salience)),
+            recency=float(memory_cfg.get("weight_recency", defaults.recency)),
+            valence=float(memory_cfg.get("weight_valence", defaults.valence)),
+        )
+
+
+def recency_decay(
+    created_at: npt.ArrayLike, *, now: float, half_life_days: float
+) -> npt.NDArray[np.float64]:
+    """Exponential decay in [0, 1] that halves every ``half_life_days``."""
+    age_days = np.maximum((now - np.asarray(created_at, dtype=np.float64)) / 86_400.0, 0.0)
+    decay: npt.NDArray[np.float64] = np.exp(-math.log(2) * age_days / max(half_life_days, 0.1))
+    return decay
+
+
+def retention_scores(
+    salience: npt.ArrayLike,
+    created_at: npt.ArrayLike,
+    *,
+    now: float,
+    half_life_days: float,
+    weights: ScoreWeights,
+) -> npt.NDArray[np.float64]:
+    """Query-independent part of the score: what a memory is worth keeping."""
+    recency = recency_decay(created_at, now=now, half_life_days=half_life_days)
+    scores: npt.NDArray[np.float64] = (
+        weights.salience * np.asarray(salience, dtype=np.float64) + weights.recency * recency
+    )
+    return scores
+
+
+def score_candidates(
+    relevance: npt.ArrayLike,
+    salience: npt.ArrayLike,
+    valence: npt.ArrayLike,
+    created_at: npt.ArrayLike,
+    *,
+    now: float,
+    half_life_days: float,
+    weights: ScoreWeights,
+    target_valence: float | None = None,
+) -> npt.NDArray[np.float64]:
+    """Score all candidates in one vectorized pass; higher is better.
+
+    ``relevance`` is the query match in [0, 1] (cosine similarity for vector
+    retrieval, normalized fusion score for lexical/hybrid).
+    """
+    relevance_arr = np.clip(np.asarray(relevance, dtype=np.float64), 0.0, 1.0)
+    scores = weights.similarity * relevance_arr + retention_scores(
+        salience, created_at, now=now, half_life_days=half_life_days, weights=weights
+    )
+    if target_valence is not None:
+        distance = np.abs(float(target_valence) - np.asarray(valence, dtype=np.float64))
+        scores += weights.valence * (1.0 - np.minimum(distance, 1.0))
+    return scores
+
+
+def rank_top_k(scores: npt.NDArray[np.float64], k: int) -> npt.NDArray[np.int64]:
+    """Indices of the ``k`` best scores, best first (ties keep input order)."""
+    return np.argsort(-scores, kind="stable")[:k]
+
+
+def mmr_rank(
+    scores: npt.NDArray[np.float64],
+    embeddings: npt.ArrayLike,
+    k: int,
+    lambda_: float,
+) -> npt.NDArray[np.int64]:
+    """Indices of ``k`` candidates picked by maximal marginal relevance, in pick order.
+
+    Each step takes the candidate maximizing
+    ``lambda_ * score - (1 - lambda_) * max cosine similarity to the picks so far``,
+    so near-duplicates of an earlier pick drop back. ``lambda_ = 1`` is
+    plain ``rank_top_k``. Pairwise similarities are one matrix product.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    unit = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    similarity = (unit @ unit.T).astype(np.float64)
+
+    relevance = lambda_ * np.asarray(scores, dtype=np.float64)
+    redundancy = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    order = np.empty(k, dtype=np.int64)
+    for step in range(k):
+        marginal = np.where(available, relevance - (1.0 - lambda_) * redundancy, -np.inf)
+        best = int(np.argmax(marginal))
+        order[step] = best
+        available[best] = False
+        row = similarity[best]
+        redundancy = row if step == 0 else np.maximum(redundancy, row)
+    return order
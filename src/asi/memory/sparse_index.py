@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+from typing import Callable, Sequence, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+
+# Rewrite the postings once overwritten rows outnumber the rows still in use.
+_VACUUM_RATIO = 1.0
+
+_T = TypeVar("_T", bound=np.generic)
+
+
+class _Postings:
+    """Growable (row, value) arrays for one bucket."""
+
+    __slots__ = ("rows", "values", "size")
+
+    def __init__(self) -> None:
+        self.rows = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0, dtype=np.float32)
+        self.size = 0
+
+    def extend(self, rows: npt.NDArray[np.int64], values: npt.NDArray[np.float32]) -> None:
+        needed = self.size + len(rows)
+        if needed > len(self.rows):
+            capacity = max(needed, 2 * len(self.rows), 16)
+            self.rows = np.resize(self.rows, capacity)
+            self.values = np.resize(self.values, capacity)
+        self.rows[self.size : needed] = rows
+        self.values[self.size : needed] = values
+        self.size = needed
+
+
+class SparseVectorIndex:
+    """Exact cosine index over sparse vectors, searched through an inverted index.
+
+    Built for HashEmbedder output, which has at most one non-zero bucket per
+    distinct token. Each row keeps only its non-zero (bucket, value) pairs
+    and every bucket a postings list of the rows using it, so a query only
+    touches the postings of its own buckets instead of scoring every row
+    densely.
+
+    Speaks the hnswlib-style API of FlatVectorIndex so HNSWVectorIndex can
+    drive it. ``add_items`` takes dense vectors and keeps their non-zeros;
+    re-adding a label replaces its row.
+    """
+
+    def __init__(self, dim: int, initial_capacity: int = 1024) -> None:
+        self.dim = dim
+        self._max_elements = max(initial_capacity, 1)
+        self._reset()
+
+    def _reset(self) -> None:
+        self._postings = [_Postings() for _ in range(self.dim)]
+        # Row r's non-zeros are _indices/_values[_starts[r] : _starts[r + 1]].
+        self._indices = np.empty(0, dtype=np.int64)
+        self._values = np.empty(0, dtype=np.float32)
+        self._nnz = 0
+        self._starts = np.zeros(1, dtype=np.int64)
+        self._row_ids = np.empty(0, dtype=np.int64)
+        # 0 = live, 1 = tombstoned (mark_deleted), 2 = replaced by a newer row.
+        self._state = np.empty(0, dtype=np.int8)
+        self._row_count = 0
+        self._rows: dict[int, int] = {}
+
+    def get_current_count(self) -> int:
+        """Number of labels held, tombstones included (as in hnswlib)."""
+        return len(self._rows)
+
+    def get_max_elements(self) -> int:
+        return max(self._max_elements, len(self._rows))
+
+    def resize_index(self, new_size: int) -> None:
+        if new_size < len(self._rows):
+            raise ValueError("cannot shrink below the current element count")
+        self._max_elements = new_size
+
+    def set_ef(self, ef: int) -> None:
+        """No-op: search is exact."""
+
+    @property
+    def nnz(self) -> int:
+        """Stored non-zeros, replaced rows included until the next vacuum."""
+        return self._nnz
+
+    def get_ids_list(self) -> list[int]:
+        return list(self._rows)
+
+    def get_items(self, ids: Sequence[int]) -> npt.NDArray[np.float32]:
+        out = np.zeros((len(ids), self.dim), dtype=np.float32)
+        for i, label in enumerate(ids):
+            row = self._rows.get(int(label))
+            if row is None:
+                raise KeyError("label not found in index")
+            start, stop = self._starts[row], self._starts[row + 1]
+            out[i, self._indices[start:stop]] = self._values[start:stop]
+        return out
+
+    def _append_rows(
+        self,
+        labels: npt.NDArray[np.int64],
+        row_index: npt.NDArray[np.int64],
+        buckets: npt.NDArray[np.int64],
+        values: npt.NDArray[np.float32],
+    ) -> npt.NDArray[np.int64]:
+        """Append rows given as COO triples sorted by ``row_index``; return their rows."""
+        first = self._row_count
+        rows = np.arange(first, first + len(labels), dtype=np.int64)
+        counts = np.bincount(row_index, minlength=len(labels))
+
+        self._row_ids = _grow(self._row_ids, self._row_count + len(labels))
+        self._state = _grow(self._state, self._row_count + len(labels))
+        self._starts = _grow(self._starts, self._row_count + len(labels) + 1)
+        self._indices = _grow(self._indices, self._nnz + len(buckets))
+        self._values = _grow(self._values, self._nnz + len(buckets))
+
+        self._row_ids[first : first + len(labels)] = labels
+        self._state[first : first + len(labels)] = 0
+        self._starts[first + 1 : first + len(labels) + 1] = self._nnz + np.cumsum(counts)
+        self._indices[self._nnz : self._nnz + len(buckets)] = buckets
+        self._values[self._nnz : self._nnz + len(buckets)] = values
+        self._nnz += len(buckets)
+        self._row_count += len(labels)
+
+        if len(buckets) == 0:
+            # All-zero rows (e.g. whitespace-only text) have no postings.
+            return rows
+        global_rows = rows[row_index]
+        order = np.argsort(buckets, kind="stable")
+        sorted_buckets = buckets[order]
+        bounds = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1], True])
+        for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            picked = order[lo:hi]
+            self._postings[int(sorted_buckets[lo])].extend(global_rows[picked], values[picked])
+        return rows
+
+    def add_items(self, data: npt.ArrayLike, ids: Sequence[int] | npt.NDArray[np.int64]) -> None:
+        vectors = np.atleast_2d(np.asarray(data, dtype=np.float32))
+        labels = np.asarray(ids, dtype=np.int64)
+        if vectors.shape != (len(labels), self.dim):
+            raise ValueError("embedding batch shape does not match ids/dim")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+        # Within one batch the last vector for a label wins, as with repeated adds.
+        _, last = np.unique(labels[::-1], return_index=True)
+        keep = np.sort(len(labels) - 1 - last)
+        labels, vectors = labels[keep], vectors[keep]
+
+        row_index, buckets = np.nonzero(vectors)
+        rows = self._append_rows(labels, row_index, buckets, vectors[row_index, buckets])
+        for label, row in zip(labels.tolist(), rows.tolist()):
+            old = self._rows.get(label)
+            if old is not None:
+                self._state[old] = 2
+            self._rows[label] = row
+        if self._row_count - len(self._rows) > _VACUUM_RATIO * max(len(self._rows), 1):
+            self._vacuum()
+
+    def _vacuum(self) -> None:
+        """Drop replaced rows and rebuild the postings from the rows in use."""
+        labels = list(self._rows)
+        old_rows = np.asarray([self._rows[label] for label in labels], dtype=np.int64)
+        tombstoned = self._state[old_rows] == 1
+        starts, stops = self._starts[old_rows], self._starts[old_rows + 1]
+        lengths = stops - starts
+        row_index = np.repeat(np.arange(len(labels), dtype=np.int64), lengths)
+        offsets = np.arange(int(lengths.sum()), dtype=np.int64) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        positions = np.repeat(starts, lengths) + offsets
+        buckets, values = self._indices[positions], self._values[positions]
+
+        self._reset()
+        rows = self._append_rows(np.asarray(labels, dtype=np.int64), row_index, buckets, values)
+        self._rows = dict(zip(labels, rows.tolist()))
+        self._state[rows[tombstoned]] = 1
+
+    def mark_deleted(self, label: int) -> None:
+        row = self._rows.get(int(label))
+        if row is None or self._state[row] != 0:
+            raise RuntimeError(f"label {label} is not present or already deleted")
+        self._state[row] = 1
+
+    def unmark_deleted(self, label: int) -> None:
+        row = self._rows.get(int(label))
+        if row is None or self._state[row] != 1:
+            raise RuntimeError(f"label {label} is not deleted")
+        self._state[row] = 0
+
+    def _similarities(self, query: npt.NDArray[np.float32]) -> npt.NDArray[np.float64]:
+        """Dot products with every row, accumulated from the query's postings only."""
+        (buckets,) = np.nonzero(query)
+        parts = [self._postings[b] for b in buckets.tolist()]
+        if not parts:
+            return np.zeros(self._row_count)
+        rows = np.concatenate([p.rows[: p.size] for p in parts])
+        contrib = np.concatenate([p.values[: p.size] * query[b] for p, b in zip(parts, buckets)])
+        scores = np.bincount(rows, weights=contrib, minlength=self._row_count)
+        return np.asarray(scores, dtype=np.float64)
+
+    def knn_query(
+        self, data: npt.ArrayLike, k: int = 1, filter: Callable[[int], bool] | None = None
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]:
+        """Return (labels, cosine distances), one row per query, best first.
+
+        Rows sharing no bucket with a query score 0, so they still fill k.
+        """
+        queries = np.atleast_2d(np.asarray(data, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = np.divide(queries, norms, out=np.zeros_like(queries), where=norms > 0)
+        n = self._row_count
+        allowed = self._state[:n] == 0
+        if filter is not None:
+            (candidates,) = np.nonzero(allowed)
+            keep = np.fromiter(
+                (filter(int(label)) for label in self._row_ids[candidates]),
+                dtype=bool,
+                count=len(candidates),
+            )
+            allowed[candidates[~keep]] = False
+        k = min(k, int(allowed.sum()))
+        labels = np.empty((len(queries), max(k, 0)), dtype=np.int64)
+        sims = np.empty((len(queries), max(k, 0)), dtype=np.float32)
+        if k <= 0:
+            return labels, sims
+        for i, query in enumerate(queries):
+            scores = self._similarities(query)
+            scores[~allowed] = -np.inf
+            top = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+            top = top[np.argsort(-scores[top], kind="stable")][:k]
+            labels[i] = self._row_ids[top]
+            sims[i] = scores[top]
+        return labels, 1.0 - sims
+
+
+def _grow(array: npt.NDArray[_T], needed: int) -> npt.NDArray[_T]:
+    if needed <= len(array):
+        return array
+    return np.resize(array, max(needed, 2 * len(array)))
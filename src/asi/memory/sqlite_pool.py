@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import itertools
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+# (fn, future, transactional)
+WriteJob = tuple[Callable[[sqlite3.Connection], Any], "Future[Any]", bool]
+
+
+class SQLiteConnectionPool:
+    """WAL-mode SQLite access: per-thread readers and one group-commit writer.
+
+    Readers are lazily opened per thread and marked ``query_only``. Writes are
+    queued to a single writer thread, which drains whatever piled up while the
+    previous commit was in flight (up to ``max_batch`` jobs, optionally waiting
+    ``max_wait_ms`` for stragglers) and runs it in one transaction. Every job
+    gets its own savepoint, so a failing job only rolls back itself; callers
+    block until the group is committed. Jobs submitted with
+    ``transaction=False`` (e.g. VACUUM) run alone, outside any transaction.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        synchronous: str = "NORMAL",
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_size_kb: int = 65_536,
+        busy_timeout_ms: int = 5_000,
+        max_batch: int = 256,
+        max_wait_ms: float = 0.0,
+    ) -> None:
+        self._db_path = db_path
+        self._pragmas = [
+            f"PRAGMA busy_timeout = {int(busy_timeout_ms)}",
+            f"PRAGMA synchronous = {synchronous}",
+            f"PRAGMA mmap_size = {int(mmap_size)}",
+            f"PRAGMA cache_size = {-int(cache_size_kb)}",
+            "PRAGMA temp_store = MEMORY",
+        ]
+        self._max_batch = max(max_batch, 1)
+        self._max_wait = max(max_wait_ms, 0.0) / 1000.0
+
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+        self.writer = self._connect()
+        # Only takes effect on a new database; existing ones keep their mode.
+        self.writer.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.writer.execute("PRAGMA journal_mode = WAL")
+        self._jobs: queue.Queue[WriteJob | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self.commits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Transactions are managed explicitly; connections never cross threads
+        # except the writer (handed to its thread) and shutdown in close().
+        conn = sqlite3.connect(self._db_path, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in self._pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def start(self) -> None:
+        """Start the writer thread; before this, ``writer`` may be used directly."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._writer_loop, name="asi-sqlite-writer", daemon=True
+            )
+            self._thread.start()
+
+    def reader(self) -> sqlite3.Connection:
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only = 1")
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def write(self, fn: Callable[[sqlite3.Connection], T], *, transaction: bool = True) -> T:
+        """Run ``fn`` inside the next group commit and return its result."""
+        if self._thread is None:
+            raise RuntimeError("connection pool writer is not running")
+        future: Future[T] = Future()
+        self._jobs.put((fn, future, transaction))
+        return future.result()
+
+    def _next_group(self, first: WriteJob) -> tuple[list[WriteJob], bool]:
+        """Collect jobs queued behind ``first``; True if shutdown was requested."""
+        group = [first]
+        deadline = time.monotonic() + self._max_wait
+        while len(group) < self._max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    job = self._jobs.get(timeout=remaining)
+                else:
+                    job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return group, True
+            group.append(job)
+        return group, False
+
+    def _writer_loop(self) -> None:
+        while True:
+            first = self._jobs.get()
+            if first is None:
+                return
+            group, stop = self._next_group(first)
+            for transactional, jobs in itertools.groupby(group, key=lambda job: job[2]):
+                if transactional:
+                    self._commit_group(list(jobs))
+                else:
+                    for job in jobs:
+                        self._run_alone(job)
+            if stop:
+                return
+
+    def _run_alone(self, job: WriteJob) -> None:
+        fn, future, _ = job
+        try:
+            result = fn(self.writer)
+        except Exception as exc:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    def _commit_group(self, group: list[WriteJob]) -> None:
+        conn = self.writer
+        results: list[tuple[Future[Any], Any, BaseException | None]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, future, _ in group:
+                conn.execute("SAVEPOINT job")
+                try:
+                    result = fn(conn)
+                except Exception as exc:  # surfaced to the caller below
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    results.append((future, None, exc))
+                else:
+                    conn.execute("RELEASE job")
+                    results.append((future, result, None))
+            conn.execute("COMMIT")
+            self.commits += 1
+        except Exception as exc:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [(future, None, exc) for _, future, _ in group]
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._jobs.put(None)
+            self._thread.join()
+            self._thread = None
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        self.writer.close()
@@ -1,9 +1,25 @@
 from __future__ import annotations
 
-from typing import Any, Protocol
+from typing import Any, Iterator, Protocol, Sequence
 
 
 class MemoryStore(Protocol):
     def store(self, record: dict[str, Any]) -> int: ...
 
+    def store_many(self, records: Sequence[dict[str, Any]]) -> list[int]: ...
+
     def retrieve(self, query: str, k: int, **filters: Any) -> list[dict[str, Any]]: ...
+
+    def iter_records(
+        self, batch_size: int = 500, after_id: int = 0, **filters: Any
+    ) -> Iterator[dict[str, Any]]:
+        """Stream every record with id > ``after_id`` matching ``filters``, by id.
+
+        Backends page with keyset pagination (``batch_size`` rows at a time),
+        so exports run in constant memory however large the store is.
+        """
+        ...
+
+    def maintain(self, now: float | None = None) -> dict[str, int]:
+        """Apply the retention policy; returns counts of what was changed."""
+        ...
@@ -1,20 +1,249 @@
 from __future__ import annotations
 
-from typing import Any
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Any, Iterator, Sequence
 
+import numpy as np
+
+from asi.memory.embedder import Embedder, HashEmbedder
+from asi.memory.retention import RetentionPolicy, select_evictions
+from asi.memory.scoring import (
+    ScoreWeights,
+    mmr_rank,
+    rank_top_k,
+    retention_scores,
+    score_candidates,
+)
 from asi.memory.store import MemoryStore
+from asi.memory.vector_index import HNSWVectorIndex
 
 
 class MemoryStoreMemory(MemoryStore):
-    def __init__(self) -> None:
-        self._records: list[dict[str, Any]] = []
+    """In-process store: no disk I/O, bounded per-session ring buffers.
+
+    Records live in a dict, vectors in an in-RAM index, and each session
+    keeps at most ``memory.session_capacity`` memories (0 = unbounded); the
+    oldest one is dropped when a full session receives a new memory.
+    Retrieval uses the same filters and scoring as SQLiteMemoryStore in
+    vector mode.
+    """
+
+    def __init__(
+        self, config: dict[str, Any] | None = None, embedder: Embedder | None = None
+    ) -> None:
+        memory_cfg = (config or {}).get("memory", {})
+        self._dim = int(memory_cfg.get("embedding_dim", 384))
+        self._embedder: Embedder = embedder or HashEmbedder(dim=self._dim)
+        self._half_life_days = float(memory_cfg.get("recency_half_life_days", 7))
+        self._weights = ScoreWeights.from_config(memory_cfg)
+        self._retention = RetentionPolicy.from_config(memory_cfg)
+        self._capacity = int(memory_cfg.get("session_capacity", 1000))
+        self._mmr = bool(memory_cfg.get("mmr", False))
+        self._mmr_lambda = float(memory_cfg.get("mmr_lambda", 0.7))
+        self._mmr_pool_size = int(memory_cfg.get("mmr_pool_size", 30))
+        self._index = HNSWVectorIndex(
+            dim=self._dim,
+            max_elements=max(self._capacity, 1024),
+            ef_construction=int(memory_cfg.get("ef_construction", 200)),
+            m=int(memory_cfg.get("M", 16)),
+            ef_search=int(memory_cfg.get("ef_search", 50)),
+            growth_factor=float(memory_cfg.get("index_growth_factor", 2.0)),
+            compact_threshold=float(memory_cfg.get("index_compact_threshold", 0.25)),
+            sparse=memory_cfg.get("index_engine") == "sparse",
+        )
+        self._records: dict[int, dict[str, Any]] = {}
+        # Live ids in ascending order, for paging by id.
+        self._ids: list[int] = []
+        self._sessions: dict[str | None, deque[int]] = {}
+        self._last_id = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _prepare_record(record: dict[str, Any]) -> dict[str, Any]:
+        text = str(record.get("text") or record.get("content") or "")
+        if not text:
+            raise ValueError("memory record requires non-empty text/content")
+        metadata = record.get("metadata", {})
+        session_id = record.get("session_id")
+        if session_id is None and isinstance(metadata, dict):
+            session_id = metadata.get("session_id")
+        return {
+            "type": str(record.get("type", "episode")),
+            "text": text,
+            "created_at": float(record.get("created_at", time.time())),
+            "salience": float(record.get("salience", 0.5)),
+            "valence": float(record.get("valence", 0.0)),
+            "metadata": metadata,
+            "session_id": None if session_id is None else str(session_id),
+        }
 
     def store(self, record: dict[str, Any]) -> int:
-        self._records.append(record)
-        return len(self._records)
+        return self.store_many([record])[0]
+
+    def store_many(self, records: Sequence[dict[str, Any]]) -> list[int]:
+        if not records:
+            return []
+        prepared = [self._prepare_record(record) for record in records]
+        embeddings = self._embedder.embed_batch([row["text"] for row in prepared])
+        if embeddings.shape != (len(prepared), self._dim):
+            raise ValueError("embedder output dimension mismatch")
+
+        with self._lock:
+            ids = list(range(self._last_id + 1, self._last_id + 1 + len(prepared)))
+            self._last_id = ids[-1]
+            self._index.add_batch(ids, embeddings)
+            # New ids exceed every stored one, so appending keeps the order.
+            self._ids.extend(ids)
+            for memory_id, row in zip(ids, prepared):
+                self._records[memory_id] = row
+                ring = self._sessions.setdefault(row["session_id"], deque())
+                ring.append(memory_id)
+                if self._capacity > 0 and len(ring) > self._capacity:
+                    self._drop(ring.popleft())
+        return ids
+
+    def _drop(self, memory_id: int) -> None:
+        if self._records.pop(memory_id, None) is not None:
+            del self._ids[bisect.bisect_left(self._ids, memory_id)]
+        self._index.remove(memory_id)
+
+    def delete(self, memory_id: int) -> bool:
+        with self._lock:
+            record = self._records.get(memory_id)
+            if record is None:
+                return False
+            self._sessions[record["session_id"]].remove(memory_id)
+            self._drop(memory_id)
+            return True
+
+    def _matching_ids(self, filters: dict[str, Any]) -> list[int] | None:
+        """Ids satisfying the SQLite backend's filters; None when unfiltered."""
+        session_id = filters.get("session_id")
+        memory_type = filters.get("type")
+        after = filters.get("created_after")
+        before = filters.get("created_before")
+        if session_id is None and memory_type is None and after is None and before is None:
+            return None
+        if session_id is not None:
+            candidates: Sequence[int] = self._sessions.get(str(session_id), ())
+        else:
+            candidates = self._ids
+        return [
+            memory_id
+            for memory_id in candidates
+            if self._matches(self._records[memory_id], filters)
+        ]
+
+    @staticmethod
+    def _matches(row: dict[str, Any], filters: dict[str, Any]) -> bool:
+        session_id = filters.get("session_id")
+        memory_type = filters.get("type")
+        after = filters.get("created_after")
+        before = filters.get("created_before")
+        if session_id is not None and row["session_id"] != str(session_id):
+            return False
+        if memory_type is not None and row["type"] != str(memory_type):
+            return False
+        if after is not None and row["created_at"] < float(after):
+            return False
+        return before is None or row["created_at"] < float(before)
 
     def retrieve(self, query: str, k: int, **filters: Any) -> list[dict[str, Any]]:
-        _ = (query, filters)
         if k <= 0:
             return []
-        return self._records[-k:]
+        n = max(self._mmr_pool_size, k) if self._mmr else max(k * 3, k)
+        query_embedding = self._embedder.embed_batch([query])[0]
+        with self._lock:
+            allowed = self._matching_ids(filters)
+            if allowed is not None and not allowed:
+                return []
+            pairs = self._index.search_with_distances(
+                query_embedding, n, None if allowed is None else set(allowed)
+            )
+            candidates = [
+                (memory_id, self._records[memory_id])
+                for memory_id, _ in pairs
+                if memory_id in self._records
+            ]
+            embeddings = (
+                self._index.get_vectors([memory_id for memory_id, _ in candidates])
+                if self._mmr and candidates
+                else None
+            )
+        if not candidates:
+            return []
+
+        similarity = {memory_id: 1.0 - distance for memory_id, distance in pairs}
+        target_valence = filters.get("valence")
+        scores = score_candidates(
+            [similarity[memory_id] for memory_id, _ in candidates],
+            [row["salience"] for _, row in candidates],
+            [row["valence"] for _, row in candidates],
+            [row["created_at"] for _, row in candidates],
+            now=time.time(),
+            half_life_days=self._half_life_days,
+            weights=self._weights,
+            target_valence=None if target_valence is None else float(target_valence),
+        )
+        if embeddings is None:
+            return [self._to_record(*candidates[i]) for i in rank_top_k(scores, k)]
+        order = mmr_rank(scores, embeddings, k, self._mmr_lambda)
+        return [self._to_record(*candidates[i]) for i in order]
+
+    def iter_records(
+        self, batch_size: int = 500, after_id: int = 0, **filters: Any
+    ) -> Iterator[dict[str, Any]]:
+        batch_size = max(batch_size, 1)
+        cursor = after_id
+        while True:
+            with self._lock:
+                batch: list[dict[str, Any]] = []
+                start = bisect.bisect_right(self._ids, cursor)
+                end = len(self._ids) if filters else min(start + batch_size, len(self._ids))
+                for i in range(start, end):
+                    row = self._records[self._ids[i]]
+                    if self._matches(row, filters):
+                        batch.append(self._to_record(self._ids[i], row))
+                        if len(batch) == batch_size:
+                            break
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            cursor = batch[-1]["id"]
+
+    @staticmethod
+    def _to_record(memory_id: int, row: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "id": memory_id,
+            "type": row["type"],
+            "text": row["text"],
+            "created_at": row["created_at"],
+            "salience": row["salience"],
+            "valence": row["valence"],
+            "metadata": row["metadata"],
+        }
+
+    def maintain(self, now: float | None = None) -> dict[str, int]:
+        """Evict past the retention caps; ring buffers already bound each session."""
+        now = time.time() if now is None else now
+        with self._lock:
+            ids = list(self._records)
+            rows = [self._records[memory_id] for memory_id in ids]
+            created_at = np.asarray([row["created_at"] for row in rows], dtype=np.float64)
+            scores = retention_scores(
+                [row["salience"] for row in rows],
+                created_at,
+                now=now,
+                half_life_days=self._half_life_days,
+                weights=self._weights,
+            )
+            sessions = [row["session_id"] for row in rows]
+            mask = select_evictions(sessions, scores, created_at, self._retention, now=now)
+            for memory_id, evict in zip(ids, mask.tolist()):
+                if evict:
+                    self.delete(memory_id)
+            self._index.compact()
+        return {"consolidated": 0, "merged": 0, "evicted": int(mask.sum()), "vacuumed_pages": 0}
@@ -1,17 +1,63 @@
 from __future__ import annotations
 
+import functools
 import json
 import math
+import re
 import sqlite3
-import struct
+import threading
 import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator, Sequence, TypeVar
 
+import numpy as np
+import numpy.typing as npt
+
+from asi.memory.dedup import DEDUP_MODES, SimHashIndex, from_sqlite, simhash, to_sqlite
 from asi.memory.embedder import Embedder, HashEmbedder
+from asi.memory.quantize import decode_blob_into, encode_blob, validate_storage
+from asi.memory.query_cache import QueryCache
+from asi.memory.reembed import (
+    EMBEDDING_CHANGE_TRIGGER,
+    REEMBED_OP,
+    SHADOW_COLUMN,
+    ReembedJob,
+    release_previous,
+)
+from asi.memory.retention import RetentionPolicy, cluster_similar, select_evictions
+from asi.memory.scoring import (
+    ScoreWeights,
+    mmr_rank,
+    rank_top_k,
+    retention_scores,
+    score_candidates,
+)
+from asi.memory.sqlite_pool import SQLiteConnectionPool
 from asi.memory.store import MemoryStore
 from asi.memory.vector_index import HNSWVectorIndex
 
+T = TypeVar("T")
+
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+INDEX_ENGINES = ("hnsw", "mmap", "sparse")
+_FTS_TOKEN = re.compile(r"\w+")
+# AUTOINCREMENT: ids of deleted rows are never handed out again, so a stale
+# vector or feed entry can never be mistaken for a newer row.
+_MEMORIES_TABLE = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT,
+        text TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        salience REAL DEFAULT 0.5,
+        valence REAL DEFAULT 0.0,
+        metadata TEXT,
+        embedding BLOB,
+        session_id TEXT,
+        simhash INTEGER
+    )
+"""
+
 
 class SQLiteMemoryStore(MemoryStore):
     def __init__(self, config: dict[str, Any], embedder: Embedder | None = None) -> None:
@@ -22,61 +68,625 @@ class SQLiteMemoryStore(MemoryStore):
         self._dim = int(memory_cfg.get("embedding_dim", 384))
         self._embedder: Embedder = embedder or HashEmbedder(dim=self._dim)
         self._half_life_days = float(memory_cfg.get("recency_half_life_days", 7))
+        self._weights = ScoreWeights.from_config(memory_cfg)
+        self._rebuild_chunk_size = max(int(memory_cfg.get("rebuild_chunk_size", 4096)), 1)
+        self._filter_exact_threshold = int(memory_cfg.get("filter_exact_threshold", 2048))
+        self._filter_callback_ratio = float(memory_cfg.get("filter_callback_ratio", 0.1))
+        self._retrieval_mode = str(memory_cfg.get("retrieval_mode", "vector"))
+        if self._retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"memory.retrieval_mode must be one of: {', '.join(RETRIEVAL_MODES)}")
+        self._rrf_k = float(memory_cfg.get("rrf_k", 60))
+        # Optional diversity rerank of the top candidates (see mmr_rank).
+        self._mmr = bool(memory_cfg.get("mmr", False))
+        self._mmr_lambda = float(memory_cfg.get("mmr_lambda", 0.7))
+        self._mmr_pool_size = int(memory_cfg.get("mmr_pool_size", 30))
+
+        self._retention = RetentionPolicy.from_config(memory_cfg)
+        self._cache = QueryCache(
+            max_entries=int(memory_cfg.get("query_cache_size", 1024)),
+            ttl_s=float(memory_cfg.get("query_cache_ttl_s", 60)),
+        )
+        self._storage = validate_storage(str(memory_cfg.get("embedding_storage", "float32")))
+        index_path = memory_cfg.get("index_path")
+        self._index_path = Path(str(index_path)) if index_path else None
+        self._index_engine = str(memory_cfg.get("index_engine", "hnsw"))
+        if self._index_engine not in INDEX_ENGINES:
+            raise ValueError(f"memory.index_engine must be one of: {', '.join(INDEX_ENGINES)}")
+        if self._index_engine == "mmap" and self._index_path is None:
+            raise ValueError("memory.index_engine 'mmap' requires memory.index_path")
+
+        self._index_cfg = memory_cfg
+        self._index = self._new_vector_index(self._dim)
+        # Tiering: the index above holds only hot rows (recent or salient);
+        # the rest live in a memory-mapped cold segment searched on demand.
+        self._hot_days = float(memory_cfg.get("hot_tier_days", 0))
+        self._hot_min_salience = float(memory_cfg.get("hot_tier_min_salience", 0.9))
+        cold_path = memory_cfg.get("cold_path")
+        self._cold_path = (
+            Path(str(cold_path))
+            if cold_path
+            else self._db_path.with_name(self._db_path.name + ".cold")
+        )
+        self._cold: HNSWVectorIndex | None = None
+        # (created_at cutoff, max id) up to which aged-out rows were demoted.
+        self._demoted_through = (0.0, 0)
+        # Held while reembed() swaps embedder and index (see _index_if_current).
+        self._swap_lock = threading.RLock()
+        self._reembedding = False
+
+        # WAL readers per thread; all writes go through one group-commit writer.
+        self._pool = SQLiteConnectionPool(
+            self._db_path,
+            synchronous=str(memory_cfg.get("sqlite_synchronous", "NORMAL")),
+            mmap_size=int(memory_cfg.get("sqlite_mmap_size", 256 * 1024 * 1024)),
+            cache_size_kb=int(memory_cfg.get("sqlite_cache_size_kb", 65_536)),
+            max_batch=int(memory_cfg.get("group_commit_max_batch", 256)),
+            max_wait_ms=float(memory_cfg.get("group_commit_wait_ms", 0.0)),
+        )
+        self._max_indexed_id = 0
+        self._max_id_lock = threading.Lock()
 
-        self._index = HNSWVectorIndex(
-            dim=self._dim,
+        # Change feed: other processes' writes reach this index incrementally.
+        self._feed_poll_s = float(memory_cfg.get("change_feed_poll_s", 1.0))
+        self._feed_retention_s = float(memory_cfg.get("change_feed_retention_s", 86_400))
+        self._feed_lock = threading.Lock()
+        self._feed_polled_at = time.monotonic()
+        self._own_changes: list[tuple[int, int]] = []
+        # Feed seq each uncommitted own write started after; polls stop there.
+        self._writes_in_flight: list[int] = []
+
+        # Near-duplicate suppression: LSH over SimHash signatures of recent rows.
+        self._dedup_mode = str(memory_cfg.get("dedup_mode", "off"))
+        if self._dedup_mode not in DEDUP_MODES:
+            raise ValueError(f"memory.dedup_mode must be one of: {', '.join(DEDUP_MODES)}")
+        self._dedup_max_distance = int(memory_cfg.get("dedup_max_distance", 3))
+        self._dedup_bands = int(memory_cfg.get("dedup_bands", 4))
+        self._dedup: SimHashIndex | None = None
+        if self._dedup_mode != "off":
+            self._dedup = SimHashIndex(
+                window=int(memory_cfg.get("dedup_window", 10_000)),
+                bands=self._dedup_bands,
+                max_distance=self._dedup_max_distance,
+            )
+        self.dedup_stats = {"dropped": 0, "merged": 0}
+
+        self._init_schema()
+        self._change_seq = self._latest_change_seq(self._pool.writer)
+        self._sync_index()
+        self._init_cold_tier()
+        self._load_dedup_window()
+        self._pool.start()
+
+    def _new_vector_index(self, dim: int, cold: bool = False) -> HNSWVectorIndex:
+        """The hot index, or with ``cold`` the cold tier's segment index."""
+        memory_cfg = self._index_cfg
+        mmap_path = self._index_path if self._index_engine == "mmap" else None
+        return HNSWVectorIndex(
+            dim=dim,
             max_elements=int(memory_cfg.get("max_elements", 50_000)),
             ef_construction=int(memory_cfg.get("ef_construction", 200)),
             m=int(memory_cfg.get("M", 16)),
             ef_search=int(memory_cfg.get("ef_search", 50)),
+            growth_factor=float(memory_cfg.get("index_growth_factor", 2.0)),
+            compact_threshold=float(memory_cfg.get("index_compact_threshold", 0.25)),
+            storage=self._storage,
+            mmap_path=self._cold_path if cold else mmap_path,
+            sparse=self._index_engine == "sparse" and not cold,
         )
 
-        self._conn = sqlite3.connect(self._db_path)
-        self._conn.row_factory = sqlite3.Row
-        self._init_schema()
-        self._rebuild_index_from_db()
-
     @property
     def index_rebuilt(self) -> bool:
         return self._index.rebuilt_from_db
 
+    @property
+    def index_loaded(self) -> bool:
+        return self._index.loaded_from_disk
+
+    @property
+    def tier_sizes(self) -> dict[str, int]:
+        """Vectors held by the in-RAM hot index and the on-disk cold segment."""
+        cold = self._cold
+        return {"hot": len(self._index), "cold": 0 if cold is None else len(cold)}
+
+    @property
+    def cache_stats(self) -> dict[str, int]:
+        return self._cache.stats()
+
     def _init_schema(self) -> None:
-        self._conn.execute(
+        # Runs on the writer connection before the writer thread starts.
+        conn = self._pool.writer
+        conn.execute(_MEMORIES_TABLE.format(name="memories"))
+        self._migrate_schema(conn)
+        conn.executescript(
             """
-            CREATE TABLE IF NOT EXISTS memories (
-                id INTEGER PRIMARY KEY,
-                type TEXT,
-                text TEXT NOT NULL,
-                created_at REAL NOT NULL,
-                salience REAL DEFAULT 0.5,
-                valence REAL DEFAULT 0.0,
-                metadata TEXT,
-                embedding BLOB
+            CREATE INDEX IF NOT EXISTS idx_memories_session_created
+                ON memories (session_id, created_at);
+            CREATE INDEX IF NOT EXISTS idx_memories_type_created ON memories (type, created_at);
+            CREATE INDEX IF NOT EXISTS idx_memories_created ON memories (created_at);
+            """
+        )
+        self._fts_enabled = self._init_fts(conn)
+        self._init_change_feed(conn)
+
+    @staticmethod
+    def _init_fts(conn: sqlite3.Connection) -> bool:
+        """Create the FTS5 mirror of memories.text, kept in sync by triggers."""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memories_fts'"
+        ).fetchone()
+        try:
+            conn.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts
+                    USING fts5(text, content='memories', content_rowid='id');
+                CREATE TRIGGER IF NOT EXISTS memories_fts_ai AFTER INSERT ON memories BEGIN
+                    INSERT INTO memories_fts (rowid, text) VALUES (new.id, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS memories_fts_ad AFTER DELETE ON memories BEGIN
+                    INSERT INTO memories_fts (memories_fts, rowid, text)
+                        VALUES ('delete', old.id, old.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS memories_fts_au AFTER UPDATE OF text ON memories
+                BEGIN
+                    INSERT INTO memories_fts (memories_fts, rowid, text)
+                        VALUES ('delete', old.id, old.text);
+                    INSERT INTO memories_fts (rowid, text) VALUES (new.id, new.text);
+                END;
+                """
             )
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: lexical/hybrid retrieval falls back to vector.
+            return False
+        if not exists:
+            conn.execute("INSERT INTO memories_fts (memories_fts) VALUES ('rebuild')")
+        return True
+
+    @staticmethod
+    def _init_change_feed(conn: sqlite3.Connection) -> None:
+        """Log every insert, re-embed and delete so other processes can follow."""
+        conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS memory_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                memory_id INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                created_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+            );
+            CREATE TRIGGER IF NOT EXISTS memory_changes_ai AFTER INSERT ON memories BEGIN
+                INSERT INTO memory_changes (memory_id, op) VALUES (new.id, 'upsert');
+            END;
+            {EMBEDDING_CHANGE_TRIGGER};
+            CREATE TRIGGER IF NOT EXISTS memory_changes_ad AFTER DELETE ON memories BEGIN
+                INSERT INTO memory_changes (memory_id, op) VALUES (old.id, 'delete');
+            END;
             """
         )
-        self._conn.commit()
 
-    def _pack_embedding(self, emb: list[float]) -> bytes:
-        return struct.pack(f"<{len(emb)}f", *emb)
+    @staticmethod
+    def _latest_change_seq(conn: sqlite3.Connection) -> int:
+        (seq,) = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM memory_changes").fetchone()
+        return int(seq)
+
+    def _write(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Run ``fn`` on the writer and remember which feed entries it produced.
+
+        Its entries become visible to readers at commit, before this thread
+        can record them as its own, so a poll meanwhile must not get past
+        them: the write is registered as in flight until it is recorded.
+        """
+        started: list[int] = []
+
+        def logged(conn: sqlite3.Connection) -> tuple[T, int, int]:
+            before = self._latest_change_seq(conn)
+            with self._feed_lock:
+                self._writes_in_flight.append(before)
+            started.append(before)
+            result = fn(conn)
+            return result, before, self._latest_change_seq(conn)
+
+        try:
+            result, before, after = self._pool.write(logged)
+        except BaseException:
+            if started:
+                with self._feed_lock:
+                    self._writes_in_flight.remove(started[0])
+            raise
+        with self._feed_lock:
+            self._writes_in_flight.remove(before)
+            if after > before:
+                self._own_changes.append((before, after))
+        return result
+
+    def poll_changes(self) -> int:
+        """Apply changes committed by other processes since the last poll.
+
+        Returns how many feed entries were applied to the index. A store
+        that fell behind the feed's retention window rebuilds its index.
+        """
+        with self._feed_lock:
+            self._feed_polled_at = time.monotonic()
+            # mmap engine: remap the shared segment if another worker rewrote it.
+            self._index.refresh()
+            if self._cold is not None:
+                self._cold.refresh()
+            conn = self._pool.reader()
+            (oldest, newest) = conn.execute(
+                "SELECT MIN(seq), MAX(seq) FROM memory_changes"
+            ).fetchone()
+            if newest is not None and self._writes_in_flight:
+                # Entries past an unrecorded own write wait for the next poll.
+                newest = min(newest, *self._writes_in_flight)
+            if newest is None or newest <= self._change_seq:
+                return 0
+            if oldest > self._change_seq + 1:
+                self._change_seq = int(newest)
+                self._own_changes = [(lo, hi) for lo, hi in self._own_changes if hi > newest]
+                self._rebuild_index_from_db()
+                self._cache.invalidate()
+                return int(newest) - int(oldest) + 1
+
+            rows = conn.execute(
+                "SELECT seq, memory_id, op FROM memory_changes "
+                "WHERE seq > ? AND seq <= ? ORDER BY seq",
+                (self._change_seq, newest),
+            ).fetchall()
+            own = self._own_changes
+            latest: dict[int, str] = {}
+            for seq, memory_id, op in rows:
+                if not any(lo < seq <= hi for lo, hi in own):
+                    if op == REEMBED_OP:
+                        raise RuntimeError(
+                            "memories were re-embedded by another process; "
+                            "restart this one with the new embedder configuration"
+                        )
+                    latest[int(memory_id)] = str(op)
+            self._change_seq = int(rows[-1][0]) if rows else self._change_seq
+            self._own_changes = [(lo, hi) for lo, hi in own if hi > self._change_seq]
+            if not latest:
+                return 0
+
+            upserts = [memory_id for memory_id, op in latest.items() if op == "upsert"]
+            for memory_id, op in latest.items():
+                if op == "delete":
+                    self._unindex(memory_id)
+            if upserts:
+                where = "id IN (SELECT value FROM json_each(?))"
+                params = (json.dumps(upserts),)
+                for ids, embeddings in self._iter_embedding_chunks(0, where, params):
+                    self._index.add_batch(ids, embeddings)
+                    self._mark_indexed(int(ids[-1]))
+                    if self._cold is not None:
+                        # Re-embedded rows are promoted back to the hot tier.
+                        for memory_id in ids.tolist():
+                            self._cold.remove(memory_id)
+                if self._dedup is not None:
+                    for memory_id, signature, memory_type, session in conn.execute(
+                        "SELECT id, simhash, type, session_id FROM memories "
+                        f"WHERE {where} AND simhash IS NOT NULL ORDER BY id",
+                        params,
+                    ):
+                        scope = (memory_type, session)
+                        self._dedup.add(int(memory_id), from_sqlite(int(signature)), scope)
+            self._cache.invalidate()
+            return len(latest)
 
-    def _unpack_embedding(self, blob: bytes) -> list[float]:
-        if not blob:
-            return [0.0] * self._dim
-        count = len(blob) // 4
-        values = struct.unpack(f"<{count}f", blob)
-        return [float(x) for x in values]
+    def _maybe_poll_changes(self) -> None:
+        if time.monotonic() - self._feed_polled_at >= self._feed_poll_s:
+            self.poll_changes()
+
+    @staticmethod
+    def _migrate_schema(conn: sqlite3.Connection) -> None:
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(memories)")}
+        if "session_id" not in columns:
+            # Older stores kept the session only inside the metadata JSON.
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("ALTER TABLE memories ADD COLUMN session_id TEXT")
+                conn.execute(
+                    "UPDATE memories SET session_id = json_extract(metadata, '$.session_id') "
+                    "WHERE json_valid(metadata)"
+                )
+        if "simhash" not in columns:
+            # Filled for new rows only; older rows are never dedup targets.
+            conn.execute("ALTER TABLE memories ADD COLUMN simhash INTEGER")
+        (table_sql,) = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'memories'"
+        ).fetchone()
+        if "AUTOINCREMENT" not in table_sql.upper():
+            SQLiteMemoryStore._migrate_to_autoincrement(conn)
+
+    @staticmethod
+    def _migrate_to_autoincrement(conn: sqlite3.Connection) -> None:
+        """Copy an older memories table into one with AUTOINCREMENT ids.
+
+        Its triggers are dropped with it and recreated by _init_schema; ids
+        seen in the change feed are never reused either.
+        """
+        columns = ", ".join(row["name"] for row in conn.execute("PRAGMA table_info(memories)"))
+        triggers = [
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'memories'"
+            )
+        ]
+        has_feed = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memory_changes'"
+        ).fetchone()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for trigger in triggers:
+                conn.execute(f'DROP TRIGGER "{trigger}"')
+            conn.execute(_MEMORIES_TABLE.format(name="memories_next"))
+            conn.execute(f"INSERT INTO memories_next ({columns}) SELECT {columns} FROM memories")
+            conn.execute("DROP TABLE memories")
+            conn.execute("ALTER TABLE memories_next RENAME TO memories")
+            high = "COALESCE((SELECT MAX(id) FROM memories), 0)"
+            if has_feed:
+                high = f"MAX({high}, COALESCE((SELECT MAX(memory_id) FROM memory_changes), 0))"
+            # sqlite_sequence has no unique key: update its row, or add one.
+            conn.execute("DELETE FROM sqlite_sequence WHERE name = 'memories'")
+            conn.execute(f"INSERT INTO sqlite_sequence (name, seq) VALUES ('memories', {high})")
+
+    def _pack_embedding(self, emb: npt.NDArray[np.float32]) -> bytes:
+        if self._index_engine == "sparse":
+            return encode_blob(emb, "sparse")
+        return encode_blob(emb, self._storage)
+
+    def _iter_embedding_chunks(
+        self,
+        after_id: int = 0,
+        where: str = "",
+        params: Sequence[Any] = (),
+        *,
+        column: str = "embedding",
+        dim: int | None = None,
+        conn: sqlite3.Connection | None = None,
+    ) -> Iterator[tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]]:
+        """Stream (ids, embeddings) in keyset-paginated chunks.
+
+        Every chunk is decoded into the same preallocated float32 buffer, so
+        consumers must copy what they keep before advancing the iterator.
+        ``where``/``params`` optionally restrict the rows (see _filter_sql);
+        ``column``/``dim`` read another embedding column (see reembed).
+        """
+        extra = f" AND {where}" if where else ""
+        buffer = np.empty((self._rebuild_chunk_size, dim or self._dim), dtype=np.float32)
+        ids = np.empty(self._rebuild_chunk_size, dtype=np.int64)
+        cursor = after_id
+        conn = conn or self._pool.reader()
+        while True:
+            rows = conn.execute(
+                f"SELECT id, {column} FROM memories WHERE id > ? AND {column} IS NOT NULL"
+                f"{extra} ORDER BY id LIMIT ?",
+                (cursor, *params, self._rebuild_chunk_size),
+            ).fetchall()
+            if not rows:
+                return
+            for i, (memory_id, blob) in enumerate(rows):
+                if not decode_blob_into(blob, buffer[i]):
+                    raise ValueError(f"embedding blob size mismatch for memory {memory_id}")
+                ids[i] = memory_id
+            count = len(rows)
+            cursor = int(ids[count - 1])
+            yield ids[:count], buffer[:count]
+
+    def _tier_sql(self, now: float, hot: bool = True) -> tuple[str, tuple[Any, ...]]:
+        """WHERE fragment selecting the hot rows at ``now`` (all rows when untiered)."""
+        if self._hot_days <= 0:
+            return ("", ()) if hot else ("0", ())
+        params = (now - self._hot_days * 86_400.0, self._hot_min_salience)
+        if hot:
+            return "(created_at >= ? OR salience >= ?)", params
+        return "created_at < ? AND salience < ?", params
+
+    def _embedding_chunks_for(
+        self, memory_ids: Sequence[int]
+    ) -> Iterator[tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]]:
+        """Stream the embeddings of ``memory_ids`` (missing rows are skipped)."""
+        for start in range(0, len(memory_ids), self._rebuild_chunk_size):
+            chunk = json.dumps(list(memory_ids[start : start + self._rebuild_chunk_size]))
+            yield from self._iter_embedding_chunks(
+                0, "id IN (SELECT value FROM json_each(?))", (chunk,)
+            )
 
     def _rebuild_index_from_db(self) -> None:
-        rows = self._conn.execute(
-            "SELECT id, embedding FROM memories WHERE embedding IS NOT NULL"
-        ).fetchall()
-        pairs: list[tuple[int, list[float]]] = []
-        for row in rows:
-            pairs.append((int(row["id"]), self._unpack_embedding(row["embedding"])))
-        self._index.build_from_db(pairs)
+        self._max_indexed_id = 0
+        where, params = self._tier_sql(time.time())
+        self._index.build_from_db(
+            self._tracked_chunks(self._iter_embedding_chunks(0, where, params))
+        )
 
-    def store(self, record: dict[str, Any]) -> int:
+    def _tracked_chunks(
+        self, chunks: Iterator[tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]]
+    ) -> Iterator[tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]]:
+        for ids, embeddings in chunks:
+            yield ids, embeddings
+            self._max_indexed_id = max(self._max_indexed_id, int(ids[-1]))
+
+    def _sync_index(self) -> None:
+        """Load the persisted index and replay the change feed after it, or rebuild.
+
+        The saved index records the feed seq it covers, so every insert,
+        re-embed and delete committed since (by any process, including one
+        that crashed before saving) is applied on load. An index whose seq
+        was pruned from the feed, or that predates a re-embed, is rebuilt.
+        """
+        covered = self._index.load(self._index_path) if self._index_path else None
+        if covered is not None:
+            max_id, seq = covered
+            (reembedded,) = (
+                self._pool.reader()
+                .execute(
+                    "SELECT COUNT(*) FROM memory_changes WHERE seq > ? AND op = ?",
+                    (seq, REEMBED_OP),
+                )
+                .fetchone()
+            )
+            if not reembedded and seq <= self._change_seq:
+                self._max_indexed_id = max_id
+                self._change_seq = seq
+                if self.poll_changes():
+                    self.save_index()
+                return
+        self._rebuild_index_from_db()
+        self.save_index()
+
+    def _init_cold_tier(self, rebuild: bool = False) -> None:
+        """Open the cold segment and reconcile both tiers with the database.
+
+        Rows that aged out while no process ran are moved out of a hot index
+        loaded from disk, and the segment gains missing cold rows and drops
+        deleted or promoted ones. With ``rebuild`` (after a re-embed) the
+        segment on disk holds the old model's vectors and is rebuilt instead.
+        """
+        if self._hot_days <= 0:
+            return
+        if rebuild:
+            self._cold_path.unlink(missing_ok=True)
+        now = time.time()
+        where, params = self._tier_sql(now, hot=False)
+        conn = self._pool.reader()
+        (max_id,) = conn.execute("SELECT COALESCE(MAX(id), 0) FROM memories").fetchone()
+        cold_ids = {
+            int(row[0]) for row in conn.execute(f"SELECT id FROM memories WHERE {where}", params)
+        }
+        cold = self._new_vector_index(self._dim, cold=True)
+        if cold.load(self._cold_path) is None:
+            cold.build_from_db(self._iter_embedding_chunks(0, where, params))
+            changed = True
+        else:
+            held = set(cold.labels())
+            promoted = sorted(held - cold_ids)
+            for memory_id in promoted:
+                cold.remove(memory_id)
+            # Still-existing promoted rows (e.g. salience raised) go back to hot.
+            for ids, embeddings in self._embedding_chunks_for(promoted):
+                self._index.add_batch(ids, embeddings)
+            missing = sorted(cold_ids - held)
+            for ids, embeddings in self._embedding_chunks_for(missing):
+                cold.add_batch(ids, embeddings)
+            changed = bool(missing) or cold.tombstones > 0
+        if changed:
+            cold.save(self._cold_path, int(max_id))
+        self._cold = cold
+        self._demoted_through = (now - self._hot_days * 86_400.0, int(max_id))
+        aged_out = [memory_id for memory_id in self._index.labels() if memory_id in cold_ids]
+        for memory_id in aged_out:
+            self._index.remove(memory_id)
+        if aged_out:
+            self.save_index()
+
+    def _demote(self, now: float) -> int:
+        """Move rows that aged out of the hot window into the cold segment.
+
+        Only rows that crossed the age cutoff or were written since the last
+        pass are examined. Each row is added to the cold tier before it leaves
+        the hot index, so a concurrent retrieve always finds it in one of them.
+        """
+        cold = self._cold
+        if cold is None or self._reembedding:
+            return 0
+        cutoff = now - self._hot_days * 86_400.0
+        since, after_id = self._demoted_through
+        conn = self._pool.reader()
+        (max_id,) = conn.execute("SELECT COALESCE(MAX(id), 0) FROM memories").fetchone()
+        candidates = [
+            int(row[0])
+            for row in conn.execute(
+                "SELECT id FROM memories WHERE created_at < ? AND salience < ? "
+                "AND (created_at >= ? OR id > ?) ORDER BY id",
+                (cutoff, self._hot_min_salience, since, after_id),
+            )
+        ]
+        demoted = 0
+        for start in range(0, len(candidates), self._rebuild_chunk_size):
+            chunk = candidates[start : start + self._rebuild_chunk_size]
+            for ids, embeddings in self._embedding_chunks_for(chunk):
+                cold.add_batch(ids, embeddings)
+            demoted += sum(self._index.remove(memory_id) for memory_id in chunk)
+        self._demoted_through = (cutoff, int(max_id))
+        if candidates:
+            cold.save(self._cold_path, int(max_id))
+        return demoted
+
+    def save_index(self) -> bool:
+        if self._index_path is None:
+            return False
+        # Apply other processes' changes first, so the saved feed seq is current
+        # (and the shared mmap segment keeps their rows).
+        self.poll_changes()
+        return self._index.save(self._index_path, self._max_indexed_id, self._change_seq)
+
+    def close(self) -> None:
+        self.save_index()
+        self._pool.close()
+
+    def reembed(
+        self,
+        embedder: Embedder,
+        *,
+        workers: int = 0,
+        chunk_size: int = 512,
+        progress: Callable[[dict[str, Any]], None] | None = None,
+    ) -> dict[str, Any]:
+        """Re-embed every memory with ``embedder`` and switch to it without downtime.
+
+        Until the swap, retrieval and writes keep using the current embedder
+        and index while a ReembedJob fills the shadow column and a new index
+        is built from it. The swap itself is one writer job. Resumable: an
+        interrupted call continues from its checkpoint when repeated.
+        Other processes sharing the DB must restart with the new embedder.
+        """
+        storage = "sparse" if self._index_engine == "sparse" else self._storage
+        # Finish clearing an interrupted job's old column before the swap needs the name.
+        self._release_previous(chunk_size)
+        job = ReembedJob(
+            self._db_path, embedder, storage=storage, chunk_size=chunk_size, workers=workers
+        )
+        self._reembedding = True
+        try:
+            report = job.fill(progress)
+            index = self._new_vector_index(embedder.dim)
+            index.build_from_db(self._iter_embedding_chunks(column=SHADOW_COLUMN, dim=embedder.dim))
+
+            def swap(conn: sqlite3.Connection) -> int:
+                reembedded, deleted = job.swap_in(conn)
+                for memory_id in deleted:
+                    index.remove(memory_id)
+                where = "id IN (SELECT value FROM json_each(?))"
+                chunks = self._iter_embedding_chunks(
+                    0, where, (json.dumps(reembedded),), dim=embedder.dim, conn=conn
+                )
+                for ids, embeddings in chunks:
+                    index.add_batch(ids, embeddings)
+                with self._swap_lock:
+                    self._embedder, self._dim, self._index = embedder, embedder.dim, index
+                    # The cold segment holds old-model vectors; rebuilt below.
+                    self._cold = None
+                return len(reembedded)
+
+            report["caught_up"] = self._write(swap)
+        finally:
+            self._reembedding = False
+        self._cache.invalidate()
+        self._release_previous(chunk_size)
+        self.save_index()
+        self._init_cold_tier(rebuild=True)
+        return report
+
+    def _release_previous(self, chunk_size: int) -> None:
+        """Free the pre-swap embeddings one short writer job per chunk."""
+        after_id: int | None = 0
+        while after_id is not None:
+            after_id = self._pool.write(
+                functools.partial(release_previous, after_id=after_id, chunk_size=chunk_size)
+            )
+
+    def _mark_indexed(self, max_id: int) -> None:
+        with self._max_id_lock:
+            self._max_indexed_id = max(self._max_indexed_id, max_id)
+
+    def _prepare_record(self, record: dict[str, Any]) -> tuple[Any, ...]:
         text = str(record.get("text") or record.get("content") or "")
         if not text:
             raise ValueError("memory record requires non-empty text/content")
@@ -86,66 +696,647 @@ class SQLiteMemoryStore(MemoryStore):
         memory_type = str(record.get("type", "episode"))
         metadata = record.get("metadata", {})
         metadata_json = json.dumps(metadata, sort_keys=True)
+        session_id = record.get("session_id")
+        if session_id is None and isinstance(metadata, dict):
+            session_id = metadata.get("session_id")
+        session = None if session_id is None else str(session_id)
+        return (memory_type, text, created_at, salience, valence, metadata_json, session)
 
-        embedding = self._embedder.embed(text)
-        if len(embedding) != self._dim:
+    def store(self, record: dict[str, Any]) -> int:
+        return self.store_many([record])[0]
+
+    def store_many(self, records: Sequence[dict[str, Any]]) -> list[int]:
+        if not records:
+            return []
+        prepared = [self._prepare_record(record) for record in records]
+        texts = [row[1] for row in prepared]
+        signatures = [simhash(text) for text in texts]
+        existing, in_batch = self._match_duplicates(prepared, signatures)
+        fresh = [i for i in range(len(prepared)) if existing[i] is None and in_batch[i] is None]
+        # Duplicates are never embedded: that is most of the cost of a store.
+        embedder, embeddings = self._embed([texts[i] for i in fresh])
+
+        def insert(conn: sqlite3.Connection) -> tuple[list[int], list[int]]:
+            nonlocal fresh, embedder, embeddings
+            matched = sorted({m for m in existing if m is not None})
+            alive = {
+                int(row[0])
+                for row in conn.execute(
+                    "SELECT id FROM memories WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(matched),),
+                )
+            }
+            # A match deleted since it was indexed is stored after all.
+            revived = [i for i, m in enumerate(existing) if m is not None and m not in alive]
+            if revived or embedder is not self._embedder:
+                # (Or reembed() swapped embedders after we embedded.)
+                fresh = sorted(fresh + revived)
+                embedder, embeddings = self._embed([texts[i] for i in fresh])
+            rows = [
+                (*prepared[i], self._pack_embedding(emb), to_sqlite(signatures[i]))
+                for i, emb in zip(fresh, embeddings)
+            ]
+            new_ids = self._insert_rows(conn, rows) if rows else []
+            ids = [0] * len(prepared)
+            for i, memory_id in zip(fresh, new_ids):
+                ids[i] = memory_id
+            for i in range(len(prepared)):
+                source, earlier = existing[i], in_batch[i]
+                if source not in alive:
+                    source = None if earlier is None else ids[earlier]
+                if source is None:
+                    continue
+                ids[i] = source
+                self._absorb_duplicate(conn, source, prepared[i])
+            return ids, new_ids
+
+        ids, new_ids = self._write(insert)
+        if new_ids:
+            self._index_if_current(embedder, new_ids, embeddings)
+            self._mark_indexed(new_ids[-1])
+            if self._dedup is not None:
+                for i, memory_id in zip(fresh, new_ids):
+                    self._dedup.add(memory_id, signatures[i], (prepared[i][0], prepared[i][6]))
+        self._cache.bump_sessions({row[6] for row in prepared})
+        return ids
+
+    def _match_duplicates(
+        self, prepared: Sequence[tuple[Any, ...]], signatures: Sequence[int]
+    ) -> tuple[list[int | None], list[int | None]]:
+        """Per record: the stored near duplicate's id, or an earlier record in the batch.
+
+        Records only match others of the same type and session.
+        """
+        existing: list[int | None] = [None] * len(prepared)
+        in_batch: list[int | None] = [None] * len(prepared)
+        if self._dedup is None:
+            return existing, in_batch
+        # The batch's own new records, keyed by position, for in-batch matches.
+        batch = SimHashIndex(
+            window=len(prepared), bands=self._dedup_bands, max_distance=self._dedup_max_distance
+        )
+        for i, (row, signature) in enumerate(zip(prepared, signatures)):
+            scope = (row[0], row[6])
+            existing[i] = self._dedup.find(signature, scope)
+            if existing[i] is not None:
+                continue
+            in_batch[i] = batch.find(signature, scope)
+            if in_batch[i] is None:
+                batch.add(i, signature, scope)
+        return existing, in_batch
+
+    def _absorb_duplicate(
+        self, conn: sqlite3.Connection, memory_id: int, row: tuple[Any, ...]
+    ) -> None:
+        """Drop a near duplicate, or merge it into ``memory_id`` (salience, recency)."""
+        if self._dedup_mode == "merge":
+            conn.execute(
+                """
+                UPDATE memories SET
+                    salience = MAX(salience, ?),
+                    created_at = MAX(created_at, ?),
+                    metadata = CASE WHEN json_valid(metadata) THEN json_set(
+                        metadata, '$.duplicates',
+                        COALESCE(json_extract(metadata, '$.duplicates'), 0) + 1
+                    ) ELSE metadata END
+                WHERE id = ?
+                """,
+                (row[3], row[2], memory_id),
+            )
+        self.dedup_stats["merged" if self._dedup_mode == "merge" else "dropped"] += 1
+
+    def _load_dedup_window(self) -> None:
+        if self._dedup is None:
+            return
+        rows = (
+            self._pool.reader()
+            .execute(
+                "SELECT id, simhash, type, session_id FROM memories "
+                "WHERE simhash IS NOT NULL ORDER BY id DESC LIMIT ?",
+                (self._dedup.window,),
+            )
+            .fetchall()
+        )
+        for memory_id, signature, memory_type, session in reversed(rows):
+            self._dedup.add(int(memory_id), from_sqlite(int(signature)), (memory_type, session))
+
+    def _embed(self, texts: Sequence[str]) -> tuple[Embedder, npt.NDArray[np.float32]]:
+        embedder, dim = self._embedder, self._dim
+        embeddings = embedder.embed_batch(list(texts))
+        if embeddings.shape != (len(texts), dim):
             raise ValueError("embedder output dimension mismatch")
-        emb_blob = self._pack_embedding(embedding)
+        return embedder, embeddings
 
-        cur = self._conn.execute(
+    def _index_if_current(
+        self, embedder: Embedder, ids: Sequence[int], embeddings: npt.NDArray[np.float32]
+    ) -> None:
+        """Index vectors unless reembed() swapped embedders since they were written.
+
+        A row written before the swap is re-embedded and indexed by the swap.
+        """
+        with self._swap_lock:
+            if embedder is self._embedder:
+                self._index.add_batch(ids, embeddings)
+
+    @staticmethod
+    def _insert_rows(conn: sqlite3.Connection, rows: Sequence[tuple[Any, ...]]) -> list[int]:
+        """Insert prepared rows (+ embedding blob, simhash); run inside a writer transaction."""
+        # The writer holds the write lock, so the ids below stay ours. Explicit
+        # ids past the AUTOINCREMENT high-water mark advance it as usual.
+        (max_id,) = conn.execute(
+            "SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'memories'), 0), "
+            "COALESCE((SELECT MAX(id) FROM memories), 0))"
+        ).fetchone()
+        ids = list(range(int(max_id) + 1, int(max_id) + 1 + len(rows)))
+        conn.executemany(
             """
-            INSERT INTO memories (type, text, created_at, salience, valence, metadata, embedding)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO memories (
+                id, type, text, created_at, salience, valence, metadata, session_id,
+                embedding, simhash
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (memory_type, text, created_at, salience, valence, metadata_json, emb_blob),
+            [(memory_id, *row) for memory_id, row in zip(ids, rows)],
+        )
+        return ids
+
+    def delete(self, memory_id: int) -> bool:
+        deleted = self._write(
+            lambda conn: conn.execute("DELETE FROM memories WHERE id = ?", (memory_id,)).rowcount
+        )
+        self._unindex(memory_id)
+        self._cache.invalidate()
+        return deleted > 0
+
+    def _unindex(self, memory_id: int) -> None:
+        """Drop a deleted row from both tiers and the dedup window."""
+        self._index.remove(memory_id)
+        if self._cold is not None:
+            self._cold.remove(memory_id)
+        if self._dedup is not None:
+            self._dedup.remove(memory_id)
+
+    def update(self, memory_id: int, fields: dict[str, Any]) -> bool:
+        """Update a memory in place; a new text/content is re-embedded and re-indexed."""
+        assignments: dict[str, Any] = {}
+        for key in ("type", "created_at", "salience", "valence"):
+            if key in fields:
+                assignments[key] = str(fields[key]) if key == "type" else float(fields[key])
+        if "metadata" in fields:
+            assignments["metadata"] = json.dumps(fields["metadata"], sort_keys=True)
+        if "session_id" in fields:
+            session_id = fields["session_id"]
+            assignments["session_id"] = None if session_id is None else str(session_id)
+        text = fields.get("text") or fields.get("content")
+        embedder: Embedder | None = None
+        embedding = None
+        if text:
+            assignments["text"] = str(text)
+            assignments["simhash"] = to_sqlite(simhash(str(text)))
+            embedder, embedding = self._embed([str(text)])
+            assignments["embedding"] = self._pack_embedding(embedding[0])
+        if not assignments:
+            return False
+
+        columns = ", ".join(f"{column} = ?" for column in assignments)
+
+        def apply(conn: sqlite3.Connection) -> tuple[Any, ...] | None:
+            nonlocal embedder, embedding
+            if embedder is not None and embedder is not self._embedder:
+                embedder, embedding = self._embed([str(text)])
+                assignments["embedding"] = self._pack_embedding(embedding[0])
+            cursor = conn.execute(
+                f"UPDATE memories SET {columns} WHERE id = ?", (*assignments.values(), memory_id)
+            )
+            if cursor.rowcount == 0:
+                return None
+            row: tuple[Any, ...] = conn.execute(
+                "SELECT simhash, type, session_id FROM memories WHERE id = ?", (memory_id,)
+            ).fetchone()
+            return row
+
+        updated = self._write(apply)
+        if updated is None:
+            return False
+        if self._dedup is not None and {"text", "type", "session_id"} & assignments.keys():
+            # New text or scope: later stores must match the row as it is now.
+            signature, memory_type, session = updated
+            self._dedup.add(memory_id, from_sqlite(int(signature)), (memory_type, session))
+        if embedder is not None and embedding is not None:
+            self._index_if_current(embedder, [memory_id], embedding)
+            if self._cold is not None:
+                # Re-embedded rows are promoted back to the hot tier.
+                self._cold.remove(memory_id)
+        self._cache.invalidate()
+        return True
+
+    def iter_records(
+        self, batch_size: int = 500, after_id: int = 0, **filters: Any
+    ) -> Iterator[dict[str, Any]]:
+        where, params = self._filter_sql(filters)
+        extra = f" AND {where}" if where else ""
+        batch_size = max(batch_size, 1)
+        cursor = after_id
+        while True:
+            rows = (
+                self._pool.reader()
+                .execute(
+                    "SELECT id, type, text, created_at, salience, valence, metadata "
+                    f"FROM memories WHERE id > ?{extra} ORDER BY id LIMIT ?",
+                    (cursor, *params, batch_size),
+                )
+                .fetchall()
+            )
+            for row in rows:
+                yield self._row_to_record(row)
+            if len(rows) < batch_size:
+                return
+            cursor = int(rows[-1]["id"])
+
+    def maintain(self, now: float | None = None) -> dict[str, int]:
+        """Consolidate old similar episodes, evict past the retention caps, compact.
+
+        Rows are processed in bounded chunks through the group-commit writer,
+        so maintenance can run next to live traffic.
+        """
+        now = time.time() if now is None else now
+        policy = self._retention
+        report = {"consolidated": 0, "merged": 0, "evicted": 0, "vacuumed_pages": 0}
+        if policy.consolidate_after_days > 0 and not self._reembedding:
+            cutoff = now - policy.consolidate_after_days * 86_400.0
+            report["consolidated"], report["merged"] = self._consolidate(cutoff)
+        if policy.max_rows or policy.max_age_days or policy.session_quota:
+            report["evicted"] = self._evict(now)
+        report["demoted"] = self._demote(now)
+        report["feed_pruned"] = self._pool.write(
+            lambda conn: (
+                conn.execute(
+                    "DELETE FROM memory_changes WHERE created_at < ?",
+                    (now - self._feed_retention_s,),
+                ).rowcount
+            )
+        )
+        if report["merged"] or report["evicted"]:
+            self._cache.invalidate()
+            self._index.compact()
+            if self._cold is not None:
+                self._cold.compact()
+            report["vacuumed_pages"] = self._vacuum()
+            self.save_index()
+        elif report["demoted"] or self._index.pending_delta:
+            self.save_index()
+        return report
+
+    def _consolidate(self, cutoff: float) -> tuple[int, int]:
+        """Merge clusters of similar episodes older than ``cutoff``, per session."""
+        policy = self._retention
+        conn = self._pool.reader()
+        sessions = [
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT session_id FROM memories "
+                "WHERE type = 'episode' AND created_at < ?",
+                (cutoff,),
+            ).fetchall()
+        ]
+        created = merged = 0
+        for session in sessions:
+            after_id = 0
+            while True:
+                rows = conn.execute(
+                    "SELECT id, text, created_at, salience, valence, embedding FROM memories "
+                    "WHERE type = 'episode' AND created_at < ? AND session_id IS ? AND id > ? "
+                    "ORDER BY id LIMIT ?",
+                    (cutoff, session, after_id, policy.consolidate_batch),
+                ).fetchall()
+                if not rows:
+                    break
+                after_id = int(rows[-1]["id"])
+                embeddings = np.zeros((len(rows), self._dim), dtype=np.float32)
+                for i, row in enumerate(rows):
+                    if row["embedding"] is not None:
+                        decode_blob_into(row["embedding"], embeddings[i])
+                clusters = cluster_similar(
+                    embeddings, policy.consolidate_similarity, policy.consolidate_min_cluster
+                )
+                if clusters:
+                    created += len(clusters)
+                    merged += self._merge_clusters(session, rows, embeddings, clusters)
+        return created, merged
+
+    def _merge_clusters(
+        self,
+        session: str | None,
+        rows: Sequence[sqlite3.Row],
+        embeddings: npt.NDArray[np.float32],
+        clusters: Sequence[npt.NDArray[np.int64]],
+    ) -> int:
+        """Replace each cluster with one "consolidated" memory in a single write."""
+        new_rows: list[tuple[Any, ...]] = []
+        centroids = np.empty((len(clusters), self._dim), dtype=np.float32)
+        merged_ids: list[int] = []
+        for c, members in enumerate(clusters):
+            picked = [rows[int(i)] for i in members]
+            member_ids = [int(row["id"]) for row in picked]
+            merged_ids.extend(member_ids)
+            text = "\n".join(str(row["text"]) for row in picked)
+            centroid = embeddings[members].mean(axis=0)
+            centroids[c] = centroid / max(float(np.linalg.norm(centroid)), 1e-12)
+            metadata = {"session_id": session, "consolidated_from": member_ids}
+            new_rows.append(
+                (
+                    "consolidated",
+                    text[: self._retention.consolidate_max_chars],
+                    max(float(row["created_at"]) for row in picked),
+                    max(float(row["salience"]) for row in picked),
+                    sum(float(row["valence"]) for row in picked) / len(picked),
+                    json.dumps(metadata, sort_keys=True),
+                    session,
+                    self._pack_embedding(centroids[c]),
+                    None,
+                )
+            )
+
+        def apply(conn: sqlite3.Connection) -> list[int]:
+            ids = self._insert_rows(conn, new_rows)
+            conn.execute(
+                "DELETE FROM memories WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(merged_ids),),
+            )
+            return ids
+
+        ids = self._write(apply)
+        self._index.add_batch(ids, centroids)
+        self._mark_indexed(ids[-1])
+        for memory_id in merged_ids:
+            self._unindex(memory_id)
+        return len(merged_ids)
+
+    def _evict(self, now: float) -> int:
+        """Delete rows that are too old, over their session quota, or over max_rows."""
+        rows = (
+            self._pool.reader()
+            .execute("SELECT id, session_id, salience, created_at FROM memories")
+            .fetchall()
+        )
+        if not rows:
+            return 0
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        salience = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+        created_at = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+        scores = retention_scores(
+            salience,
+            created_at,
+            now=now,
+            half_life_days=self._half_life_days,
+            weights=self._weights,
+        )
+        mask = select_evictions(
+            [row[1] for row in rows], scores, created_at, self._retention, now=now
+        )
+        doomed = ids[mask].tolist()
+        for start in range(0, len(doomed), self._rebuild_chunk_size):
+            chunk = doomed[start : start + self._rebuild_chunk_size]
+            payload = json.dumps(chunk)
+
+            def delete(conn: sqlite3.Connection, payload: str = payload) -> None:
+                conn.execute(
+                    "DELETE FROM memories WHERE id IN (SELECT value FROM json_each(?))", (payload,)
+                )
+
+            self._write(delete)
+            for memory_id in chunk:
+                self._unindex(memory_id)
+        return len(doomed)
+
+    def _vacuum(self) -> int:
+        """Return free pages to the OS; returns how many pages were released."""
+
+        def vacuum(conn: sqlite3.Connection) -> int:
+            (mode,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+            (before,) = conn.execute("PRAGMA freelist_count").fetchone()
+            if mode == 0:
+                # Pre-existing DB without auto_vacuum: convert once with a full
+                # VACUUM, later runs are incremental.
+                conn.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+            else:
+                conn.executescript("PRAGMA incremental_vacuum;")
+            (after,) = conn.execute("PRAGMA freelist_count").fetchone()
+            return int(before) - int(after)
+
+        return self._pool.write(vacuum, transaction=False)
+
+    @staticmethod
+    def _filter_sql(filters: dict[str, Any]) -> tuple[str, tuple[Any, ...]]:
+        """Translate retrieval filters into a WHERE fragment over indexed columns."""
+        clauses: list[str] = []
+        params: list[Any] = []
+        if filters.get("session_id") is not None:
+            clauses.append("session_id = ?")
+            params.append(str(filters["session_id"]))
+        if filters.get("type") is not None:
+            clauses.append("type = ?")
+            params.append(str(filters["type"]))
+        if filters.get("created_after") is not None:
+            clauses.append("created_at >= ?")
+            params.append(float(filters["created_after"]))
+        if filters.get("created_before") is not None:
+            clauses.append("created_at < ?")
+            params.append(float(filters["created_before"]))
+        return " AND ".join(clauses), tuple(params)
+
+    def _exact_search(
+        self, query_embedding: npt.NDArray[np.float32], n: int, where: str, params: tuple[Any, ...]
+    ) -> list[tuple[int, float]]:
+        """Brute-force cosine over the rows matching ``where`` (a small partition)."""
+        query = query_embedding / max(float(np.linalg.norm(query_embedding)), 1e-12)
+        best_ids = np.empty(0, dtype=np.int64)
+        best_sims = np.empty(0, dtype=np.float32)
+        for ids, embeddings in self._iter_embedding_chunks(0, where, params):
+            norms = np.linalg.norm(embeddings, axis=1)
+            sims = (embeddings @ query) / np.where(norms > 0, norms, 1.0)
+            best_ids = np.concatenate([best_ids, ids])
+            best_sims = np.concatenate([best_sims, sims.astype(np.float32)])
+            if len(best_ids) > n:
+                keep = np.argpartition(-best_sims, n - 1)[:n]
+                best_ids, best_sims = best_ids[keep], best_sims[keep]
+        order = np.argsort(-best_sims, kind="stable")
+        return [(int(i), float(sim)) for i, sim in zip(best_ids[order], best_sims[order])]
+
+    def _matching_ids(
+        self, candidate_ids: Sequence[int], where: str, params: tuple[Any, ...]
+    ) -> set[int]:
+        rows = (
+            self._pool.reader()
+            .execute(
+                f"SELECT id FROM memories WHERE id IN (SELECT value FROM json_each(?)) AND {where}",
+                (json.dumps(list(candidate_ids)), *params),
+            )
+            .fetchall()
+        )
+        return {int(row["id"]) for row in rows}
+
+    def _ann(
+        self, query_embedding: npt.NDArray[np.float32], k: int, allowed: set[int] | None = None
+    ) -> list[tuple[int, float]]:
+        pairs = self._index.search_with_distances(query_embedding, k, allowed)
+        cold = self._cold
+        if cold is not None and len(pairs) < k:
+            # The hot tier cannot fill k: read the rest from the cold segment.
+            # A row being demoted may briefly sit in both tiers.
+            hot = {memory_id for memory_id, _ in pairs}
+            pairs += [
+                pair
+                for pair in cold.search_with_distances(query_embedding, k, allowed)
+                if pair[0] not in hot
+            ]
+            pairs = sorted(pairs, key=lambda pair: pair[1])[:k]
+        return [(memory_id, 1.0 - distance) for memory_id, distance in pairs]
+
+    def _vector_candidates(
+        self, query_embedding: npt.NDArray[np.float32], n: int, filters: dict[str, Any]
+    ) -> list[tuple[int, float]]:
+        """(id, cosine similarity) ANN candidates that satisfy ``filters``, best first.
+
+        Small partitions are scanned exactly; selective filters go through the
+        index filter callback; broad filters over-fetch adaptively until ``n``
+        matching rows are found or the index is exhausted.
+        """
+        where, params = self._filter_sql(filters)
+        if not where:
+            return self._ann(query_embedding, n)
+
+        conn = self._pool.reader()
+        (matching,) = conn.execute(
+            f"SELECT COUNT(*) FROM memories WHERE {where}", params
+        ).fetchone()
+        if matching == 0:
+            return []
+        if matching <= self._filter_exact_threshold:
+            return self._exact_search(query_embedding, n, where, params)
+
+        total = max(sum(self.tier_sizes.values()), 1)
+        selectivity = min(matching / total, 1.0)
+        if selectivity < self._filter_callback_ratio:
+            allowed = {
+                int(row["id"])
+                for row in conn.execute(f"SELECT id FROM memories WHERE {where}", params)
+            }
+            return self._ann(query_embedding, n, allowed)
+
+        fetch = min(math.ceil(n / selectivity), total)
+        while True:
+            candidates = self._ann(query_embedding, fetch)
+            matched = self._matching_ids([memory_id for memory_id, _ in candidates], where, params)
+            hits = [pair for pair in candidates if pair[0] in matched]
+            if len(hits) >= n or fetch >= total:
+                return hits[:n]
+            fetch = min(fetch * 4, total)
+
+    def _lexical_ids(self, query: str, n: int, filters: dict[str, Any]) -> list[int]:
+        """BM25-ranked ids whose text matches any query term."""
+        terms = _FTS_TOKEN.findall(query)
+        if not terms or not self._fts_enabled:
+            return []
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        where, params = self._filter_sql(filters)
+        extra = f" AND {where}" if where else ""
+        rows = (
+            self._pool.reader()
+            .execute(
+                "SELECT memories.id FROM memories_fts "
+                "JOIN memories ON memories.id = memories_fts.rowid "
+                f"WHERE memories_fts MATCH ?{extra} ORDER BY bm25(memories_fts) LIMIT ?",
+                (match, *params, n),
+            )
+            .fetchall()
         )
-        self._conn.commit()
-        row_id = cur.lastrowid
-        assert row_id is not None
-        memory_id = int(row_id)
-        self._index.add(memory_id, embedding)
-        return memory_id
+        return [int(row["id"]) for row in rows]
+
+    def _fuse(self, ranked_lists: Sequence[Sequence[int]], n: int) -> list[tuple[int, float]]:
+        """Reciprocal-rank fusion of best-first id lists, normalized to [0, 1]."""
+        scores: dict[int, float] = {}
+        for ranked in ranked_lists:
+            for rank, memory_id in enumerate(ranked, start=1):
+                scores[memory_id] = scores.get(memory_id, 0.0) + 1.0 / (self._rrf_k + rank)
+        best = len(ranked_lists) / (self._rrf_k + 1)
+        fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [(memory_id, score / best) for memory_id, score in fused]
 
     def retrieve(self, query: str, k: int, **filters: Any) -> list[dict[str, Any]]:
         if k <= 0:
             return []
-        query_embedding = self._embedder.embed(query)
-        candidate_ids = self._index.search(query_embedding, k=max(k * 3, k))
-        if not candidate_ids:
+        self._maybe_poll_changes()
+        if not self._cache.enabled:
+            return self._retrieve(query, k, filters)
+        key = QueryCache.key(query, k, filters)
+        # Taken before the search, so a concurrent write leaves the entry stale.
+        token = self._cache.token(filters.get("session_id"))
+        cached = self._cache.get(key, token)
+        if cached is not None:
+            return cached
+        results = self._retrieve(query, k, filters)
+        self._cache.put(key, token, results)
+        return results
+
+    def _retrieve(self, query: str, k: int, filters: dict[str, Any]) -> list[dict[str, Any]]:
+        n = max(self._mmr_pool_size, k) if self._mmr else max(k * 3, k)
+        mode = self._retrieval_mode if self._fts_enabled else "vector"
+        vector: list[tuple[int, float]] = []
+        if mode != "lexical":
+            query_embedding = self._embedder.embed_batch([query])[0]
+            vector = self._vector_candidates(query_embedding, n, filters)
+        if mode == "vector":
+            candidates = vector
+        else:
+            ranked_lists = [[memory_id for memory_id, _ in vector]] if vector else []
+            ranked_lists.append(self._lexical_ids(query, n, filters))
+            candidates = self._fuse(ranked_lists, n)
+        if not candidates:
             return []
 
-        placeholders = ",".join(["?"] * len(candidate_ids))
-        sql = (
-            "SELECT id, type, text, created_at, salience, valence, metadata "
-            f"FROM memories WHERE id IN ({placeholders})"
+        relevance = dict(candidates)
+        embedding = ", embedding" if self._mmr else ""
+        rows = (
+            self._pool.reader()
+            .execute(
+                "SELECT id, type, text, created_at, salience, valence, metadata"
+                f"{embedding} FROM memories WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(relevance)),),
+            )
+            .fetchall()
         )
-        rows = self._conn.execute(sql, tuple(candidate_ids)).fetchall()
+        if not rows:
+            return []
 
-        now = time.time()
         target_valence = filters.get("valence")
-        scored: list[tuple[float, sqlite3.Row]] = []
-        for row in rows:
-            age_days = max((now - float(row["created_at"])) / 86_400.0, 0.0)
-            recency = math.exp(-math.log(2) * age_days / max(self._half_life_days, 0.1))
-            salience = float(row["salience"])
-            valence_bonus = 0.0
-            if target_valence is not None:
-                valence_bonus = 1.0 - min(abs(float(target_valence) - float(row["valence"])), 1.0)
-            score = (salience * 0.65) + (recency * 0.3) + (valence_bonus * 0.05)
-            scored.append((score, row))
-
-        scored.sort(key=lambda item: item[0], reverse=True)
-        out: list[dict[str, Any]] = []
-        for _, row in scored[:k]:
-            out.append(
-                {
-                    "id": int(row["id"]),
-                    "type": str(row["type"]),
-                    "text": str(row["text"]),
-                    "created_at": float(row["created_at"]),
-                    "salience": float(row["salience"]),
-                    "valence": float(row["valence"]),
-                    "metadata": json.loads(str(row["metadata"] or "{}")),
-                }
-            )
-        return out
+        scores = score_candidates(
+            [relevance[int(row["id"])] for row in rows],
+            [float(row["salience"]) for row in rows],
+            [float(row["valence"]) for row in rows],
+            [float(row["created_at"]) for row in rows],
+            now=time.time(),
+            half_life_days=self._half_life_days,
+            weights=self._weights,
+            target_valence=None if target_valence is None else float(target_valence),
+        )
+        if not self._mmr:
+            return [self._row_to_record(rows[i]) for i in rank_top_k(scores, k)]
+        embeddings = np.zeros((len(rows), self._dim), dtype=np.float32)
+        for i, row in enumerate(rows):
+            if row["embedding"] is not None:
+                decode_blob_into(row["embedding"], embeddings[i])
+        order = mmr_rank(scores, embeddings, k, self._mmr_lambda)
+        return [self._row_to_record(rows[i]) for i in order]
+
+    @staticmethod
+    def _row_to_record(row: sqlite3.Row) -> dict[str, Any]:
+        return {
+            "id": int(row["id"]),
+            "type": str(row["type"]),
+            "text": str(row["text"]),
+            "created_at": float(row["created_at"]),
+            "salience": float(row["salience"]),
+            "valence": float(row["valence"]),
+            "metadata": json.loads(str(row["metadata"] or "{}")),
+        }
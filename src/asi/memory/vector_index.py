@@ -1,14 +1,92 @@
 from __future__ import annotations
 
-from typing import Iterable
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Collection, Iterable, Iterator, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from asi.memory.flat_index import FlatVectorIndex
+from asi.memory.mmap_index import MappedVectorIndex
+from asi.memory.sparse_index import SparseVectorIndex
 
 try:
     import hnswlib  # type: ignore[import-untyped]
 except Exception:  # pragma: no cover - optional dependency fallback
     hnswlib = None
 
+MemoryIds = Sequence[int] | npt.NDArray[np.int64]
+
+
+def hnswlib_available() -> bool:
+    return hnswlib is not None
+
+
+class _ReadWriteLock:
+    """Shared readers, one exclusive (reentrant) writer; waiting writers go first."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer: int | None = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        me = threading.get_ident()
+        nested = self._writer == me or getattr(self._local, "depth", 0) > 0
+        if not nested:
+            with self._cond:
+                self._cond.wait_for(lambda: self._writer is None and not self._writers_waiting)
+                self._readers += 1
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        try:
+            yield
+        finally:
+            self._local.depth -= 1
+            if not nested:
+                with self._cond:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me:
+                self._writers_waiting += 1
+                self._cond.wait_for(lambda: self._writer is None and not self._readers)
+                self._writers_waiting -= 1
+                self._writer = me
+            self._write_depth += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._write_depth -= 1
+                if not self._write_depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
 
 class HNSWVectorIndex:
+    """Vector index over memory ids; every public method is thread-safe.
+
+    Searches run concurrently with each other and only wait for writers.
+
+    The engine is hnswlib when installed, else an exact flat index. With
+    ``mmap_path`` it is a MappedVectorIndex instead: a segment file shared
+    read-only by every process plus a private in-RAM delta. With ``sparse``
+    it is a SparseVectorIndex (inverted index over hash-embedding buckets).
+    """
+
     def __init__(
         self,
         dim: int,
@@ -16,56 +94,323 @@ class HNSWVectorIndex:
         ef_construction: int,
         m: int,
         ef_search: int,
+        growth_factor: float = 2.0,
+        compact_threshold: float = 0.25,
+        storage: str = "float32",
+        mmap_path: Path | None = None,
+        sparse: bool = False,
     ) -> None:
         self._dim = dim
         self._max_elements = max_elements
         self._ef_construction = ef_construction
         self._m = m
         self._ef_search = ef_search
-        self._embeddings: dict[int, list[float]] = {}
-        self._index = None
-        if hnswlib is not None:
-            index = hnswlib.Index(space="cosine", dim=dim)
-            index.init_index(max_elements=max_elements, ef_construction=ef_construction, M=m)
-            index.set_ef(ef_search)
-            self._index = index
+        self._growth_factor = max(growth_factor, 1.1)
+        self._compact_threshold = compact_threshold
+        # Quantized storage applies to the flat engine; hnswlib keeps float32 internally.
+        self._storage = storage
+        self._mmap_path = mmap_path
+        self._sparse = sparse
+        self._deleted: set[int] = set()
+        # Searches share the index; mutation, resize and compaction (which
+        # swaps it out) are exclusive, since the flat fallback and hnswlib's
+        # resize are not safe to run under a concurrent query.
+        self._lock = _ReadWriteLock()
+        self._index = self._new_index(max_elements)
         self.rebuilt_from_db = False
+        self.loaded_from_disk = False
 
-    def build_from_db(self, rows: Iterable[tuple[int, list[float]]]) -> None:
-        self._embeddings.clear()
-        pairs = list(rows)
-        for memory_id, emb in pairs:
-            self._embeddings[memory_id] = emb
+    def _new_index(self, max_elements: int) -> Any:
+        if self._sparse:
+            return SparseVectorIndex(dim=self._dim, initial_capacity=max_elements)
+        if self._mmap_path is not None:
+            return MappedVectorIndex(
+                dim=self._dim,
+                path=self._mmap_path,
+                storage=self._storage,
+            )
+        if hnswlib is None:
+            return FlatVectorIndex(dim=self._dim, storage=self._storage)
+        index = hnswlib.Index(space="cosine", dim=self._dim)
+        index.init_index(
+            max_elements=max_elements, ef_construction=self._ef_construction, M=self._m
+        )
+        index.set_ef(self._ef_search)
+        return index
 
-        if self._index is not None:
-            if pairs:
-                self._index.add_items([emb for _, emb in pairs], [mid for mid, _ in pairs])
-        self.rebuilt_from_db = True
+    def __len__(self) -> int:
+        return int(self._index.get_current_count()) - len(self._deleted)
+
+    def labels(self) -> list[int]:
+        """Memory ids currently indexed, tombstones excluded."""
+        with self._lock.read():
+            return [label for label in self._index.get_ids_list() if label not in self._deleted]
+
+    def get_vectors(self, memory_ids: Sequence[int]) -> npt.NDArray[np.float32]:
+        """Stored vectors of ``memory_ids`` (normalized by the cosine engines)."""
+        with self._lock.read():
+            return np.asarray(self._index.get_items(list(memory_ids)), dtype=np.float32)
+
+    @property
+    def tombstones(self) -> int:
+        return len(self._deleted)
+
+    @property
+    def capacity(self) -> int:
+        return int(self._index.get_max_elements())
+
+    @property
+    def pending_delta(self) -> int:
+        """Vectors not yet folded into the shared segment (mmap engine only)."""
+        with self._lock.read():
+            if isinstance(self._index, MappedVectorIndex):
+                return self._index.delta_count
+            return 0
+
+    def refresh(self) -> bool:
+        """Pick up a segment rewritten by another process (mmap engine only)."""
+        with self._lock.write():
+            if not isinstance(self._index, MappedVectorIndex) or not self._index.refresh():
+                return False
+            for label in self._deleted:
+                try:
+                    self._index.mark_deleted(label)
+                except RuntimeError:
+                    pass
+            return True
+
+    def set_ef(self, ef_search: int) -> None:
+        """Change the query-time ``ef`` (breadth of the HNSW search)."""
+        with self._lock.write():
+            self._ef_search = ef_search
+            if hnswlib is not None:
+                self._index.set_ef(ef_search)
+
+    def _ensure_capacity(self, extra: int) -> None:
+        needed = int(self._index.get_current_count()) + extra
+        capacity = self.capacity
+        if needed <= capacity:
+            return
+        self._index.resize_index(max(needed, int(capacity * self._growth_factor)))
+
+    def build_from_db(self, chunks: Iterable[tuple[MemoryIds, npt.NDArray[np.float32]]]) -> None:
+        """Rebuild from streamed (ids, embeddings) chunks without buffering them."""
+        with self._lock.write():
+            self._deleted.clear()
+            self._index = self._new_index(self._max_elements)
+            for memory_ids, embeddings in chunks:
+                self.add_batch(memory_ids, embeddings)
+            self.rebuilt_from_db = True
 
     def add(self, memory_id: int, embedding: list[float]) -> None:
-        self._embeddings[memory_id] = embedding
-        if self._index is not None:
-            self._index.add_items([embedding], [memory_id])
-
-    def search(self, query_embedding: list[float], k: int) -> list[int]:
-        if k <= 0 or not self._embeddings:
-            return []
-        if self._index is not None:
-            labels, _ = self._index.knn_query(query_embedding, k=min(k, len(self._embeddings)))
-            return [int(x) for x in labels[0]]
-
-        # Brute-force cosine similarity fallback when hnswlib is unavailable.
-        def cosine(a: list[float], b: list[float]) -> float:
-            dot = sum(x * y for x, y in zip(a, b))
-            na = sum(x * x for x in a) ** 0.5
-            nb = sum(y * y for y in b) ** 0.5
-            if na == 0 or nb == 0:
-                return -1.0
-            return float(dot / (na * nb))
-
-        ranked = sorted(
-            self._embeddings.items(),
-            key=lambda item: cosine(query_embedding, item[1]),
-            reverse=True,
-        )
-        return [memory_id for memory_id, _ in ranked[:k]]
+        self.add_batch([memory_id], np.asarray([embedding], dtype=np.float32))
+
+    def add_batch(self, memory_ids: MemoryIds, embeddings: npt.NDArray[np.float32]) -> None:
+        """Insert or overwrite vectors, growing the index when it is full."""
+        if len(memory_ids) == 0:
+            return
+        labels = np.asarray(memory_ids, dtype=np.int64)
+        with self._lock.write():
+            for label in labels.tolist():
+                if label in self._deleted:
+                    self._index.unmark_deleted(label)
+                    self._deleted.discard(label)
+            self._ensure_capacity(len(labels))
+            self._index.add_items(embeddings, labels)
+
+    def remove(self, memory_id: int) -> bool:
+        """Tombstone a vector; compacts once tombstones pass the threshold."""
+        with self._lock.write():
+            if memory_id in self._deleted:
+                return False
+            try:
+                self._index.mark_deleted(memory_id)
+            except RuntimeError:
+                return False
+            self._deleted.add(memory_id)
+            total = int(self._index.get_current_count())
+            crowded = bool(total) and len(self._deleted) / total > self._compact_threshold
+        # Outside the lock: an mmap fold takes the segment flock before it.
+        if crowded:
+            self.compact()
+        return True
+
+    def compact(self, chunk_size: int = 4096) -> None:
+        """Rebuild the index from its live vectors, dropping tombstones."""
+        with self._lock.read():
+            if not self._deleted:
+                return
+            mapped = isinstance(self._index, MappedVectorIndex)
+        if mapped:
+            self._fold(None)
+            return
+        with self._lock.write():
+            if not self._deleted:
+                return
+            live = [label for label in self._index.get_ids_list() if label not in self._deleted]
+            old = self._index
+            self._index = self._new_index(max(self._max_elements, len(live)))
+            for start in range(0, len(live), chunk_size):
+                labels = live[start : start + chunk_size]
+                vectors = np.asarray(old.get_items(labels), dtype=np.float32)
+                self._index.add_items(vectors, np.asarray(labels, dtype=np.int64))
+            self._deleted.clear()
+
+    def _fold(self, extra: dict[str, Any] | None) -> bool:
+        """Rewrite the mmap segment; readers are locked out only for the swap.
+
+        ``extra`` of None keeps the current header. Lock order is segment
+        flock, then ``_lock``.
+        """
+        with self._lock.read():
+            index = self._index
+        if not isinstance(index, MappedVectorIndex):
+            return False
+        with index.segment_lock():
+            # Start from the newest segment so rows other writers folded in survive.
+            self.refresh()
+            with self._lock.read():
+                if self._index is not index:
+                    return False
+                header = index.extra if extra is None else extra
+                version = index.stage(set(self._deleted), header)
+            with self._lock.write():
+                if self._index is not index:
+                    index.discard()
+                    return False
+                if not index.publish(version):
+                    # Changed while staging: restage under the lock (still vectorized).
+                    index.publish(index.stage(set(self._deleted), header))
+                self._deleted.clear()
+        return True
+
+    @staticmethod
+    def _meta_path(path: Path) -> Path:
+        return path.with_name(path.name + ".meta.json")
+
+    def save(self, path: Path, max_id: int, change_seq: int = 0) -> bool:
+        """Persist the graph plus the highest memory id and change-feed seq it covers.
+
+        Only the hnswlib graph and the mmap segment are persisted; the
+        in-RAM flat and sparse engines are always rebuilt from the database.
+        """
+        if self._fold({"max_id": max_id, "change_seq": change_seq}):
+            return True
+        if hnswlib is None or self._sparse:
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with self._lock.read():
+            self._index.save_index(str(tmp_path))
+            deleted = sorted(self._deleted)
+        os.replace(tmp_path, path)
+
+        meta = {
+            "dim": self._dim,
+            "M": self._m,
+            "space": "cosine",
+            "max_id": max_id,
+            "change_seq": change_seq,
+            "deleted": deleted,
+        }
+        meta_path = self._meta_path(path)
+        tmp_meta = meta_path.with_name(meta_path.name + ".tmp")
+        tmp_meta.write_text(json.dumps(meta, sort_keys=True), encoding="utf-8")
+        os.replace(tmp_meta, meta_path)
+        return True
+
+    def load(self, path: Path) -> tuple[int, int] | None:
+        """Load a saved graph; return the (max memory id, change-feed seq) it covers.
+
+        Returns None (leaving the index untouched) when the file is missing,
+        unreadable, predates the change-feed seq, or was built with a
+        different dim/M.
+        """
+        if self._mmap_path is not None:
+            index = self._new_index(self._max_elements)
+            if not index.refresh() or not {"max_id", "change_seq"} <= index.extra.keys():
+                return None
+            with self._lock.write():
+                self._index = index
+                self._deleted = set()
+            self.loaded_from_disk = True
+            self.rebuilt_from_db = True
+            return int(index.extra["max_id"]), int(index.extra["change_seq"])
+        if hnswlib is None or self._sparse or not path.exists():
+            return None
+        try:
+            meta = json.loads(self._meta_path(path).read_text(encoding="utf-8"))
+            if int(meta["dim"]) != self._dim or int(meta["M"]) != self._m:
+                return None
+            covered = int(meta["max_id"]), int(meta["change_seq"])
+            deleted = {int(x) for x in meta.get("deleted", [])}
+            index = hnswlib.Index(space="cosine", dim=self._dim)
+            index.load_index(str(path), max_elements=self._max_elements)
+        except Exception:
+            return None
+        if int(index.dim) != self._dim:
+            return None
+        index.set_ef(self._ef_search)
+        with self._lock.write():
+            self._index = index
+            self._deleted = deleted
+        self.loaded_from_disk = True
+        self.rebuilt_from_db = True
+        return covered
+
+    def search(
+        self, query_embedding: list[float], k: int, allowed_ids: Collection[int] | None = None
+    ) -> list[int]:
+        return [
+            memory_id
+            for memory_id, _ in self.search_with_distances(query_embedding, k, allowed_ids)
+        ]
+
+    def search_with_distances(
+        self, query_embedding: npt.ArrayLike, k: int, allowed_ids: Collection[int] | None = None
+    ) -> list[tuple[int, float]]:
+        """Top-k (memory_id, cosine distance) pairs, nearest first."""
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        return self._knn(query, k, allowed_ids)[0]
+
+    def search_batch(
+        self, query_embeddings: npt.ArrayLike, k: int, allowed_ids: Collection[int] | None = None
+    ) -> list[list[int]]:
+        return [
+            [memory_id for memory_id, _ in row]
+            for row in self._knn(query_embeddings, k, allowed_ids)
+        ]
+
+    def _knn(
+        self, query_embeddings: npt.ArrayLike, k: int, allowed_ids: Collection[int] | None
+    ) -> list[list[tuple[int, float]]]:
+        """``allowed_ids`` restricts results via the index filter callback."""
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        filter_fn = None if allowed_ids is None else allowed_ids.__contains__
+        # ef is index-wide state: a query that must raise it runs exclusively.
+        raise_ef = hnswlib is not None and k > self._ef_search
+        with self._lock.write() if raise_ef else self._lock.read():
+            count = len(self) if allowed_ids is None else min(len(self), len(allowed_ids))
+            if k <= 0 or count == 0:
+                return [[] for _ in range(len(queries))]
+            k = min(k, count)
+            try:
+                while True:
+                    if raise_ef:
+                        self._index.set_ef(k)
+                    try:
+                        labels, distances = self._index.knn_query(queries, k=k, filter=filter_fn)
+                    except RuntimeError:
+                        # hnswlib cannot fill k (stale allowed ids or ef too small): shrink k.
+                        if k == 1:
+                            return [[] for _ in range(len(queries))]
+                        k = max(k // 2, 1)
+                        continue
+                    break
+            finally:
+                if raise_ef:
+                    self._index.set_ef(self._ef_search)
+        return [
+            [(int(label), float(dist)) for label, dist in zip(row_labels, row_dists)]
+            for row_labels, row_dists in zip(labels, distances)
+        ]
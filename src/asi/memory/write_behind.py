@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import atexit
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+from asi.memory.store import MemoryStore
+from asi.observability.logger import EventLogger
+
+
+class WriteBehindQueue:
+    """Bounded queue that persists records to a MemoryStore on a worker thread.
+
+    ``submit`` returns as soon as the record is queued (blocking only while
+    the queue is full); the worker drains up to ``max_batch`` records at a
+    time into ``store_many``. Reads that must see a session's own writes call
+    ``wait_for_session`` first. Pending records are flushed on ``close`` and
+    at interpreter exit.
+
+    A failed batch is retried ``retries`` times with exponential backoff and
+    each failure is logged as a ``memory_write_failed`` event. A batch that
+    still fails is dropped and counted in ``dropped``; its error is raised
+    by the next ``flush`` or ``close``, whose contract covers earlier
+    writes, never by an unrelated ``submit``.
+    """
+
+    def __init__(
+        self,
+        store: MemoryStore,
+        max_queue: int = 1024,
+        max_batch: int = 64,
+        retries: int = 2,
+        retry_delay_s: float = 0.5,
+        events: EventLogger | None = None,
+    ) -> None:
+        self._store = store
+        self._max_batch = max(max_batch, 1)
+        self._retries = max(retries, 0)
+        self._retry_delay_s = max(retry_delay_s, 0.0)
+        self._events = events
+        self._queue: queue.Queue[dict[str, Any] | None] = queue.Queue(maxsize=max(max_queue, 1))
+        self._outstanding: Counter[str | None] = Counter()
+        self._done = threading.Condition()
+        self._error: Exception | None = None
+        self.dropped = 0
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._worker, name="asi-memory-write-behind", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def depth(self) -> int:
+        """Records submitted but not yet persisted."""
+        with self._done:
+            return sum(self._outstanding.values())
+
+    @staticmethod
+    def _session_of(record: dict[str, Any]) -> str | None:
+        session_id = record.get("session_id")
+        metadata = record.get("metadata")
+        if session_id is None and isinstance(metadata, dict):
+            session_id = metadata.get("session_id")
+        return None if session_id is None else str(session_id)
+
+    def _raise_error(self) -> None:
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def submit(self, record: dict[str, Any]) -> None:
+        if self._closed:
+            raise RuntimeError("write-behind queue is closed")
+        with self._done:
+            self._outstanding[self._session_of(record)] += 1
+        self._queue.put(record)
+
+    def _worker(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stop = False
+            while len(batch) < self._max_batch:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+            self._store_batch(batch)
+            with self._done:
+                for session in map(self._session_of, batch):
+                    self._outstanding[session] -= 1
+                    if self._outstanding[session] <= 0:
+                        del self._outstanding[session]
+                self._done.notify_all()
+            if stop:
+                return
+
+    def _store_batch(self, batch: list[dict[str, Any]]) -> None:
+        for attempt in range(self._retries + 1):
+            try:
+                self._store.store_many(batch)
+                return
+            except Exception as exc:  # re-raised from flush() or close()
+                gave_up = attempt == self._retries
+                if self._events is not None:
+                    self._events.log(
+                        "memory_write_failed",
+                        "write-behind",
+                        self._session_of(batch[0]) or "",
+                        {
+                            "error": repr(exc),
+                            "records": len(batch),
+                            "attempt": attempt + 1,
+                            "dropped": gave_up,
+                        },
+                    )
+                if gave_up:
+                    self._error = exc
+                    self.dropped += len(batch)
+                    return
+                time.sleep(self._retry_delay_s * 2**attempt)
+
+    def wait_for_session(self, session_id: str | None) -> None:
+        """Block until every record submitted for ``session_id`` is persisted."""
+        key = None if session_id is None else str(session_id)
+        with self._done:
+            self._done.wait_for(lambda: self._outstanding[key] <= 0)
+
+    def flush(self) -> None:
+        """Block until the queue is drained; raise the last store error, if any."""
+        with self._done:
+            self._done.wait_for(lambda: not self._outstanding)
+        self._raise_error()
+
+    def close(self) -> None:
+        """Persist what is queued, stop the worker; raise the last store error, if any."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
@@ -17,7 +17,8 @@ class EventLogger:
         self.rotate_daily = bool(obs.get("rotate_daily", True))
         self.include_payloads = bool(obs.get("include_payloads", True))
         self.redact_secrets = bool(obs.get("redact_secrets", True))
-        self.log_dir.mkdir(parents=True, exist_ok=True)
+        if self.enabled:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
 
     def _path(self) -> Path:
         if self.rotate_daily:
@@ -1,3 +1,4 @@
+import json
 from pathlib import Path
 from textwrap import dedent
 
@@ -83,3 +84,40 @@ def test_health_and_chat_endpoints(tmp_path: Path) -> None:
     log_file = log_dir / "events.jsonl"
     assert log_file.exists()
     assert len(log_file.read_text().splitlines()) >= 1
+
+
+def test_chat_stream_endpoint_sends_sse_deltas(tmp_path: Path) -> None:
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from asi.brain.arabella_brain import ArabellaBrain
+    from asi.interfaces import api as api_module
+
+    cfg = tmp_path / "cfg"
+    cfg.mkdir()
+    log_dir = tmp_path / "logs"
+    _write_config_dir(cfg, log_dir)
+
+    api_module.brain = ArabellaBrain(config_dir=cfg)
+    assert api_module.app is not None
+    client = TestClient(api_module.app)
+
+    resp = client.post("/chat/stream", json={"session_id": "s1", "message": "hello"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in resp.text.strip().split("\n\n"):
+        event_line, data_line = block.split("\n")
+        events.append((event_line.removeprefix("event: "), json.loads(data_line[len("data: ") :])))
+    names = [name for name, _ in events]
+    assert names[0] == "start" and names[-1] == "done"
+    assert set(names[1:-1]) == {"delta"}
+    run_id = events[0][1]["run_id"]
+    assert events[-1][1] == {"session_id": "s1", "run_id": run_id, "response": "NullBackend: hello"}
+    assert "".join(data["content"] for _, data in events[1:-1]) == "NullBackend: hello"
+
+    logged = [json.loads(line) for line in (log_dir / "events.jsonl").read_text().splitlines()]
+    end = [row for row in logged if row["event_type"] == "respond_end"]
+    assert end[-1]["run_id"] == run_id
+    assert "first_token_ms" in end[-1]["data"]
@@ -8,10 +8,10 @@ def _write(path: Path, content: str) -> None:
     path.write_text(dedent(content).strip() + "\n", encoding="utf-8")
 
 
-def _write_config_dir(base: Path) -> None:
+def _write_config_dir(base: Path, write_behind: bool = False) -> None:
     _write(
         base / "default.yaml",
-        """
+        f"""
         models:
           backend: null_backend
         platform:
@@ -21,6 +21,7 @@ def _write_config_dir(base: Path) -> None:
         memory:
           backend: memory
           k_default: 5
+          write_behind: {str(write_behind).lower()}
         safety:
           permission_mode: ask
           sandbox:
@@ -120,3 +121,36 @@ def test_brain_respond_returns_string_and_stores_episode(tmp_path: Path) -> None
     assert metadata.get("session_id") == "s1"
     assert metadata.get("user") == "hello"
     assert metadata.get("assistant") == "NullBackend: hello"
+
+
+def test_brain_write_behind_persists_episodes_after_flush(tmp_path: Path) -> None:
+    (tmp_path / "workspace").mkdir()
+    _write_config_dir(tmp_path, write_behind=True)
+
+    brain = ArabellaBrain(config_dir=tmp_path)
+    assert brain.respond("hello", session_id="s1") == "NullBackend: hello"
+    assert brain.respond("again", session_id="s1") == "NullBackend: again"
+
+    brain.flush_memory()
+    assert brain.memory_queue_depth == 0
+    assert [r["metadata"]["user"] for r in brain.memory_records] == ["hello", "again"]
+    brain.close()
+
+
+def test_brain_respond_stream_yields_answer_and_stores_episode(tmp_path: Path) -> None:
+    (tmp_path / "workspace").mkdir()
+    _write_config_dir(tmp_path)
+
+    brain = ArabellaBrain(config_dir=tmp_path)
+    stream = brain.respond_stream("hello", session_id="s1")
+    assert "".join(stream) == "NullBackend: hello"
+
+    records = brain.memory_records
+    assert len(records) == 1
+    assert records[0]["metadata"]["assistant"] == "NullBackend: hello"
+
+    # A stream the caller abandons leaves no episode behind.
+    abandoned = brain.respond_stream("again", session_id="s1")
+    next(abandoned)
+    abandoned.close()
+    assert len(brain.memory_records) == 1
@@ -1,3 +1,5 @@
+import numpy as np
+
 from asi.memory.embedder import HashEmbedder
 
 
@@ -10,3 +12,26 @@ def test_hash_embedder_is_deterministic_with_expected_dim() -> None:
     assert len(a) == 16
     assert a == b
     assert a != c
+
+
+def test_hash_embedder_batch_matches_single_and_is_normalized() -> None:
+    embedder = HashEmbedder(dim=32)
+    texts = ["hello world", "", "alpha beta alpha"]
+    batch = embedder.embed_batch(texts)
+
+    assert batch.shape == (3, 32)
+    assert batch.dtype == np.float32
+    assert batch.flags["C_CONTIGUOUS"]
+    for row, text in zip(batch, texts):
+        assert row.tolist() == embedder.embed(text)
+    assert not batch[1].any()
+    assert np.allclose(np.linalg.norm(batch[[0, 2]], axis=1), 1.0)
+
+
+def test_hash_embedder_sign_is_independent_of_bucket() -> None:
+    embedder = HashEmbedder(dim=16)
+    # Same-length tokens: a length-dependent sign would make every collision add up.
+    slots = [embedder._hash_token(f"tok{i:04d}") for i in range(4000)]
+    for bucket in range(16):
+        signs = [sign for b, sign in slots if b == bucket]
+        assert 0.35 < signs.count(1.0) / len(signs) < 0.65
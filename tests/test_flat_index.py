@@ -0,0 +1,108 @@
+import threading
+
+import numpy as np
+import pytest
+
+from asi.memory import vector_index
+from asi.memory.flat_index import FlatVectorIndex
+from asi.memory.vector_index import HNSWVectorIndex
+
+
+def test_flat_index_grows_and_returns_exact_top_k() -> None:
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(50, 8)).astype(np.float32)
+    index = FlatVectorIndex(dim=8, initial_capacity=4)
+    index.add_items(data[:30], list(range(100, 130)))
+    index.add_items(data[30:], list(range(130, 150)))
+    assert index.get_current_count() == 50
+
+    queries = rng.normal(size=(3, 8)).astype(np.float32)
+    labels, distances = index.knn_query(queries, k=5)
+
+    unit = data / np.linalg.norm(data, axis=1, keepdims=True)
+    sims = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ unit.T
+    expected = np.argsort(-sims, axis=1)[:, :5] + 100
+    assert labels.tolist() == expected.tolist()
+    assert np.all(np.diff(distances, axis=1) >= 0)
+
+
+def test_flat_index_overwrites_existing_ids() -> None:
+    index = FlatVectorIndex(dim=2)
+    index.add_items([[1.0, 0.0], [0.0, 1.0]], [1, 2])
+    index.add_items([[0.0, 1.0]], [1])
+
+    labels, distances = index.knn_query([0.0, 1.0], k=5)
+    assert index.get_current_count() == 2
+    assert sorted(labels[0].tolist()) == [1, 2]
+    assert np.allclose(distances[0], 0.0)
+
+
+def test_vector_index_uses_flat_engine_without_hnswlib(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(vector_index, "hnswlib", None)
+    index = HNSWVectorIndex(dim=2, max_elements=10, ef_construction=10, m=4, ef_search=10)
+    index.add_batch([1, 2, 3], np.array([[1, 0], [0, 1], [1, 1]], dtype=np.float32))
+
+    assert index.search([1.0, 0.1], k=1) == [1]
+    assert index.search_batch([[1.0, 0.1], [0.1, 1.0]], k=2) == [[1, 3], [2, 3]]
+
+
+@pytest.mark.parametrize("use_hnswlib", [True, False])
+def test_vector_index_grows_removes_and_compacts(
+    monkeypatch: pytest.MonkeyPatch, use_hnswlib: bool
+) -> None:
+    if use_hnswlib:
+        pytest.importorskip("hnswlib")
+    else:
+        monkeypatch.setattr(vector_index, "hnswlib", None)
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(40, 8)).astype(np.float32)
+    index = HNSWVectorIndex(
+        dim=8, max_elements=4, ef_construction=50, m=8, ef_search=20, compact_threshold=0.5
+    )
+
+    index.add_batch(list(range(40)), data)
+    assert len(index) == 40
+    assert index.capacity >= 40
+
+    assert index.remove(3)
+    assert not index.remove(3)
+    assert not index.remove(999)
+    assert 3 not in index.search(data[3].tolist(), k=40)
+    assert len(index) == 39
+
+    index.add(3, data[3].tolist())
+    assert index.search(data[3].tolist(), k=1) == [3]
+
+    for memory_id in range(21):
+        index.remove(memory_id)
+    assert index.tombstones == 0
+    assert len(index) == 19
+    assert sorted(index.search(data[30].tolist(), k=40)) == list(range(21, 40))
+
+
+def test_vector_index_searches_share_the_lock_and_writers_wait() -> None:
+    index = HNSWVectorIndex(dim=2, max_elements=10, ef_construction=10, m=4, ef_search=10)
+    index.add_batch([1, 2], np.array([[1, 0], [0, 1]], dtype=np.float32))
+    results: list[list[int]] = []
+
+    with index._lock.read():
+        search = threading.Thread(target=lambda: results.append(index.search([1.0, 0.0], k=1)))
+        search.start()
+        search.join(timeout=5)
+        assert results == [[1]]
+
+        add = threading.Thread(target=lambda: index.add(3, [1.0, 1.0]))
+        add.start()
+        add.join(timeout=0.2)
+        assert add.is_alive()
+    add.join(timeout=5)
+    assert len(index) == 3
+
+
+def test_vector_index_restores_ef_after_a_wide_query() -> None:
+    pytest.importorskip("hnswlib")
+    index = HNSWVectorIndex(dim=2, max_elements=50, ef_construction=10, m=4, ef_search=4)
+    data = np.random.default_rng(2).normal(size=(30, 2)).astype(np.float32)
+    index.add_batch(list(range(30)), data)
+    assert len(index.search(data[0].tolist(), k=20)) == 20
+    assert index._index.ef == 4
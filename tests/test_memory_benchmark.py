@@ -0,0 +1,36 @@
+import json
+from pathlib import Path
+
+from asi.memory.benchmark import main, synthetic_corpus
+
+
+def test_synthetic_corpus_is_deterministic() -> None:
+    assert synthetic_corpus(5, seed=3) == synthetic_corpus(5, seed=3)
+    assert all(8 <= len(text.split()) <= 24 for text in synthetic_corpus(50))
+
+
+def test_benchmark_writes_json_report(tmp_path: Path) -> None:
+    out = tmp_path / "bench.json"
+    main(
+        [
+            "--sizes", "300",
+            "--dim", "32",
+            "--queries", "10",
+            "--k", "5",
+            "--m", "8",
+            "--ef-search", "8,64",
+            "--batch-size", "100",
+            "--out", str(out),
+        ]
+    )  # fmt: skip
+
+    report = json.loads(out.read_text())
+    (result,) = report["results"]
+    assert result["size"] == 300
+    assert result["rows_per_s"] > 0
+    assert set(result["retrieve_ms"]) == {"p50", "p95", "p99"}
+    assert set(result["cold_start"]) >= {"rebuild_s", "load_s"}
+    assert result["rss_mb"]["peak"] > 0
+    assert [(r["M"], r["ef_search"]) for r in result["recall"]] == [(8, 8), (8, 64)]
+    assert all(0.0 <= r["recall_at_k"] <= 1.0 for r in result["recall"])
+    assert result["recall"][1]["recall_at_k"] >= result["recall"][0]["recall_at_k"]
@@ -0,0 +1,80 @@
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from asi.memory.store_sqlite import SQLiteMemoryStore
+
+
+def _config(base: Path, **memory: object) -> dict:
+    return {
+        "memory": {
+            "db_path": str(base / "memory.db"),
+            "embedding_dim": 32,
+            "max_elements": 100,
+            "retrieval_mode": "vector",
+            "change_feed_poll_s": 0,
+            **memory,
+        }
+    }
+
+
+def test_second_store_follows_inserts_updates_and_deletes(tmp_path: Path) -> None:
+    writer = SQLiteMemoryStore(_config(tmp_path))
+    follower = SQLiteMemoryStore(_config(tmp_path))
+
+    ids = writer.store_many([{"text": "alpha note"}, {"text": "beta note"}])
+    assert writer.poll_changes() == 0  # its own writes are already indexed
+    assert [r["id"] for r in follower.retrieve("alpha", k=1)] == [ids[0]]
+    assert len(follower._index) == 2
+
+    writer.update(ids[1], {"text": "gamma rewritten"})
+    writer.delete(ids[0])
+    assert follower.poll_changes() == 2
+    assert len(follower._index) == 1
+    assert [r["text"] for r in follower.retrieve("gamma", k=2)] == ["gamma rewritten"]
+
+    writer.close()
+    follower.close()
+
+
+def test_poll_between_commit_and_record_skips_nothing(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    writer = SQLiteMemoryStore(_config(tmp_path))
+    other = SQLiteMemoryStore(_config(tmp_path))
+    write = writer._pool.write
+    polled: list[int] = []
+
+    def commit_then_poll(fn: Any, **kwargs: Any) -> Any:
+        result = write(fn, **kwargs)
+        # Committed but not yet recorded as the writer's own; a foreign write lands too.
+        other.store({"text": "foreign note"})
+        polled.append(writer.poll_changes())
+        return result
+
+    monkeypatch.setattr(writer._pool, "write", commit_then_poll)
+    own = writer.store({"text": "own note"})
+    monkeypatch.undo()
+
+    assert polled == [0]
+    assert writer.poll_changes() == 1  # the foreign write only
+    assert len(writer._index) == 2
+    assert [r["id"] for r in writer.retrieve("own", k=1)] == [own]
+    writer.close()
+    other.close()
+
+
+def test_lagging_store_rebuilds_after_feed_is_pruned(tmp_path: Path) -> None:
+    writer = SQLiteMemoryStore(_config(tmp_path, change_feed_retention_s=60))
+    follower = SQLiteMemoryStore(_config(tmp_path, change_feed_poll_s=3600))
+
+    writer.store_many([{"text": f"note {i}"} for i in range(3)])
+    assert writer.maintain(now=time.time() + 120)["feed_pruned"] == 3
+    writer.store({"text": "note late"})
+
+    follower.poll_changes()
+    assert len(follower._index) == 4
+    writer.close()
+    follower.close()
@@ -0,0 +1,124 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from asi.memory.dedup import SimHashIndex, from_sqlite, simhash, to_sqlite
+from asi.memory.store_sqlite import SQLiteMemoryStore
+
+GREETING = "USER: hi there\nASSISTANT: Hello! How can I help you today with your project?"
+
+
+def _config(base: Path, **memory: object) -> dict:
+    return {
+        "memory": {
+            "db_path": str(base / "memory.db"),
+            "embedding_dim": 32,
+            "retrieval_mode": "vector",
+            "change_feed_poll_s": 0,
+            "dedup_mode": "merge",
+            **memory,
+        }
+    }
+
+
+def test_simhash_is_close_for_near_duplicates_only() -> None:
+    near = GREETING.replace("today", "now")
+    other = "USER: summarize the build logs\nASSISTANT: The build failed on step three."
+    assert simhash(GREETING) == simhash(GREETING.upper())
+    assert bin(simhash(GREETING) ^ simhash(near)).count("1") < 16
+    assert bin(simhash(GREETING) ^ simhash(other)).count("1") > 16
+    for signature in (simhash(GREETING), (1 << 64) - 1):
+        assert -(1 << 63) <= to_sqlite(signature) < 1 << 63
+        assert from_sqlite(to_sqlite(signature)) == signature
+
+
+def test_lsh_index_finds_within_distance_and_scope() -> None:
+    index = SimHashIndex(window=2, bands=4, max_distance=3)
+    index.add(1, 0b1011, "a")
+    assert index.find(0b1011 ^ 0b111, "a") == 1
+    assert index.find(0b1011 ^ 0b1111, "a") is None
+    assert index.find(0b1011, "b") is None
+
+    index.add(2, 0xAAAA_AAAA_AAAA_AAAA, "a")
+    index.add(3, 0x5555_5555_5555_5555, "a")
+    assert len(index) == 2
+    assert index.find(0b1011, "a") is None  # fell out of the window
+    index.remove(3)
+    assert index.find(0x5555_5555_5555_5555, "a") is None
+    with pytest.raises(ValueError):
+        SimHashIndex(bands=5)
+
+
+def test_store_merges_repeated_turns_per_session(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path))
+    first = store.store({"text": GREETING, "session_id": "s1", "salience": 0.2})
+    again = store.store_many(
+        [
+            {"text": GREETING, "session_id": "s1", "salience": 0.9, "created_at": 2e9},
+            {"text": GREETING, "session_id": "s2"},
+            {"text": GREETING, "session_id": "s2"},
+        ]
+    )
+    assert again[0] == first
+    assert again[1] != first and again[2] == again[1]
+    assert len(store._index) == 2
+    assert store.dedup_stats == {"dropped": 0, "merged": 2}
+
+    (row,) = [r for r in store.iter_records(session_id="s1")]
+    assert row["salience"] == 0.9
+    assert row["created_at"] == 2e9
+    assert row["metadata"]["duplicates"] == 1
+    store.close()
+
+    # The LSH window is reloaded from the stored signatures.
+    reopened = SQLiteMemoryStore(_config(tmp_path, dedup_mode="drop"))
+    assert reopened.store({"text": GREETING, "session_id": "s1"}) == first
+    assert reopened.dedup_stats["dropped"] == 1
+    reopened.close()
+
+
+def test_large_batch_folds_in_batch_duplicates(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path))
+    topics = [
+        f"USER: tell me about topic {n} please\nASSISTANT: Topic {n} is {n * 7}." for n in range(50)
+    ]
+    records = [{"text": text, "session_id": "s1"} for text in topics]
+    records += [{"text": text, "session_id": "s1"} for text in topics[::5]]
+    records.append({"text": topics[0], "session_id": "s2"})
+    ids = store.store_many(records)
+    assert len(set(ids[:50])) == 50
+    assert ids[50:60] == ids[:50:5]
+    assert ids[60] not in ids[:60]
+    assert store.dedup_stats["merged"] == 10
+    store.close()
+
+
+def test_deleted_match_is_stored_again(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path))
+    first = store.store({"text": GREETING})
+    store._write(lambda conn: conn.execute("DELETE FROM memories WHERE id = ?", (first,)))
+    second = store.store({"text": GREETING})
+    assert store.dedup_stats["merged"] == 0
+    assert [r["id"] for r in store.iter_records()] == [second]
+    store.close()
+
+
+def test_update_refreshes_the_dedup_window(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path))
+    first = store.store({"text": "USER: what time is it?", "session_id": "s1"})
+    assert store.update(first, {"text": GREETING, "session_id": "s2"})
+    assert store.store({"text": GREETING, "session_id": "s2"}) == first
+    assert store.store({"text": "USER: what time is it?", "session_id": "s1"}) != first
+    assert store.dedup_stats["merged"] == 1
+    store.close()
+
+
+def test_dedup_off_keeps_every_row(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path, dedup_mode="off"))
+    ids = store.store_many([{"text": GREETING}, {"text": GREETING}])
+    assert len(set(ids)) == 2
+    signatures = store._pool.reader().execute("SELECT simhash FROM memories").fetchall()
+    assert {from_sqlite(row[0]) for row in signatures} == {simhash(GREETING)}
+    store.close()
+    assert json.dumps(store.dedup_stats) == '{"dropped": 0, "merged": 0}'
@@ -0,0 +1,100 @@
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from asi.memory.store_sqlite import SQLiteMemoryStore
+
+# (filter_exact_threshold, filter_callback_ratio) selecting each search strategy.
+STRATEGIES = {
+    "exact_partition": (10_000, 0.1),
+    "filter_callback": (0, 1.1),
+    "adaptive_overfetch": (0, 0.0),
+}
+
+
+def _config(base: Path, strategy: str) -> dict:
+    exact_threshold, callback_ratio = STRATEGIES[strategy]
+    return {
+        "memory": {
+            "backend": "sqlite",
+            "db_path": str(base / "memory.db"),
+            "embedding_dim": 32,
+            "max_elements": 1000,
+            "ef_construction": 50,
+            "M": 8,
+            "ef_search": 20,
+            "filter_exact_threshold": exact_threshold,
+            "filter_callback_ratio": callback_ratio,
+        }
+    }
+
+
+@pytest.mark.parametrize("strategy", sorted(STRATEGIES))
+def test_retrieve_honors_session_type_and_time_filters(tmp_path: Path, strategy: str) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path, strategy))
+    records = []
+    for i in range(30):
+        records.append(
+            {
+                "type": "fact" if i % 3 == 0 else "episode",
+                "text": f"shared topic note {i}",
+                "created_at": 1_000.0 + i,
+                "metadata": {"session_id": "s1" if i % 2 == 0 else "s2"},
+            }
+        )
+    store.store_many(records)
+
+    s1 = store.retrieve("shared topic", k=5, session_id="s1")
+    assert len(s1) == 5
+    assert all(row["metadata"]["session_id"] == "s1" for row in s1)
+
+    facts = store.retrieve("shared topic", k=20, session_id="s2", type="fact")
+    assert {row["text"] for row in facts} == {f"shared topic note {i}" for i in (3, 9, 15, 21, 27)}
+
+    window = store.retrieve("shared topic", k=20, created_after=1_010.0, created_before=1_013.0)
+    assert sorted(row["created_at"] for row in window) == [1_010.0, 1_011.0, 1_012.0]
+
+    assert store.retrieve("shared topic", k=5, session_id="missing") == []
+
+
+def test_session_column_is_backfilled_from_metadata(tmp_path: Path) -> None:
+    conn = sqlite3.connect(tmp_path / "memory.db")
+    conn.execute(
+        "CREATE TABLE memories (id INTEGER PRIMARY KEY, type TEXT, text TEXT NOT NULL, "
+        "created_at REAL NOT NULL, salience REAL DEFAULT 0.5, valence REAL DEFAULT 0.0, "
+        "metadata TEXT, embedding BLOB)"
+    )
+    conn.execute(
+        "INSERT INTO memories (type, text, created_at, metadata) VALUES (?, ?, ?, ?)",
+        ("episode", "legacy row", 1.0, json.dumps({"session_id": "old"})),
+    )
+    conn.commit()
+    conn.close()
+
+    store = SQLiteMemoryStore(_config(tmp_path, "exact_partition"))
+    store.store({"text": "new row", "session_id": "new"})
+    store.close()
+
+    conn = sqlite3.connect(tmp_path / "memory.db")
+    rows = conn.execute("SELECT text, session_id FROM memories ORDER BY id").fetchall()
+    assert rows == [("legacy row", "old"), ("new row", "new")]
+
+
+@pytest.mark.parametrize("mode", ["lexical", "hybrid"])
+def test_lexical_modes_find_exact_keywords_and_track_changes(tmp_path: Path, mode: str) -> None:
+    cfg = _config(tmp_path, "exact_partition")
+    cfg["memory"]["retrieval_mode"] = mode
+    store = SQLiteMemoryStore(cfg)
+    target = store.store({"text": "the deploy token is zebra42"})
+    noise = [{"text": f"routine chatter about weather {i}", "salience": 0.1} for i in range(20)]
+    store.store_many(noise)
+
+    rows = store.retrieve("zebra42", k=1)
+    assert [row["id"] for row in rows] == [target]
+
+    store.update(target, {"text": "the deploy token was rotated"})
+    assert store.retrieve("rotated", k=1)[0]["id"] == target
+    store.delete(target)
+    assert all(row["id"] != target for row in store.retrieve("rotated", k=3))
@@ -0,0 +1,163 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from asi.memory.flat_index import FlatVectorIndex
+from asi.memory.mmap_index import MappedVectorIndex, map_segment, write_segment
+from asi.memory.store_sqlite import SQLiteMemoryStore
+from asi.memory.vector_index import HNSWVectorIndex
+
+
+def _config(base: Path, **memory: object) -> dict:
+    return {
+        "memory": {
+            "db_path": str(base / "memory.db"),
+            "index_path": str(base / "vectors.seg"),
+            "index_engine": "mmap",
+            "embedding_dim": 32,
+            "retrieval_mode": "vector",
+            "change_feed_poll_s": 0,
+            "query_cache_size": 0,
+            **memory,
+        }
+    }
+
+
+@pytest.mark.parametrize("storage", ["float32", "float16", "int8"])
+def test_segment_roundtrip(tmp_path: Path, storage: str) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(20, 8)).astype(np.float32)
+    ids = np.arange(40, 0, -2, dtype=np.int64)
+    path = tmp_path / "seg"
+    write_segment(path, ids, vectors, storage, {"max_id": 40})
+
+    mapped = map_segment(path)
+    assert mapped is not None
+    index, extra = mapped
+    assert extra == {"max_id": 40}
+    assert sorted(index.get_ids_list()) == sorted(ids.tolist())
+    labels, _ = index.knn_query(vectors[3], k=1)
+    assert labels[0, 0] == ids[3]
+    with pytest.raises(RuntimeError):
+        index.add_items(vectors[:1], [99])
+
+
+def test_map_segment_rejects_garbage(tmp_path: Path) -> None:
+    path = tmp_path / "seg"
+    path.write_bytes(b"not a segment")
+    assert map_segment(path) is None
+    assert map_segment(tmp_path / "missing") is None
+
+
+def test_delta_shadows_base_and_write_folds_it(tmp_path: Path) -> None:
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(3, 8)).astype(np.float32)
+    path = tmp_path / "seg"
+    index = MappedVectorIndex(dim=8, path=path)
+    index.add_items(vectors, [1, 2, 3])
+    index.write()
+    assert (index.base_count, index.delta_count) == (3, 0)
+
+    index.add_items(vectors[2:3], [1])  # re-embed 1 as vector 3
+    index.add_items(vectors[:1], [4])
+    assert index.get_current_count() == 4
+    assert sorted(index.get_ids_list()) == [1, 2, 3, 4]
+    labels, _ = index.knn_query(vectors[2], k=2)
+    assert sorted(labels[0].tolist()) == [1, 3]
+
+    index.write({2})
+    assert (index.base_count, index.delta_count) == (3, 0)
+    np.testing.assert_allclose(index.get_items([1])[0], index.get_items([3])[0], atol=1e-6)
+
+    other = MappedVectorIndex(dim=8, path=path)
+    assert other.refresh()
+    assert sorted(other.get_ids_list()) == [1, 3, 4]
+
+
+def test_stale_stage_is_not_published(tmp_path: Path) -> None:
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(4, 8)).astype(np.float32)
+    index = MappedVectorIndex(dim=8, path=tmp_path / "seg", storage="int8")
+    index.add_items(vectors[:3], [1, 2, 3])
+    index.write()
+    index.mark_deleted(2)
+
+    version = index.stage()
+    index.add_items(vectors[3:], [4])
+    assert not index.publish(version)
+    assert not (tmp_path / "seg.tmp").exists()
+    assert index.delta_count == 1
+
+    expected = index.get_items([1, 3, 4])
+    assert index.publish(index.stage())
+    assert (index.base_count, index.delta_count) == (3, 0)
+    assert sorted(index.get_ids_list()) == [1, 3, 4]
+    np.testing.assert_array_equal(index.get_items([1, 3, 4]), expected)
+
+
+def test_save_lets_searches_run_while_the_segment_is_built(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(4, 8)).astype(np.float32)
+    index = HNSWVectorIndex(
+        dim=8, max_elements=4, ef_construction=10, m=4, ef_search=10, mmap_path=tmp_path / "seg"
+    )
+    index.add_batch([1, 2, 3, 4], vectors)
+    index.remove(4)
+    found: list[list[int]] = []
+    stage = MappedVectorIndex.stage
+
+    def stage_with_search(self: MappedVectorIndex, *args: object) -> int:
+        searcher = threading.Thread(target=lambda: found.append(index.search(vectors[0], 1)))
+        searcher.start()
+        searcher.join(timeout=5)
+        return stage(self, *args)  # type: ignore[arg-type]
+
+    monkeypatch.setattr(MappedVectorIndex, "stage", stage_with_search)
+    assert index.save(tmp_path / "seg", max_id=4)
+    assert found == [[1]]
+    assert index.pending_delta == 0
+    assert sorted(index.labels()) == [1, 2, 3]
+
+
+def test_workers_share_one_segment(tmp_path: Path) -> None:
+    first = SQLiteMemoryStore(_config(tmp_path))
+    ids = first.store_many([{"text": "alpha note"}, {"text": "beta note"}])
+    assert first.save_index()
+    assert first._index.pending_delta == 0
+
+    second = SQLiteMemoryStore(_config(tmp_path))
+    assert second.index_loaded
+    assert second._index.pending_delta == 0
+    assert [r["id"] for r in second.retrieve("alpha", k=1)] == [ids[0]]
+
+    late = second.store({"text": "gamma note"})
+    assert second._index.pending_delta == 1
+    second.maintain()
+    assert second._index.pending_delta == 0
+
+    first.delete(ids[1])
+    assert [r["id"] for r in first.retrieve("gamma", k=1)] == [late]
+    assert sorted(r["id"] for r in first.retrieve("note", k=5)) == [ids[0], late]
+    first.close()
+    second.close()
+
+    reopened = SQLiteMemoryStore(_config(tmp_path))
+    assert len(reopened._index) == 2
+    reopened.close()
+
+
+def test_mmap_engine_requires_index_path(tmp_path: Path) -> None:
+    cfg = _config(tmp_path)
+    del cfg["memory"]["index_path"]
+    with pytest.raises(ValueError, match="index_path"):
+        SQLiteMemoryStore(cfg)
+
+
+def test_frozen_flat_index_get_items_missing_label() -> None:
+    index = FlatVectorIndex.from_arrays(np.eye(2, dtype=np.float32), np.array([1, 2]))
+    with pytest.raises(KeyError):
+        index.get_items([3])
@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import pytest
+
+from asi.memory.query_cache import QueryCache
+from asi.memory.store_sqlite import SQLiteMemoryStore
+
+
+def _store(base: Path, **memory: object) -> SQLiteMemoryStore:
+    return SQLiteMemoryStore(
+        {
+            "memory": {
+                "db_path": str(base / "memory.db"),
+                "embedding_dim": 32,
+                "max_elements": 100,
+                **memory,
+            }
+        }
+    )
+
+
+def test_repeated_queries_hit_until_same_session_write(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    store.store({"text": "alpha note", "session_id": "s1"})
+
+    first = store.retrieve("alpha  note", k=3, session_id="s1")
+    first[0]["text"] = "mutated by caller"
+    assert store.retrieve(" alpha note ", k=3, session_id="s1")[0]["text"] == "alpha note"
+    assert store.cache_stats["hits"] == 1
+
+    # A write to another session leaves s1's entry valid ...
+    store.store({"text": "alpha other", "session_id": "s2"})
+    store.retrieve("alpha note", k=3, session_id="s1")
+    assert store.cache_stats["hits"] == 2
+
+    # ... but the unfiltered partition and s1 itself are invalidated.
+    store.store({"text": "alpha again", "session_id": "s1"})
+    assert len(store.retrieve("alpha note", k=3, session_id="s1")) == 2
+    assert store.cache_stats == {"hits": 2, "misses": 2, "entries": 1}
+    store.close()
+
+
+def test_delete_and_disabled_cache_bypass(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    memory_id = store.store({"text": "alpha note"})
+    assert store.retrieve("alpha", k=3)
+    store.delete(memory_id)
+    assert store.retrieve("alpha", k=3) == []
+    store.close()
+
+    uncached = _store(tmp_path / "off", query_cache_size=0)
+    uncached.store({"text": "alpha note"})
+    uncached.retrieve("alpha", k=3)
+    uncached.retrieve("alpha", k=3)
+    assert uncached.cache_stats == {"hits": 0, "misses": 0, "entries": 0}
+    uncached.close()
+
+
+def test_entries_expire_after_ttl_and_lru_is_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    clock = [100.0]
+    monkeypatch.setattr("asi.memory.query_cache.time.monotonic", lambda: clock[0])
+    cache = QueryCache(max_entries=2, ttl_s=10)
+    token = cache.token(None)
+    for query in ("a", "b", "c"):
+        cache.put(QueryCache.key(query, 1, {}), token, [{"id": 1}])
+
+    assert cache.get(QueryCache.key("a", 1, {}), token) is None
+    assert cache.get(QueryCache.key("c", 1, {}), token) == [{"id": 1}]
+    clock[0] += 11
+    assert cache.get(QueryCache.key("c", 1, {}), token) is None
+
+
+def test_session_generations_are_bounded_and_never_reused() -> None:
+    cache = QueryCache(max_entries=2, ttl_s=60)
+    key = QueryCache.key("q", 1, {"session_id": "s0"})
+    stale = cache.token("s0")
+    cache.put(key, stale, [{"id": 1}])
+    cache.bump_sessions({"s0"})
+    for n in range(1, 50):
+        cache.bump_sessions({f"s{n}"})
+
+    assert len(cache._sessions) == 2
+    # s0 was dropped, but a token from before its write still misses.
+    assert cache.token("s0") != stale
+    assert cache.get(key, cache.token("s0")) is None
+
+    fresh = cache.token("s0")
+    cache.put(key, fresh, [{"id": 2}])
+    assert cache.get(key, cache.token("s0")) == [{"id": 2}]
@@ -0,0 +1,153 @@
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from asi.memory.embedder import HashEmbedder
+from asi.memory.reembed import ReembedJob
+from asi.memory.store_sqlite import SQLiteMemoryStore
+
+
+def _config(base: Path, dim: int, **memory: object) -> dict:
+    return {
+        "memory": {
+            "db_path": str(base / "memory.db"),
+            "index_path": str(base / "hnsw.index"),
+            "embedding_dim": dim,
+            "retrieval_mode": "vector",
+            "change_feed_poll_s": 0,
+            **memory,
+        }
+    }
+
+
+def _blob_sizes(db_path: Path) -> set[int]:
+    with sqlite3.connect(db_path) as conn:
+        return {row[0] for row in conn.execute("SELECT length(embedding) FROM memories")}
+
+
+def test_offline_job_migrates_to_a_new_dimension(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path, 32))
+    ids = store.store_many([{"text": f"note {i}"} for i in range(5)])
+    store.close()
+
+    report = ReembedJob(tmp_path / "memory.db", HashEmbedder(dim=48), chunk_size=2).run()
+    assert report["rows"] == 5
+    assert report["rows_per_s"] > 0
+    assert _blob_sizes(tmp_path / "memory.db") == {48 * 4}
+
+    migrated = SQLiteMemoryStore(_config(tmp_path, 48))
+    assert [r["id"] for r in migrated.retrieve("note 3", k=1)] == [ids[3]]
+    migrated.close()
+
+
+def test_interrupted_job_resumes_from_its_checkpoint(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path, 32))
+    store.store_many([{"text": f"note {i}"} for i in range(5)])
+    store.close()
+
+    def interrupt(progress: dict[str, Any]) -> None:
+        raise KeyboardInterrupt
+
+    job = ReembedJob(tmp_path / "memory.db", HashEmbedder(dim=48), chunk_size=2)
+    with pytest.raises(KeyboardInterrupt):
+        job.fill(interrupt)
+
+    report = ReembedJob(tmp_path / "memory.db", HashEmbedder(dim=48), chunk_size=2).fill()
+    assert report["resumed_from"] == 2
+    assert report["rows"] == 3
+
+
+class _RehashedEmbedder(HashEmbedder):
+    scheme = "sha256-v2"
+
+
+def test_interrupted_job_restarts_for_a_different_embedder(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path, 32))
+    store.store_many([{"text": f"note {i}"} for i in range(5)])
+    store.close()
+
+    def interrupt(progress: dict[str, Any]) -> None:
+        raise KeyboardInterrupt
+
+    job = ReembedJob(tmp_path / "memory.db", HashEmbedder(dim=48), chunk_size=2)
+    with pytest.raises(KeyboardInterrupt):
+        job.fill(interrupt)
+
+    report = ReembedJob(tmp_path / "memory.db", _RehashedEmbedder(dim=48), chunk_size=2).fill()
+    assert report["resumed_from"] == 0
+    assert report["rows"] == 5
+
+
+def test_live_reembed_catches_up_concurrent_writes(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path, 32))
+    follower = SQLiteMemoryStore(_config(tmp_path, 32))
+    ids = store.store_many([{"text": f"note {i}"} for i in range(4)])
+    late: list[int] = []
+
+    def write_meanwhile(progress: dict[str, Any]) -> None:
+        if not late:
+            late.append(store.store({"text": "late arrival"}))
+            store.update(ids[0], {"text": "rewritten first"})
+            store.delete(ids[1])
+
+    report = store.reembed(HashEmbedder(dim=48), chunk_size=2, progress=write_meanwhile)
+    assert report["caught_up"] >= 2
+    assert len(store._index) == 4
+    assert [r["id"] for r in store.retrieve("late arrival", k=1)] == late
+    assert [r["id"] for r in store.retrieve("rewritten first", k=1)] == [ids[0]]
+    assert store.store({"text": "after swap"}) > late[0]
+    assert _blob_sizes(tmp_path / "memory.db") == {48 * 4}
+
+    with pytest.raises(RuntimeError, match="re-embedded"):
+        follower.poll_changes()
+    store.close()
+
+    reopened = SQLiteMemoryStore(_config(tmp_path, 48))
+    assert reopened.index_loaded or reopened.index_rebuilt
+    assert len(reopened._index) == 5
+    reopened.close()
+
+
+def test_process_pool_workers(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path, 32))
+    store.store_many([{"text": f"note {i}"} for i in range(20)])
+    store.close()
+
+    job = ReembedJob(tmp_path / "memory.db", HashEmbedder(dim=40), chunk_size=4, workers=2)
+    assert job.run()["rows"] == 20
+    assert _blob_sizes(tmp_path / "memory.db") == {40 * 4}
+
+
+def _columns(db_path: Path) -> dict[str, int]:
+    with sqlite3.connect(db_path) as conn:
+        names = [row[1] for row in conn.execute("PRAGMA table_info(memories)")]
+        return {
+            name: conn.execute(f"SELECT COUNT({name}) FROM memories").fetchone()[0]
+            for name in names
+            if name.startswith("embedding")
+        }
+
+
+def test_live_reembed_recycles_the_old_column_in_chunks(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path, 32))
+    store.store_many([{"text": f"note {i}"} for i in range(7)])
+    writes: list[int] = []
+    write = store._pool.write
+
+    def counting_write(fn: Any, **kwargs: Any) -> Any:
+        writes.append(1)
+        return write(fn, **kwargs)
+
+    store._pool.write = counting_write  # type: ignore[method-assign]
+    store.reembed(HashEmbedder(dim=48), chunk_size=3)
+    # Old blobs are cleared 3 rows per writer job, then the column is kept for reuse.
+    assert len(writes) >= 4
+    assert _columns(tmp_path / "memory.db") == {"embedding": 7, "embedding_next": 0}
+
+    store.reembed(HashEmbedder(dim=40), chunk_size=3)
+    assert _columns(tmp_path / "memory.db") == {"embedding": 7, "embedding_next": 0}
+    assert _blob_sizes(tmp_path / "memory.db") == {40 * 4}
+    assert store.retrieve("note 5", k=1)[0]["text"] == "note 5"
+    store.close()
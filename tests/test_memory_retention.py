@@ -0,0 +1,100 @@
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+
+from asi.memory.retention import RetentionPolicy, cluster_similar, select_evictions
+from asi.memory.store_memory import MemoryStoreMemory
+from asi.memory.store_sqlite import SQLiteMemoryStore
+
+DAY = 86_400.0
+
+
+def _config(base: Path, **memory: object) -> dict:
+    return {
+        "memory": {
+            "db_path": str(base / "memory.db"),
+            "embedding_dim": 64,
+            "max_elements": 100,
+            "retrieval_mode": "vector",
+            **memory,
+        }
+    }
+
+
+def test_select_evictions_applies_age_quota_and_row_caps() -> None:
+    now = 1_000 * DAY
+    sessions = ["a", "a", "a", "b", None, None]
+    scores = [0.9, 0.1, 0.5, 0.2, 0.8, 0.3]
+    created = [now] * 5 + [now - 40 * DAY]
+
+    quota = select_evictions(sessions, scores, created, RetentionPolicy(session_quota=2), now=now)
+    assert quota.tolist() == [False, True, False, False, False, False]
+
+    capped = select_evictions(
+        sessions, scores, created, RetentionPolicy(max_rows=3, max_age_days=30), now=now
+    )
+    assert capped.tolist() == [False, True, False, True, False, True]
+
+
+def test_cluster_similar_groups_near_duplicates_only() -> None:
+    base = np.eye(4, dtype=np.float32)
+    vectors = np.vstack([base[0], base[0] + 0.05 * base[1], base[0], base[2], base[3]])
+    clusters = cluster_similar(vectors, threshold=0.9, min_size=3)
+    assert [c.tolist() for c in clusters] == [[0, 1, 2]]
+
+
+def test_sqlite_maintain_consolidates_evicts_and_compacts(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path, consolidate_after_days=7, retention_max_rows=4))
+    old = time.time() - 30 * DAY
+    repeated = [
+        {"text": "user asked about the weather forecast today", "created_at": old + i}
+        for i in range(5)
+    ]
+    store.store_many([{**r, "session_id": "s1", "salience": 0.2} for r in repeated])
+    store.store_many(
+        [
+            {"text": f"distinct fact number {i} about topic {i}", "session_id": "s1"}
+            for i in range(4)
+        ]
+    )
+
+    report = store.maintain()
+    assert report["consolidated"] == 1
+    assert report["merged"] == 5
+    # 4 recent facts + 1 consolidated memory over max_rows=4: lowest score goes.
+    assert report["evicted"] == 1
+
+    with sqlite3.connect(tmp_path / "memory.db") as conn:
+        types = [row[0] for row in conn.execute("SELECT type FROM memories ORDER BY id")]
+    assert len(types) == 4
+    assert len(store._index) == 4
+    assert store._index.tombstones == 0
+    store.close()
+
+
+def test_sqlite_maintain_keeps_consolidated_memory_retrievable(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path, consolidate_after_days=7))
+    old = time.time() - 30 * DAY
+    store.store_many(
+        [{"text": "deploy failed on the staging cluster", "created_at": old + i} for i in range(3)]
+        + [{"text": "lunch order for friday"}]
+    )
+
+    assert store.maintain()["merged"] == 3
+    hits = store.retrieve("deploy failed staging", k=1)
+    assert hits[0]["type"] == "consolidated"
+    assert len(hits[0]["metadata"]["consolidated_from"]) == 3
+    store.close()
+
+
+def test_memory_backend_maintain_enforces_session_quota() -> None:
+    store = MemoryStoreMemory({"memory": {"embedding_dim": 32, "retention_session_quota": 2}})
+    for i in range(4):
+        store.store({"text": f"t{i}", "salience": i / 10, "metadata": {"session_id": "s"}})
+
+    assert store.maintain()["evicted"] == 2
+    assert [r["text"] for r in store.iter_records()] == ["t2", "t3"]
+    # Retrieval ranks the survivors: higher salience first.
+    assert [r["text"] for r in store.retrieve("", k=10)] == ["t3", "t2"]
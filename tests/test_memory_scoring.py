@@ -0,0 +1,83 @@
+import time
+from pathlib import Path
+
+import numpy as np
+
+from asi.memory.scoring import ScoreWeights, mmr_rank, rank_top_k, score_candidates
+from asi.memory.store_memory import MemoryStoreMemory
+from asi.memory.store_sqlite import SQLiteMemoryStore
+
+
+def test_score_candidates_combines_weighted_terms() -> None:
+    now = 1_000_000.0
+    weights = ScoreWeights(similarity=1.0, salience=0.5, recency=0.25, valence=0.1)
+    scores = score_candidates(
+        relevance=[0.9, 0.1, 1.5],
+        salience=[0.2, 1.0, 0.0],
+        valence=[0.0, 1.0, 0.5],
+        created_at=[now, now - 7 * 86_400.0, now + 60.0],
+        now=now,
+        half_life_days=7,
+        weights=weights,
+        target_valence=1.0,
+    )
+
+    expected = [0.9 + 0.1 + 0.25, 0.1 + 0.5 + 0.125 + 0.1, 1.0 + 0.0 + 0.25 + 0.05]
+    assert np.allclose(scores, expected)
+    assert rank_top_k(scores, 2).tolist() == [2, 0]
+
+
+def test_weights_read_from_memory_config() -> None:
+    weights = ScoreWeights.from_config({"weight_similarity": "0.7", "weight_recency": 0})
+    assert weights == ScoreWeights(similarity=0.7, salience=0.25, recency=0.0, valence=0.05)
+
+
+def test_retrieve_prefers_similar_memory_over_newest_salient_one(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(
+        {
+            "memory": {
+                "db_path": str(tmp_path / "memory.db"),
+                "embedding_dim": 64,
+                "max_elements": 100,
+                "ef_construction": 50,
+                "M": 8,
+                "ef_search": 20,
+            }
+        }
+    )
+    relevant = store.store(
+        {"text": "the garden gate code is 4417", "created_at": time.time() - 3 * 86_400.0}
+    )
+    store.store_many(
+        [{"text": f"unrelated status update number {i}", "salience": 0.9} for i in range(10)]
+    )
+
+    assert store.retrieve("garden gate code", k=1)[0]["id"] == relevant
+
+
+def test_mmr_rank_skips_near_duplicates() -> None:
+    embeddings = np.array([[1.0, 0.0], [0.99, 0.05], [0.0, 1.0]])
+    scores = np.array([0.9, 0.89, 0.6])
+
+    assert rank_top_k(scores, 2).tolist() == [0, 1]
+    assert mmr_rank(scores, embeddings, 2, lambda_=0.7).tolist() == [0, 2]
+    assert mmr_rank(scores, embeddings, 3, lambda_=1.0).tolist() == [0, 1, 2]
+    assert mmr_rank(scores, embeddings, 5, lambda_=0.5).tolist() == [0, 2, 1]
+    assert mmr_rank(scores[:0], embeddings[:0], 3, lambda_=0.5).tolist() == []
+
+
+def test_retrieve_with_mmr_returns_distinct_memories(tmp_path: Path) -> None:
+    memory_cfg = {"embedding_dim": 128, "mmr": True, "mmr_lambda": 0.5, "query_cache_size": 0}
+    stores = [
+        SQLiteMemoryStore({"memory": {**memory_cfg, "db_path": str(tmp_path / "memory.db")}}),
+        MemoryStoreMemory({"memory": memory_cfg}),
+    ]
+    for store in stores:
+        repeats = store.store_many(
+            [{"text": "deploy the staging server tonight please"} for _ in range(3)]
+        )
+        other = store.store({"text": "deploy notes: staging server uses port 8080"})
+
+        ids = [r["id"] for r in store.retrieve("deploy staging server", k=2)]
+        assert ids[0] in repeats
+        assert ids[1] == other
@@ -1,5 +1,10 @@
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import pytest
+
 from asi.memory.store_sqlite import SQLiteMemoryStore
 
 
@@ -40,3 +45,223 @@ def test_sqlite_memory_persists_and_rebuilds_index(tmp_path: Path) -> None:
     assert second
     texts = [row["text"] for row in second]
     assert any("alpha" in t for t in texts)
+
+
+def test_store_many_assigns_sequential_ids_and_indexes_batch(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path))
+    first = store.store({"type": "fact", "text": "seed memory"})
+
+    ids = store.store_many(
+        [
+            {"type": "fact", "text": "alpha batch", "salience": 0.9},
+            {"type": "fact", "text": "beta batch"},
+            {"type": "fact", "text": "gamma batch", "metadata": {"session_id": "s1"}},
+        ]
+    )
+
+    assert ids == [first + 1, first + 2, first + 3]
+    assert store.store_many([]) == []
+    texts = [row["text"] for row in store.retrieve("alpha batch", k=4)]
+    assert "alpha batch" in texts
+
+    reopened = SQLiteMemoryStore(_config(tmp_path))
+    assert any(row["id"] == ids[2] for row in reopened.retrieve("gamma batch", k=4))
+
+
+def test_saved_index_is_loaded_and_tail_replayed(tmp_path: Path) -> None:
+    pytest.importorskip("hnswlib")
+    cfg = _config(tmp_path)
+
+    store1 = SQLiteMemoryStore(cfg)
+    store1.store({"type": "fact", "text": "alpha memory"})
+    store1.close()
+    assert (tmp_path / "hnsw.index").exists()
+
+    # Written after the index was saved: must be replayed from the DB tail.
+    store2 = SQLiteMemoryStore(cfg)
+    assert store2.index_loaded
+    store2.store({"type": "fact", "text": "late tail memory"})
+    del store2
+
+    store3 = SQLiteMemoryStore(cfg)
+    assert store3.index_loaded
+    texts = [row["text"] for row in store3.retrieve("late tail memory", k=2)]
+    assert "late tail memory" in texts
+
+
+def test_index_with_mismatched_params_is_rebuilt(tmp_path: Path) -> None:
+    pytest.importorskip("hnswlib")
+    cfg = _config(tmp_path)
+    store1 = SQLiteMemoryStore(cfg)
+    store1.store({"type": "fact", "text": "alpha memory"})
+    store1.close()
+
+    cfg["memory"]["M"] = 12
+    store2 = SQLiteMemoryStore(cfg)
+    assert not store2.index_loaded
+    assert store2.retrieve("alpha memory", k=1)[0]["text"] == "alpha memory"
+
+    (tmp_path / "hnsw.index").write_bytes(b"corrupt")
+    store3 = SQLiteMemoryStore(cfg)
+    assert not store3.index_loaded
+    assert store3.retrieve("alpha memory", k=1)[0]["text"] == "alpha memory"
+
+
+def test_rebuild_streams_rows_in_chunks(tmp_path: Path) -> None:
+    cfg = _config(tmp_path)
+    del cfg["memory"]["index_path"]
+    cfg["memory"]["rebuild_chunk_size"] = 2
+
+    store1 = SQLiteMemoryStore(cfg)
+    ids = store1.store_many([{"type": "fact", "text": f"memory number {i}"} for i in range(5)])
+    del store1
+
+    store2 = SQLiteMemoryStore(cfg)
+    assert store2.index_rebuilt
+    for memory_id, i in zip(ids, range(5)):
+        top = store2.retrieve(f"memory number {i}", k=5)
+        assert memory_id in {row["id"] for row in top}
+
+
+def test_delete_and_update_keep_db_and_index_in_sync(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path))
+    alpha, beta = store.store_many([{"text": "alpha memory"}, {"text": "beta memory"}])
+
+    assert store.delete(alpha)
+    assert not store.delete(alpha)
+    assert all(row["id"] != alpha for row in store.retrieve("alpha memory", k=5))
+
+    assert store.update(beta, {"text": "delta replacement", "salience": 0.9})
+    assert not store.update(alpha, {"salience": 0.1})
+    rows = store.retrieve("delta replacement", k=1)
+    assert rows[0]["id"] == beta
+    assert rows[0]["text"] == "delta replacement"
+    assert rows[0]["salience"] == 0.9
+
+
+def test_quantized_storage_shrinks_blobs_and_reads_legacy_rows(tmp_path: Path) -> None:
+    cfg = _config(tmp_path)
+    legacy = SQLiteMemoryStore(cfg)
+    legacy_id = legacy.store({"text": "legacy float memory"})
+    legacy.close()
+
+    cfg["memory"]["embedding_storage"] = "int8"
+    cfg["memory"]["index_path"] = str(tmp_path / "other.index")
+    store = SQLiteMemoryStore(cfg)
+    new_id = store.store({"text": "compact int memory"})
+
+    conn = sqlite3.connect(tmp_path / "memory.db")
+    sizes = dict(conn.execute("SELECT id, length(embedding) FROM memories").fetchall())
+    assert sizes == {legacy_id: 4 * 32, new_id: 8 + 32}
+    rows = store.retrieve("legacy float memory", k=2)
+    assert {row["id"] for row in rows} == {legacy_id, new_id}
+
+
+def test_concurrent_writers_share_group_commits(tmp_path: Path) -> None:
+    cfg = _config(tmp_path)
+    cfg["memory"]["group_commit_wait_ms"] = 5
+    store = SQLiteMemoryStore(cfg)
+    barrier = threading.Barrier(8)
+
+    def worker(n: int) -> list[int]:
+        barrier.wait()
+        ids = [store.store({"type": "fact", "text": f"worker {n} note {i}"}) for i in range(10)]
+        assert store.retrieve(f"worker {n}", k=3)
+        return ids
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(worker, range(8)))
+
+    ids = [memory_id for batch in results for memory_id in batch]
+    assert sorted(ids) == list(range(1, 81))
+    assert store._pool.commits < 80
+    store.close()
+
+    with sqlite3.connect(tmp_path / "memory.db") as conn:
+        (journal,) = conn.execute("PRAGMA journal_mode").fetchone()
+        (count,) = conn.execute("SELECT COUNT(*) FROM memories").fetchone()
+    assert journal == "wal"
+    assert count == 80
+
+
+def test_iter_records_pages_by_id_with_filters(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path))
+    ids = store.store_many(
+        [{"text": f"note {i}", "session_id": "s1" if i % 2 else "s2"} for i in range(7)]
+    )
+
+    assert [r["id"] for r in store.iter_records(batch_size=2)] == ids
+    assert [r["id"] for r in store.iter_records(batch_size=3, after_id=ids[4])] == ids[5:]
+    assert [r["text"] for r in store.iter_records(batch_size=2, session_id="s1")] == [
+        "note 1",
+        "note 3",
+        "note 5",
+    ]
+    store.close()
+
+
+def test_changes_after_the_last_save_survive_a_crash(tmp_path: Path) -> None:
+    pytest.importorskip("hnswlib")
+    cfg = _config(tmp_path)
+    store1 = SQLiteMemoryStore(cfg)
+    ids = store1.store_many([{"text": f"note {word}"} for word in ("red", "green", "blue")])
+    store1.close()
+
+    # Re-embedded and deleted after the index was saved; never saved again.
+    store2 = SQLiteMemoryStore(cfg)
+    assert store2.index_loaded
+    assert store2.update(ids[1], {"text": "zebra crossing"})
+    assert store2.delete(ids[2])
+    del store2
+
+    store3 = SQLiteMemoryStore(cfg)
+    assert store3.index_loaded
+    assert store3.retrieve("zebra crossing", k=1)[0]["id"] == ids[1]
+    assert ids[2] not in {row["id"] for row in store3.retrieve("note blue", k=5)}
+    # The deleted max id is never handed out again.
+    assert store3.store({"text": "note purple"}) == ids[2] + 1
+    store3.close()
+
+
+def test_pruned_feed_forces_a_rebuild(tmp_path: Path) -> None:
+    pytest.importorskip("hnswlib")
+    cfg = _config(tmp_path)
+    store1 = SQLiteMemoryStore(cfg)
+    first = store1.store({"text": "alpha memory"})
+    store1.close()
+
+    store2 = SQLiteMemoryStore(cfg)
+    store2.update(first, {"text": "omega memory"})
+    store2.store({"text": "beta memory"})
+    del store2
+    with sqlite3.connect(tmp_path / "memory.db") as conn:
+        conn.execute("DELETE FROM memory_changes WHERE seq < (SELECT MAX(seq) FROM memory_changes)")
+
+    store3 = SQLiteMemoryStore(cfg)
+    assert store3.retrieve("omega memory", k=1)[0]["id"] == first
+    store3.close()
+
+
+def test_legacy_table_is_migrated_to_autoincrement_ids(tmp_path: Path) -> None:
+    with sqlite3.connect(tmp_path / "memory.db") as conn:
+        conn.execute(
+            "CREATE TABLE memories (id INTEGER PRIMARY KEY, type TEXT, text TEXT NOT NULL, "
+            "created_at REAL NOT NULL, salience REAL DEFAULT 0.5, valence REAL DEFAULT 0.0, "
+            "metadata TEXT, embedding BLOB)"
+        )
+        conn.executemany(
+            "INSERT INTO memories (id, text, created_at) VALUES (?, ?, 0)",
+            [(1, "first legacy"), (2, "second legacy")],
+        )
+
+    store = SQLiteMemoryStore(_config(tmp_path))
+    assert [row["id"] for row in store.iter_records()] == [1, 2]
+    assert store.delete(2)
+    assert store.store({"text": "third"}) == 3
+    table_sql = (
+        store._pool.reader()
+        .execute("SELECT sql FROM sqlite_master WHERE name = 'memories'")
+        .fetchone()[0]
+    )
+    assert "AUTOINCREMENT" in table_sql
+    store.close()
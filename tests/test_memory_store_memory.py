@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from asi.memory.store_memory import MemoryStoreMemory
+
+
+def _store(**memory: object) -> MemoryStoreMemory:
+    return MemoryStoreMemory({"memory": {"embedding_dim": 64, **memory}})
+
+
+def test_retrieve_ranks_by_query_similarity() -> None:
+    store = _store()
+    store.store_many(
+        [
+            {"text": "the cat sat on the mat"},
+            {"text": "quarterly revenue grew strongly"},
+            {"text": "my cat likes the warm mat"},
+        ]
+    )
+
+    hits = store.retrieve("cat mat", k=2)
+    assert {hit["text"] for hit in hits} == {"the cat sat on the mat", "my cat likes the warm mat"}
+    assert all(set(hit) >= {"id", "type", "created_at", "salience", "metadata"} for hit in hits)
+
+
+def test_filters_match_sqlite_semantics() -> None:
+    store = _store()
+    now = time.time()
+    store.store({"text": "alpha note", "session_id": "s1", "type": "fact", "created_at": now})
+    store.store({"text": "alpha note", "metadata": {"session_id": "s2"}, "created_at": now - 50})
+    store.store({"text": "alpha note", "session_id": "s1", "created_at": now - 100})
+
+    assert len(store.retrieve("alpha", k=5, session_id="s1")) == 2
+    assert [r["metadata"] for r in store.retrieve("alpha", k=5, session_id="s2")] == [
+        {"session_id": "s2"}
+    ]
+    assert [r["type"] for r in store.retrieve("alpha", k=5, type="fact")] == ["fact"]
+    assert len(store.retrieve("alpha", k=5, created_after=now - 60)) == 2
+    assert len(store.retrieve("alpha", k=5, created_before=now - 60)) == 1
+    assert store.retrieve("alpha", k=5, session_id="missing") == []
+
+
+def test_session_ring_buffer_drops_oldest() -> None:
+    store = _store(session_capacity=3)
+    ids = [store.store({"text": f"note {i}", "session_id": "s1"}) for i in range(5)]
+    store.store({"text": "note other", "session_id": "s2"})
+
+    kept = store.retrieve("note", k=10, session_id="s1")
+    assert sorted(r["id"] for r in kept) == ids[2:]
+    assert len(store.retrieve("note", k=10)) == 4
+    assert len(store._index) == 4
+
+
+def test_rejects_empty_text() -> None:
+    with pytest.raises(ValueError):
+        _store().store({"text": ""})
+
+
+def test_iter_records_streams_in_id_order() -> None:
+    store = _store(session_capacity=2)
+    ids = [store.store({"text": f"note {i}", "session_id": f"s{i % 2}"}) for i in range(6)]
+
+    assert [r["id"] for r in store.iter_records(batch_size=3)] == ids[2:]
+    assert [r["id"] for r in store.iter_records(batch_size=1, after_id=ids[3])] == ids[4:]
+    assert [r["text"] for r in store.iter_records(session_id="s1")] == ["note 3", "note 5"]
+
+
+def test_iter_records_pages_past_deleted_ids() -> None:
+    store = _store(session_capacity=0)
+    ids = store.store_many(
+        [{"text": f"note {i}", "type": "fact" if i % 3 else "episode"} for i in range(10)]
+    )
+    for memory_id in ids[1::4]:
+        assert store.delete(memory_id)
+    live = [memory_id for memory_id in ids if memory_id not in ids[1::4]]
+
+    assert [r["id"] for r in store.iter_records(batch_size=2)] == live
+    assert [r["id"] for r in store.iter_records(batch_size=2, after_id=ids[1])] == live[1:]
+    episodes = [r["id"] for r in store.iter_records(batch_size=1, type="episode")]
+    assert episodes == [ids[0], ids[3], ids[6]]
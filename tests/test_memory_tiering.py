@@ -0,0 +1,130 @@
+import time
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from asi.memory.embedder import HashEmbedder
+from asi.memory.store_sqlite import SQLiteMemoryStore
+
+DAY = 86_400.0
+
+
+def _config(base: Path, **memory: object) -> dict:
+    return {
+        "memory": {
+            "db_path": str(base / "memory.db"),
+            "index_path": str(base / "hnsw.index"),
+            "embedding_dim": 32,
+            "retrieval_mode": "vector",
+            "change_feed_poll_s": 0,
+            "query_cache_size": 0,
+            "hot_tier_days": 7,
+            "hot_tier_min_salience": 0.9,
+            **memory,
+        }
+    }
+
+
+def test_old_memories_start_cold_and_fill_k(tmp_path: Path) -> None:
+    now = time.time()
+    seed = SQLiteMemoryStore(_config(tmp_path, hot_tier_days=0))
+    old = seed.store({"text": "old apple orchard", "created_at": now - 30 * DAY})
+    pinned = seed.store(
+        {"text": "old pinned apple", "created_at": now - 30 * DAY, "salience": 0.95}
+    )
+    recent = seed.store({"text": "recent apple pie", "created_at": now})
+    seed.close()
+
+    store = SQLiteMemoryStore(_config(tmp_path))
+    assert store.tier_sizes == {"hot": 2, "cold": 1}
+    assert sorted(store._index.labels()) == [pinned, recent]
+    # k=1 (over-fetch 3) cannot be filled by the two hot rows alone.
+    assert {r["id"] for r in store.retrieve("apple", k=3)} == {old, pinned, recent}
+    store.close()
+
+
+def test_maintain_demotes_aged_out_rows(tmp_path: Path) -> None:
+    now = time.time()
+    store = SQLiteMemoryStore(_config(tmp_path))
+    ids = store.store_many(
+        [
+            {"text": "first note", "created_at": now - 6 * DAY},
+            {"text": "second note", "created_at": now - 1 * DAY},
+            {"text": "ancient imported note", "created_at": now - 90 * DAY},
+        ]
+    )
+    assert store.tier_sizes == {"hot": 3, "cold": 0}
+
+    report = store.maintain(now=now + 2 * DAY)
+    assert report["demoted"] == 2
+    assert store.tier_sizes == {"hot": 1, "cold": 2}
+    assert store.maintain(now=now + 2 * DAY)["demoted"] == 0
+    assert {r["id"] for r in store.retrieve("note", k=3)} == set(ids)
+
+    # Filtered retrieval reaches cold rows too.
+    hits = store.retrieve("note", k=1, created_before=now - 30 * DAY)
+    assert [r["id"] for r in hits] == [ids[2]]
+    store.close()
+
+    # Back at the real clock the six-day-old row is inside the window again.
+    reopened = SQLiteMemoryStore(_config(tmp_path))
+    assert reopened.tier_sizes == {"hot": 2, "cold": 1}
+    assert sorted(reopened._index.labels()) == ids[:2]
+    reopened.close()
+
+
+def test_delete_and_update_reach_the_cold_tier(tmp_path: Path) -> None:
+    now = time.time()
+    store = SQLiteMemoryStore(_config(tmp_path))
+    first, second = store.store_many(
+        [
+            {"text": "cold alpha", "created_at": now - 30 * DAY},
+            {"text": "cold beta", "created_at": now - 30 * DAY},
+        ]
+    )
+    store.maintain(now=now)
+    assert store.tier_sizes == {"hot": 0, "cold": 2}
+
+    store.delete(first)
+    assert store.update(second, {"text": "warm beta"})
+    assert store.tier_sizes == {"hot": 1, "cold": 0}
+    assert [r["id"] for r in store.retrieve("beta", k=5)] == [second]
+    store.close()
+
+    reopened = SQLiteMemoryStore(_config(tmp_path))
+    # The re-embedded row is still old, so it is cold again after a restart.
+    assert reopened.tier_sizes == {"hot": 0, "cold": 1}
+    reopened.close()
+
+
+def test_tiering_off_keeps_everything_hot(tmp_path: Path) -> None:
+    store = SQLiteMemoryStore(_config(tmp_path, hot_tier_days=0))
+    store.store({"text": "ancient", "created_at": 0.0})
+    assert store.maintain()["demoted"] == 0
+    assert store.tier_sizes == {"hot": 1, "cold": 0}
+    assert not (tmp_path / "memory.db.cold").exists()
+    store.close()
+
+
+class _SaltedEmbedder(HashEmbedder):
+    """Same dim as the default embedder, different vectors."""
+
+    def embed_batch(self, texts: Sequence[str]) -> npt.NDArray[np.float32]:
+        return super().embed_batch([f"salt {text}" for text in texts])
+
+
+def test_reembed_rebuilds_the_cold_segment(tmp_path: Path) -> None:
+    now = time.time()
+    store = SQLiteMemoryStore(_config(tmp_path))
+    texts = [f"old note {i}" for i in range(5)]
+    ids = store.store_many([{"text": text, "created_at": now - 30 * DAY} for text in texts])
+    store.maintain()
+    assert store.tier_sizes["cold"] == 5
+
+    embedder = _SaltedEmbedder(dim=32)
+    store.reembed(embedder, chunk_size=2)
+    assert store._cold is not None
+    np.testing.assert_allclose(store._cold.get_vectors(ids), embedder.embed_batch(texts), atol=1e-6)
+    store.close()
@@ -0,0 +1,116 @@
+import json
+import threading
+from pathlib import Path
+from typing import Any, Sequence
+
+import pytest
+
+from asi.memory.store_memory import MemoryStoreMemory
+from asi.memory.write_behind import WriteBehindQueue
+from asi.observability.logger import EventLogger
+
+
+class _GatedStore(MemoryStoreMemory):
+    def __init__(self) -> None:
+        super().__init__()
+        self.gate = threading.Event()
+        self.batches: list[int] = []
+
+    def store_many(self, records: Sequence[dict[str, Any]]) -> list[int]:
+        self.gate.wait(timeout=5)
+        self.batches.append(len(records))
+        return super().store_many(records)
+
+
+def _episode(session_id: str, text: str) -> dict[str, Any]:
+    return {"type": "episode", "text": text, "metadata": {"session_id": session_id}}
+
+
+def test_submit_returns_before_store_and_flush_drains_in_batches() -> None:
+    store = _GatedStore()
+    writer = WriteBehindQueue(store, max_queue=16, max_batch=8)
+
+    for i in range(5):
+        writer.submit(_episode("s1", f"note {i}"))
+    assert writer.depth == 5
+    assert store.retrieve("", k=10) == []
+
+    # Other sessions never wait on s1's pending writes.
+    writer.wait_for_session("s2")
+
+    store.gate.set()
+    writer.wait_for_session("s1")
+    writer.flush()
+    assert writer.depth == 0
+    assert len(store.retrieve("", k=10)) == 5
+    assert len(store.batches) < 5
+    writer.close()
+
+
+def test_close_persists_pending_records_and_flush_reports_errors() -> None:
+    store = _GatedStore()
+    store.gate.set()
+    writer = WriteBehindQueue(store)
+    writer.submit(_episode("s1", "kept"))
+    writer.close()
+    assert [r["text"] for r in store.retrieve("", k=10)] == ["kept"]
+    with pytest.raises(RuntimeError):
+        writer.submit(_episode("s1", "late"))
+
+    class _Broken(MemoryStoreMemory):
+        def store_many(self, records: Sequence[dict[str, Any]]) -> list[int]:
+            raise OSError("disk full")
+
+    broken = WriteBehindQueue(_Broken(), retry_delay_s=0)
+    broken.submit(_episode("s1", "lost"))
+    with pytest.raises(OSError):
+        broken.flush()
+    assert broken.depth == 0
+    broken.close()
+
+
+class _Flaky(MemoryStoreMemory):
+    def __init__(self, failures: int) -> None:
+        super().__init__()
+        self.failures = failures
+
+    def store_many(self, records: Sequence[dict[str, Any]]) -> list[int]:
+        if self.failures:
+            self.failures -= 1
+            raise OSError("database is locked")
+        return super().store_many(records)
+
+
+def test_failed_batches_are_retried_logged_and_raised_on_close(tmp_path: Path) -> None:
+    events = EventLogger({"observability": {"enabled": True, "log_dir": str(tmp_path)}})
+    flaky = _Flaky(failures=2)
+    writer = WriteBehindQueue(flaky, retries=2, retry_delay_s=0, events=events)
+    writer.submit(_episode("s1", "kept"))
+    writer.flush()
+    assert [r["text"] for r in flaky.retrieve("", k=10)] == ["kept"]
+
+    flaky.failures = 3
+    writer.submit(_episode("s2", "dropped"))
+    writer.wait_for_session("s2")
+    assert writer.dropped == 1
+    # A fresh write from another session is still accepted and persisted.
+    writer.submit(_episode("s3", "next"))
+    writer.wait_for_session("s3")
+    # Drained sessions leave no counters behind.
+    assert not writer._outstanding
+    with pytest.raises(OSError, match="locked"):
+        writer.close()
+    assert [r["text"] for r in flaky.iter_records()] == ["kept", "next"]
+
+    logged = [
+        json.loads(line)["data"]
+        for path in tmp_path.glob("events*.jsonl")
+        for line in path.read_text().splitlines()
+    ]
+    assert [(e["attempt"], e["dropped"]) for e in logged] == [
+        (1, False),
+        (2, False),
+        (1, False),
+        (2, False),
+        (3, True),
+    ]
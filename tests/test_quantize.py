@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from asi.memory.flat_index import FlatVectorIndex
+from asi.memory.quantize import blob_format, decode_blob_into, decode_sparse, encode_blob
+
+
+@pytest.mark.parametrize(
+    ("mode", "size", "tolerance"),
+    [("float32", 4 * 64, 0.0), ("float16", 4 + 2 * 64, 1e-3), ("int8", 8 + 64, 1e-2)],
+)
+def test_blob_round_trip_per_storage_mode(mode: str, size: int, tolerance: float) -> None:
+    rng = np.random.default_rng(0)
+    vector = rng.normal(size=64).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+
+    blob = encode_blob(vector, mode)
+    out = np.empty(64, dtype=np.float32)
+
+    assert len(blob) == size
+    assert blob_format(blob) == mode
+    assert decode_blob_into(blob, out)
+    assert np.max(np.abs(out - vector)) <= tolerance
+    assert not decode_blob_into(blob, np.empty(32, dtype=np.float32))
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8"])
+def test_quantized_flat_index_matches_exact_ranking(storage: str) -> None:
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(500, 32)).astype(np.float32)
+    queries = data[:10] + rng.normal(scale=0.05, size=(10, 32)).astype(np.float32)
+
+    exact = FlatVectorIndex(dim=32)
+    quantized = FlatVectorIndex(dim=32, storage=storage)
+    exact.add_items(data, list(range(500)))
+    quantized.add_items(data, list(range(500)))
+
+    expected, _ = exact.knn_query(queries, k=5)
+    labels, distances = quantized.knn_query(queries, k=5)
+
+    assert labels[:, 0].tolist() == list(range(10))
+    assert np.mean(labels == expected) >= 0.9
+    assert np.all(np.diff(distances, axis=1) >= 0)
+    assert quantized.nbytes < exact.nbytes
+
+
+def test_sparse_blob_keeps_only_non_zeros() -> None:
+    vector = np.zeros(384, dtype=np.float32)
+    vector[[3, 70, 383]] = [0.5, -0.5, 0.70710677]
+
+    blob = encode_blob(vector, "sparse")
+    out = np.empty(384, dtype=np.float32)
+
+    assert len(blob) == 4 + 3 * 6
+    assert blob_format(blob) == "sparse"
+    indices, values = decode_sparse(blob)  # type: ignore[misc]
+    assert indices.tolist() == [3, 70, 383]
+    assert decode_blob_into(blob, out)
+    np.testing.assert_array_equal(out, vector)
+    assert not decode_blob_into(blob, np.empty(100, dtype=np.float32))
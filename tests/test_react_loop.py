@@ -1,4 +1,6 @@
-from asi.brain.react_loop import ReActLoop
+import json
+
+from asi.brain.react_loop import FinalAnswerStream, ReActLoop
 from asi.llm.null_backend import NullBackend
 from asi.safety.permissions import PermissionManager
 from asi.tools.echo_tool import EchoTool
@@ -41,3 +43,90 @@ def test_react_loop_tool_path_executes_and_injects_result() -> None:
     assert any(
         "[tool_result]" in msg["content"] for msg in loop.debug_trace if msg["role"] == "user"
     )
+
+
+class _ChunkedBackend(NullBackend):
+    """NullBackend replies (or canned ones) streamed a few characters at a time."""
+
+    def __init__(self, replies: list[str] | None = None, size: int = 3) -> None:
+        self._replies = list(replies or [])
+        self._size = size
+        self.chunks_sent = 0
+
+    def generate(self, messages, system_prompt=None, **kwargs):  # type: ignore[no-untyped-def]
+        if self._replies:
+            return self._replies.pop(0)
+        return super().generate(messages, system_prompt, **kwargs)
+
+    def stream_generate(self, messages, system_prompt=None, **kwargs):  # type: ignore[no-untyped-def]
+        raw = self.generate(messages, system_prompt, **kwargs)
+        for start in range(0, len(raw), self._size):
+            self.chunks_sent += 1
+            yield raw[start : start + self._size]
+
+
+def _stream(llm: NullBackend, message: str = "hello") -> list[str]:
+    return list(
+        ReActLoop().run_stream(
+            user_message=message, system_prompt="system", tools=_tools(), llm=llm, max_steps=4
+        )
+    )
+
+
+def test_run_stream_yields_content_before_the_reply_ends() -> None:
+    llm = _ChunkedBackend(size=2)
+    stream = ReActLoop().run_stream(
+        user_message="hello there", system_prompt="s", tools=_tools(), llm=llm, max_steps=4
+    )
+    first = next(stream)
+    total = len(llm.generate([{"role": "user", "content": "hello there"}])) // 2 + 1
+    assert llm.chunks_sent < total
+    assert first + "".join(stream) == "NullBackend: hello there"
+
+
+def test_run_stream_matches_run_across_tool_calls() -> None:
+    pieces = _stream(_ChunkedBackend(), "please use_tool now")
+    assert len(pieces) > 1
+    assert "".join(pieces) == "Tool returned: hi"
+
+
+def test_run_stream_decodes_escapes_split_across_chunks() -> None:
+    content = 'line "one"\n\ttab \\ snow ☃ face \U0001f600 end'
+    reply = json.dumps({"content": content, "type": "final"})
+    for size in (1, 2, 5):
+        assert "".join(_stream(_ChunkedBackend([reply], size=size))) == content
+
+
+def test_run_stream_keeps_literal_control_characters_like_run() -> None:
+    # A raw newline and tab inside the string, plus one escaped newline.
+    reply = '{"type": "final", "content": "first line\nsecond\tcolumn, then \\n"}'
+    expected = ReActLoop().run(
+        user_message="hi",
+        system_prompt="s",
+        tools=_tools(),
+        llm=_ChunkedBackend([reply]),
+        max_steps=4,
+    )
+    assert expected == "first line\nsecond\tcolumn, then \n"
+    for size in (1, 4):
+        assert "".join(_stream(_ChunkedBackend([reply], size=size))) == expected
+
+
+def test_final_answer_stream_reads_only_top_level_keys() -> None:
+    reader = FinalAnswerStream()
+    tool_call = json.dumps(
+        {"type": "tool_call", "name": "echo", "args": {"content": "x", "type": "final"}}
+    )
+    assert [reader.feed(ch) for ch in tool_call] == [""] * len(tool_call)
+    assert reader.kind == "tool_call"
+
+    reader = FinalAnswerStream()
+    nested = json.dumps({"meta": {"type": "x", "content": "no"}, "type": "final", "content": "yes"})
+    assert "".join(reader.feed(ch) for ch in nested) == "yes"
+    assert reader.kind == "final"
+
+
+def test_run_stream_passes_plain_text_and_odd_envelopes_through() -> None:
+    assert "".join(_stream(_ChunkedBackend(["  not json at all"]))) == "  not json at all"
+    assert "".join(_stream(_ChunkedBackend(['{"type": "final", "content": 42}']))) == "42"
+    assert "".join(_stream(_ChunkedBackend(['{"type": "note"}']))) == "{'type': 'note'}"
@@ -0,0 +1,119 @@
+from pathlib import Path
+
+import numpy as np
+
+from asi.memory.embedder import HashEmbedder
+from asi.memory.flat_index import FlatVectorIndex
+from asi.memory.sparse_index import SparseVectorIndex
+from asi.memory.store_memory import MemoryStoreMemory
+from asi.memory.store_sqlite import SQLiteMemoryStore
+
+
+def _corpus(n: int) -> list[str]:
+    rng = np.random.default_rng(0)
+    return [" ".join(f"w{t}" for t in rng.integers(0, 300, size=8)) for _ in range(n)]
+
+
+def test_sparse_index_matches_exact_dense_search() -> None:
+    embedder = HashEmbedder(dim=64)
+    data = embedder.embed_batch(_corpus(300))
+    queries = embedder.embed_batch(_corpus(310)[300:])
+    exact = FlatVectorIndex(dim=64)
+    sparse = SparseVectorIndex(dim=64)
+    exact.add_items(data, list(range(300)))
+    sparse.add_items(data, list(range(300)))
+
+    _, expected = exact.knn_query(queries, k=5)
+    labels, distances = sparse.knn_query(queries, k=5)
+    np.testing.assert_allclose(distances, expected, atol=1e-5)
+    assert labels.shape == (10, 5)
+    assert sparse.nnz < data.size // 4
+
+
+def test_sparse_index_fills_k_with_rows_sharing_no_bucket() -> None:
+    index = SparseVectorIndex(dim=4)
+    index.add_items(np.eye(4, dtype=np.float32), [10, 11, 12, 13])
+    index.mark_deleted(12)
+
+    labels, distances = index.knn_query([1.0, 0.0, 0.0, 0.0], k=4)
+    assert labels[0, 0] == 10
+    assert sorted(labels[0, 1:].tolist()) == [11, 13]
+    assert distances[0].tolist() == [0.0, 1.0, 1.0]
+
+    labels, _ = index.knn_query([1.0, 0.0, 0.0, 0.0], k=3, filter=lambda label: label != 10)
+    assert sorted(labels[0].tolist()) == [11, 13]
+
+
+def test_sparse_index_replaces_rows_and_vacuums() -> None:
+    index = SparseVectorIndex(dim=4)
+    index.add_items(np.eye(4, dtype=np.float32), [1, 2, 3, 4])
+    index.mark_deleted(4)
+    for _ in range(5):
+        index.add_items([[0.0, 1.0, 0.0, 0.0]], [1])
+    index.add_items([[0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]], [2, 2])
+
+    assert index.get_current_count() == 4
+    assert index.nnz == 5  # the replaced rows of label 1 were vacuumed
+    np.testing.assert_array_equal(index.get_items([1, 2]), [[0, 1, 0, 0], [0, 0, 0, 1]])
+    labels, _ = index.knn_query([0.0, 0.0, 0.0, 1.0], k=3)
+    assert labels[0].tolist()[0] == 2
+    assert 4 not in labels[0].tolist()
+    index.unmark_deleted(4)
+    assert index.knn_query([0.0, 0.0, 0.0, 1.0], k=4)[0].shape == (1, 4)
+
+
+def test_sqlite_store_with_sparse_engine(tmp_path: Path) -> None:
+    cfg = {
+        "memory": {
+            "db_path": str(tmp_path / "memory.db"),
+            "index_engine": "sparse",
+            "embedding_dim": 384,
+            "retrieval_mode": "vector",
+        }
+    }
+    store = SQLiteMemoryStore(cfg)
+    ids = store.store_many([{"text": "the cat sat"}, {"text": "dogs bark loudly"}])
+    assert [r["id"] for r in store.retrieve("cat", k=1)] == [ids[0]]
+    blob_size = (
+        store._pool.reader().execute("SELECT MAX(length(embedding)) FROM memories").fetchone()[0]
+    )
+    assert blob_size == 4 + 3 * 6
+    store.close()
+
+    reopened = SQLiteMemoryStore(cfg)
+    assert reopened.index_rebuilt
+    assert [r["id"] for r in reopened.retrieve("dogs", k=1)] == [ids[1]]
+    reopened.close()
+
+
+def test_sparse_index_accepts_all_zero_vectors() -> None:
+    index = SparseVectorIndex(dim=4)
+    index.add_items(np.zeros((2, 4), dtype=np.float32), [1, 2])
+    index.add_items(np.eye(4, dtype=np.float32)[:1], [3])
+    labels, distances = index.knn_query([1.0, 0.0, 0.0, 0.0], k=3)
+    assert labels[0, 0] == 3
+    assert sorted(labels[0, 1:].tolist()) == [1, 2]
+    assert np.allclose(distances[0, 1:], 1.0)
+
+
+def test_sparse_store_reopens_after_whitespace_only_memory(tmp_path: Path) -> None:
+    cfg = {
+        "memory": {
+            "db_path": str(tmp_path / "memory.db"),
+            "index_engine": "sparse",
+            "embedding_dim": 64,
+            "retrieval_mode": "vector",
+        }
+    }
+    store = SQLiteMemoryStore(cfg)
+    blank = store.store({"text": " "})
+    kept = store.store({"text": "hello world"})
+    store.close()
+
+    reopened = SQLiteMemoryStore(cfg)
+    assert [r["id"] for r in reopened.retrieve("hello", k=2)] == [kept, blank]
+    reopened.close()
+
+    memory = MemoryStoreMemory({"memory": {"index_engine": "sparse", "embedding_dim": 64}})
+    memory.store({"text": " "})
+    assert [r["text"] for r in memory.retrieve("x", k=1)] == [" "]